@@ -1,12 +1,16 @@
 import streamlit as st
-import pandas as pd
-import io
 import os
-import re
-from datetime import datetime
-from attendance_parser import parse_html_content
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
+import threading
+from datetime import date
+from roster_cache import RosterCache
+from batch_import import class_origins, flatten_schools, parse_reports
+from attendance_model import STATUS_OPTIONS, AttendanceBook
+from xlsx_export import XLSX_MIME_TYPE, export_to_tempfile
+from columnar_export import COLUMNAR_FORMATS, export_store_to_tempfile, iter_records, iter_store_records, records_sha256
+from attendance_store import AttendanceStore
+from student_index import StudentIndex
+from drive_queue import DONE, FAILED, ExportQueue, export_key
+import metrics
 
 st.set_page_config(
     page_title="Paestro",
@@ -14,6 +18,21 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_roster_cache():
+    """Cache de turmas compartilhado por todas as sessões (memória + disco)"""
+    return RosterCache(os.environ.get("PAESTRO_CACHE_DIR", os.path.join(".cache", "rosters")))
+
+@st.cache_resource
+def get_attendance_store():
+    """Banco SQLite local com as presenças, compartilhado por todas as sessões"""
+    return AttendanceStore(os.environ.get("PAESTRO_DB_PATH", "paestro.db"))
+
+@st.cache_resource
+def get_export_queue():
+    """Fila de envios ao Google Drive executada em segundo plano, uma por processo"""
+    return ExportQueue(os.environ.get("PAESTRO_DB_PATH", "paestro.db")).start()
+
 def initialize_session_state():
     """Initialize session state variables if they don't exist"""
     if 'classes' not in st.session_state:
@@ -23,17 +42,84 @@ def initialize_session_state():
     if 'students' not in st.session_state:
         st.session_state.students = []
     
-    # Agora serão dicionários de dicionários
-    # Exemplo: attendance_status["TURMA X"]["Aluno Y"] = "P"
-    if 'attendance_status' not in st.session_state:
-        st.session_state.attendance_status = {}
-    if 'observations' not in st.session_state:
-        st.session_state.observations = {}
+    # Presença e observações de todas as turmas, indexadas pela posição do aluno, em
+    # um AttendanceBook por data de chamada; `attendance` é o da data escolhida
+    # Exemplo: attendance.get("TURMA X").get_status_at(0) == "P"
+    if 'attendance_date' not in st.session_state:
+        st.session_state.attendance_date = date.today()
+    if 'attendance_days' not in st.session_state:
+        st.session_state.attendance_days = {}
+    if 'attendance' not in st.session_state:
+        st.session_state.attendance = attendance_book(st.session_state.attendance_date)
     
     if 'file_uploaded' not in st.session_state:
         st.session_state.file_uploaded = False
-    if 'html_content' not in st.session_state:
-        st.session_state.html_content = None
+    # Turmas e metadados do relatório (escola, data de emissão, turnos); o HTML
+    # enviado não é guardado na sessão
+    if 'report' not in st.session_state:
+        st.session_state.report = None
+    if 'schools' not in st.session_state:
+        st.session_state.schools = {}
+    # Turma da sessão -> (escola, turma no relatório), quando o lote tem várias escolas
+    if 'class_origins' not in st.session_state:
+        st.session_state.class_origins = {}
+    if 'grid_version' not in st.session_state:
+        st.session_state.grid_version = 0
+    if 'drive_jobs' not in st.session_state:
+        st.session_state.drive_jobs = []
+    
+    # Versão dos dados da sessão: muda sempre que turmas ou presenças mudam,
+    # invalidando o arquivo de exportação já gerado
+    if 'state_version' not in st.session_state:
+        st.session_state.state_version = 0
+    if 'export_cache' not in st.session_state:
+        st.session_state.export_cache = None
+    
+    # Índice de busca por nome/código de todos os alunos carregados e o último
+    # aluno encontrado, como (turma, posição)
+    if 'student_index' not in st.session_state:
+        st.session_state.student_index = None
+    if 'search_target' not in st.session_state:
+        st.session_state.search_target = None
+    
+    # Perfilamento pedido no painel de depuração ("cprofile"/"tracemalloc") para a
+    # próxima execução completa, e o relatório da última execução perfilada
+    if 'profile_next' not in st.session_state:
+        st.session_state.profile_next = None
+    if 'profile_report' not in st.session_state:
+        st.session_state.profile_report = None
+
+def attendance_book(day):
+    """AttendanceBook of the given date, created on first use"""
+    book = st.session_state.attendance_days.get(day)
+    if book is None:
+        book = st.session_state.attendance_days[day] = AttendanceBook()
+    return book
+
+def reset_attendance():
+    """Drop the attendance of every date (a new set of rosters was loaded)"""
+    st.session_state.attendance_days = {}
+    st.session_state.attendance = attendance_book(st.session_state.attendance_date)
+
+def current_day():
+    """Selected attendance date as an ISO string, as stored in the database"""
+    return st.session_state.attendance_date.isoformat()
+
+def bump_state_version():
+    """Mark rosters/attendance as changed so cached exports are regenerated"""
+    st.session_state.state_version += 1
+
+def refresh_export_tab(message=None):
+    """
+    Attendance edits rerun only their fragment. If a generated file is on the export
+    tab, rerun the whole app so that tab stops offering the outdated file.
+    """
+    if st.session_state.export_cache is not None:
+        if message:
+            st.toast(message)
+        st.rerun(scope="app")
+    if message:
+        st.success(message)
 
 def handle_file_upload():
     """Process uploaded HTML file and extract class information"""
@@ -41,16 +127,23 @@ def handle_file_upload():
     
     if uploaded_file is not None and not st.session_state.file_uploaded:
         # Read file content
-        html_content = uploaded_file.read().decode('utf-8')
-        st.session_state.html_content = html_content
+        raw_content = uploaded_file.getvalue()
         
         try:
-            # Parse HTML to extract classes and students
-            classes = parse_html_content(html_content)
+            # Parse HTML to extract classes and students; relatórios idênticos
+            # já enviados por outra sessão são lidos do cache pelo SHA-256
+            with metrics.timed("parse") as timer:
+                report = get_roster_cache().get_or_parse(raw_content)
+                timer.add(rows=sum(map(len, report.classes.values())), bytes=len(raw_content))
             
-            if classes:
-                st.session_state.classes = classes
+            if report.classes:
+                st.session_state.report = report
+                st.session_state.schools = {}
+                st.session_state.class_origins = {}
+                st.session_state.classes = report.classes
+                st.session_state.student_index = StudentIndex.from_reports({report.school_name: report})
                 st.session_state.file_uploaded = True
+                bump_state_version()
                 st.success("Arquivo carregado e processado com sucesso!")
             else:
                 st.error("Nenhuma turma encontrada no arquivo enviado.")
@@ -59,15 +152,192 @@ def handle_file_upload():
     
     return st.session_state.file_uploaded
 
+def handle_batch_upload():
+    """Process several HTML reports at once, in parallel, grouping classes by school"""
+    with st.expander("Importar vários relatórios (lote)"):
+        uploaded_files = st.file_uploader(
+            "Fazer upload dos arquivos HTML",
+            type=["html", "htm"],
+            accept_multiple_files=True,
+            key="batch_files"
+        )
+        
+        if not uploaded_files or not st.button("Processar lote"):
+            return
+        
+        progress_bar = st.progress(0.0, text="Processando relatórios...")
+        
+        def update_progress(done, total, name):
+            progress_bar.progress(done / total, text=f"{done}/{total} - {name}")
+        
+        with metrics.timed("parse_batch") as timer:
+            files = [(f.name, f.getvalue()) for f in uploaded_files]
+            schools, errors = parse_reports(files, progress=update_progress, cache=get_roster_cache())
+            timer.add(
+                rows=sum(len(students) for report in schools.values() for students in report.classes.values()),
+                bytes=sum(len(data) for _, data in files)
+            )
+        
+        for name, error in errors.items():
+            st.error(f"{name}: {error}")
+        
+        if schools:
+            st.session_state.schools = schools
+            st.session_state.classes = flatten_schools(schools)
+            st.session_state.class_origins = class_origins(schools) if len(schools) > 1 else {}
+            st.session_state.student_index = StudentIndex.from_reports(schools)
+            st.session_state.search_target = None
+            reset_attendance()
+            st.session_state.selected_class = None
+            # Os metadados só identificam a escola quando o lote tem uma só
+            st.session_state.report = next(iter(schools.values())) if len(schools) == 1 else None
+            st.session_state.file_uploaded = True
+            bump_state_version()
+            st.success(
+                f"{len(schools)} relatório(s) processado(s): "
+                f"{len(st.session_state.classes)} turmas carregadas."
+            )
+
+def get_school_name():
+    """
+    Nome da escola extraído do relatório enviado, ou "Escola" se não encontrado; em um
+    lote com várias escolas, os nomes de todas (cabeçalho e chave das exportações)
+    """
+    report = st.session_state.report
+    if report is not None:
+        return report.school_name or report.municipality or "Escola"
+    if len(st.session_state.schools) > 1:
+        return ", ".join(st.session_state.schools)
+    return "Escola"
+
+def session_schools():
+    """Schools whose classes are loaded in the session"""
+    if len(st.session_state.schools) > 1:
+        return list(st.session_state.schools)
+    return [get_school_name()]
+
+def class_origin(turma):
+    """(school, turma name in the report) under which a session class is stored"""
+    return st.session_state.class_origins.get(turma) or (get_school_name(), turma)
+
+def save_class_attendance(class_attendance):
+    """Persist only the marks changed since the last save, in a single transaction"""
+    changed = class_attendance.changes()
+    if not changed:
+        return True
+    school, turma = class_origin(class_attendance.turma)
+    try:
+        with metrics.timed("save") as timer:
+            get_attendance_store().save_class(
+                school,
+                turma,
+                current_day(),
+                class_attendance.changed_rows(changed)
+            )
+            timer.add(rows=len(changed))
+    except Exception as e:
+        st.error(f"Erro ao salvar no banco de dados: {e}")
+        return False
+    # Só depois de gravar: uma falha não invalida o arquivo de exportação já gerado
+    bump_state_version()
+    class_attendance.mark_saved(changed)
+    return True
+
+def load_class_attendance(turma):
+    """Roster of `turma` for the selected date, with the marks already saved in the database"""
+    class_attendance = st.session_state.attendance.ensure_class(turma, st.session_state.classes[turma])
+    # Recupera as marcações já salvas no banco (por esta ou outra sessão)
+    try:
+        class_attendance.load_saved(get_attendance_store().load_class(
+            *class_origin(turma), current_day()
+        ))
+    except Exception as e:
+        st.warning(f"Não foi possível carregar as presenças salvas: {e}")
+    return class_attendance
+
+def change_attendance_date():
+    """Switch every view to the attendance of the date picked in the date input"""
+    st.session_state.attendance_date = st.session_state.attendance_date_input
+    st.session_state.attendance = attendance_book(st.session_state.attendance_date)
+    if st.session_state.selected_class:
+        load_class_attendance(st.session_state.selected_class)
+    st.session_state.grid_version += 1
+    bump_state_version()
+
+def form_widget_key(turma, field, position):
+    """Key of a form widget; includes the date so each day keeps its own widget state"""
+    return f"{turma}_{current_day()}_{field}_idx_{position}"
+
+def copy_previous_day(class_attendance, source):
+    """Copy the saved marks of `source` (ISO date) into the selected date"""
+    store = get_attendance_store()
+    turma = class_attendance.turma
+    school, name = class_origin(turma)
+    try:
+        store.copy_day(school, name, source, current_day())
+        class_attendance.load_saved(store.load_class(school, name, current_day()))
+    except Exception as e:
+        st.error(f"Erro ao copiar as presenças: {e}")
+        return
+    # Os widgets do formulário e da grade voltam a ler as marcações copiadas
+    for i in range(len(class_attendance)):
+        for field in ("attendance", "observation"):
+            st.session_state.pop(form_widget_key(turma, field, i), None)
+    st.session_state.grid_version += 1
+    bump_state_version()
+    refresh_export_tab(f"Presenças de {date.fromisoformat(source):%d/%m/%Y} copiadas.")
+
+def go_to_student(match):
+    """Select the student's class and remember the row to highlight"""
+    st.session_state.class_selectbox = match.turma
+    st.session_state.search_target = (match.turma, match.position)
+
+def display_student_search():
+    """Search box over all loaded students (name or code, ignoring accents and case)"""
+    index = st.session_state.student_index
+    if index is None or not len(index):
+        return
+    
+    query = st.text_input(
+        "Buscar aluno",
+        key="student_search",
+        placeholder="Nome ou código do aluno, sem precisar de acentos"
+    )
+    if not query.strip():
+        return
+    
+    matches = index.search(query, limit=10)
+    if not matches:
+        st.caption("Nenhum aluno encontrado.")
+        return
+    for i, match in enumerate(matches):
+        code = f" ({match.code})" if match.code else ""
+        st.button(
+            f"{match.student}{code} - {match.turma}, nº {match.position + 1}",
+            key=f"search_result_{i}",
+            on_click=go_to_student,
+            args=(match,)
+        )
+
 def display_class_selection():
     """Display dropdown for class selection"""
     class_names = list(st.session_state.classes.keys())
     
     st.subheader("Turmas Disponíveis")
+    st.date_input(
+        "Data da chamada",
+        value=st.session_state.attendance_date,
+        max_value=date.today(),
+        key="attendance_date_input",
+        format="DD/MM/YYYY",
+        on_change=change_attendance_date
+    )
+    display_student_search()
     selected_class = st.selectbox(
         "Selecione uma turma:",
         class_names,
         index=0,
+        key="class_selectbox",
         placeholder="Escolha uma turma..."
     )
     
@@ -75,26 +345,18 @@ def display_class_selection():
         st.session_state.selected_class = selected_class
         st.session_state.students = st.session_state.classes[selected_class]
         
-        # -----------------------------------------------------------------------
-        # MUDANÇA 1: Em vez de sobrescrever attendance_status e observations,
-        # criamos/atualizamos subdicionários para a turma selecionada.
-        # -----------------------------------------------------------------------
-        
-        # Se essa turma ainda não existir no attendance_status, inicializamos
-        if selected_class not in st.session_state.attendance_status:
-            st.session_state.attendance_status[selected_class] = {}
-        if selected_class not in st.session_state.observations:
-            st.session_state.observations[selected_class] = {}
-        
-        # Garante que cada aluno da turma tenha uma entrada no dicionário
-        for student in st.session_state.students:
-            if student not in st.session_state.attendance_status[selected_class]:
-                st.session_state.attendance_status[selected_class][student] = None
-            if student not in st.session_state.observations[selected_class]:
-                st.session_state.observations[selected_class][student] = ""
+        # Cria a lista de chamada da turma apenas na primeira vez em que é selecionada,
+        # preservando as marcações já feitas ao alternar entre turmas
+        load_class_attendance(selected_class)
+        bump_state_version()
         
         st.success(f"Carregados {len(st.session_state.students)} alunos da turma {selected_class}")
         st.rerun()
+    
+    target = st.session_state.search_target
+    if target is not None and target[0] == st.session_state.selected_class:
+        student = st.session_state.students[target[1]]
+        st.info(f"{student} é o nº {target[1] + 1} da turma. Abra a aba Marcar Presença.")
 
 def display_attendance_form():
     """Display attendance form for selected class"""
@@ -103,26 +365,61 @@ def display_attendance_form():
         return
     
     st.subheader(f"Lista de Presença: {st.session_state.selected_class}")
-    st.write(f"Total de alunos: {len(st.session_state.students)}")
+    st.write(
+        f"Data: {st.session_state.attendance_date:%d/%m/%Y} - "
+        f"Total de alunos: {len(st.session_state.students)}"
+    )
+    
+    class_attendance = st.session_state.attendance.get(st.session_state.selected_class)
+    
+    # Turma ainda em branco nesta data: oferece copiar o último dia gravado
+    if not any(class_attendance.status) and not class_attendance.observations:
+        try:
+            source = get_attendance_store().previous_date(
+                *class_origin(class_attendance.turma), current_day()
+            )
+        except Exception:
+            source = None
+        if source and st.button(f"Copiar presenças de {date.fromisoformat(source):%d/%m/%Y}"):
+            copy_previous_day(class_attendance, source)
+    
+    # Linha do aluno encontrado na busca, destacada na lista
+    target = st.session_state.search_target
+    highlighted = target[1] if target is not None and target[0] == st.session_state.selected_class else None
+    if highlighted is not None:
+        st.info(f"Aluno buscado: nº {highlighted + 1} - {st.session_state.students[highlighted]}")
+    
+    edit_mode = st.radio(
+        "Modo de edição",
+        ["Formulário", "Grade"],
+        horizontal=True,
+        key="attendance_mode",
+        help="A grade usa um único componente para a turma inteira (mais leve em celulares)."
+    )
+    if edit_mode == "Grade":
+        with metrics.timed("render", mode="grid") as timer:
+            timer.add(rows=len(class_attendance))
+            display_attendance_grid(class_attendance)
+        return
     
     # Create a form for attendance marking
-    with st.form("attendance_form"):
+    with metrics.timed("render", mode="form") as timer, st.form("attendance_form"):
+        timer.add(rows=len(st.session_state.students))
         for i, student in enumerate(st.session_state.students):
             col1, col2, col3 = st.columns([3, 2, 5])
             
             with col1:
-                st.write(f"{i+1}. {student}")
+                if i == highlighted:
+                    st.markdown(f"**👉 {i+1}. {student}**")
+                else:
+                    st.write(f"{i+1}. {student}")
             
             with col2:
-                attendance_options = ["P", "F", "FJ"]
-                
-                # -----------------------------------------------------------------------
-                # MUDANÇA 2: Pegamos o status do subdicionário da turma selecionada
-                # -----------------------------------------------------------------------
-                current_status = st.session_state.attendance_status[st.session_state.selected_class].get(student, None)
+                attendance_options = list(STATUS_OPTIONS)
+                current_status = class_attendance.get_status_at(i)
                 
                 index_value = attendance_options.index(current_status) if current_status in attendance_options else 0
-                attendance_key = f"{st.session_state.selected_class}_attendance_idx_{i}"
+                attendance_key = form_widget_key(st.session_state.selected_class, "attendance", i)
                 
                 status = st.radio(
                     "Status",
@@ -134,8 +431,8 @@ def display_attendance_form():
                 )
             
             with col3:
-                observation_key = f"{st.session_state.selected_class}_observation_idx_{i}"
-                current_observation = st.session_state.observations[st.session_state.selected_class].get(student, "")
+                observation_key = form_widget_key(st.session_state.selected_class, "observation", i)
+                current_observation = class_attendance.get_observation_at(i)
                 
                 observation = st.text_input(
                     "Observação",
@@ -150,110 +447,376 @@ def display_attendance_form():
         submit_button = st.form_submit_button("Salvar Presença")
         
         if submit_button:
-            # Update session state with form values
-            for i, student in enumerate(st.session_state.students):
-                attendance_key = f"{st.session_state.selected_class}_attendance_idx_{i}"
-                observation_key = f"{st.session_state.selected_class}_observation_idx_{i}"
+            # Só as entradas que mudaram no formulário são atualizadas, e só as que
+            # diferem do banco são gravadas
+            turma = st.session_state.selected_class
+            for i in range(len(class_attendance)):
+                status = st.session_state.get(form_widget_key(turma, "attendance", i))
+                if status is not None and status != class_attendance.get_status_at(i):
+                    class_attendance.set_status_at(i, status)
                 
-                if attendance_key in st.session_state:
-                    status_value = st.session_state[attendance_key]
-                    # -----------------------------------------------------------------------
-                    # MUDANÇA 2 (continuação): Salvar no subdicionário da turma
-                    # -----------------------------------------------------------------------
-                    st.session_state.attendance_status[st.session_state.selected_class][student] = status_value
-                
-                if observation_key in st.session_state:
-                    st.session_state.observations[st.session_state.selected_class][student] = st.session_state[observation_key]
+                observation = st.session_state.get(form_widget_key(turma, "observation", i))
+                if observation is not None and observation != class_attendance.get_observation_at(i):
+                    class_attendance.set_observation_at(i, observation)
             
-            st.success("Dados de presença salvos com sucesso!")
+            if not class_attendance.changes():
+                st.info("Nenhuma alteração para salvar.")
+            elif save_class_attendance(class_attendance):
+                refresh_export_tab("Dados de presença salvos com sucesso!")
+
+def display_attendance_grid(class_attendance):
+    """Display attendance for the selected class as a single editable grid"""
+    # pandas só é carregado quando a grade é usada, não na inicialização
+    import pandas as pd
+    
+    col1, col2, _ = st.columns([2, 2, 6])
+    with col1:
+        if st.button("Marcar todos como presentes"):
+            class_attendance.mark_all("P")
+            st.session_state.grid_version += 1
+            bump_state_version()
+            refresh_export_tab()
+    with col2:
+        if st.button("Marcar restantes como falta"):
+            class_attendance.mark_unmarked("F")
+            st.session_state.grid_version += 1
+            bump_state_version()
+            refresh_export_tab()
+    
+    students, statuses, observations = zip(*class_attendance.rows())
+    grid = pd.DataFrame({
+        "Aluno": students,
+        "Presença": pd.Categorical(statuses, categories=STATUS_OPTIONS),
+        "Observação": observations,
+    })
+    
+    with st.form("attendance_grid_form"):
+        # A chave muda após as ações em massa para que a grade descarte edições antigas
+        edited = st.data_editor(
+            grid,
+            key=f"{st.session_state.selected_class}_grid_{st.session_state.grid_version}",
+            hide_index=True,
+            num_rows="fixed",
+            width="stretch",
+            disabled=["Aluno"],
+            column_config={
+                "Aluno": st.column_config.TextColumn("Aluno", width="large"),
+                "Presença": st.column_config.SelectboxColumn("Presença", options=list(STATUS_OPTIONS)),
+                "Observação": st.column_config.TextColumn("Observação", width="large"),
+            }
+        )
+        
+        if st.form_submit_button("Salvar Presença"):
+            # Atualização vetorizada: uma conversão por coluna em vez de um laço por aluno
+            # (o código da categoria é -1 para células vazias, logo +1 vira "não marcado")
+            codes = (pd.Categorical(edited["Presença"], categories=STATUS_OPTIONS).codes + 1).astype("uint8")
+            notes = edited["Observação"].fillna("")
+            notes = notes[notes != ""]
+            class_attendance.replace_marks(codes.tobytes(), dict(zip(notes.index, notes)))
+            if not class_attendance.changes():
+                st.info("Nenhuma alteração para salvar.")
+            elif save_class_attendance(class_attendance):
+                refresh_export_tab("Dados de presença salvos com sucesso!")
+
+# Rótulo exibido -> formato; "xlsx" é a planilha formatada, os demais são tabulares
+EXPORT_FORMATS = {
+    "Excel (XLSX)": "xlsx",
+    "Parquet (análise)": "parquet",
+    "Arrow IPC (análise)": "arrow",
+    "CSV (análise)": "csv",
+}
 
+@st.fragment
 def export_attendance():
-    """Export attendance data as Excel (XLSX) with a header and group by turma"""
+    """Export attendance data as Excel (XLSX) grouped by turma, or as a tidy table for analysis"""
     if not st.session_state.file_uploaded or not st.session_state.classes:
         st.warning("Por favor, faça o upload de um arquivo HTML primeiro.")
         return
     
     st.subheader("Exportar Lista de Presença")
     
-    # Tenta extrair o nome da escola do HTML, se possível
-    school_name = "Escola"
-    if st.session_state.html_content:
-        match = re.search(r'(PREFEITURA MUNICIPAL [^\n]+)', st.session_state.html_content)
-        if match:
-            school_name = match.group(1).strip()
-    
-    # Cria um novo Workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Lista de Presença"
-    
-    # Cabeçalho com o nome da escola (mesclado em A1:C1)
-    ws.merge_cells("A1:C1")
-    ws["A1"] = school_name
-    ws["A1"].font = Font(bold=True, size=14)
-    ws["A1"].alignment = Alignment(horizontal="center")
-    
-    current_row = 3  # Inicia na linha 3
-    
-    # Itera por todas as turmas
-    for turma, alunos in st.session_state.classes.items():
-        # Adiciona a linha da turma
-        ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=3)
-        ws.cell(row=current_row, column=1).value = f"Turma: {turma}"
-        ws.cell(row=current_row, column=1).font = Font(bold=True, size=12)
-        ws.cell(row=current_row, column=1).alignment = Alignment(horizontal="left")
-        current_row += 1
-        
-        # Cabeçalho da tabela para a turma
-        ws.cell(row=current_row, column=1).value = "Aluno"
-        ws.cell(row=current_row, column=2).value = "Presença"
-        ws.cell(row=current_row, column=3).value = "Observação"
-        for col in range(1, 4):
-            ws.cell(row=current_row, column=col).font = Font(bold=True)
-            ws.cell(row=current_row, column=col).alignment = Alignment(horizontal="center")
-        current_row += 1
-        
-        # Para cada aluno da turma, adiciona os dados de presença e observação
-        for student in alunos:
-            ws.cell(row=current_row, column=1).value = student
-            
-            # -----------------------------------------------------------------------
-            # MUDANÇA 3: Agora buscamos do subdicionário: st.session_state.attendance_status[turma]
-            # -----------------------------------------------------------------------
-            presence = ""
-            observation = ""
-            
-            if turma in st.session_state.attendance_status:
-                presence = st.session_state.attendance_status[turma].get(student, "")
-            if turma in st.session_state.observations:
-                observation = st.session_state.observations[turma].get(student, "")
-            
-            ws.cell(row=current_row, column=2).value = presence
-            ws.cell(row=current_row, column=3).value = observation
-            current_row += 1
-        
-        # Linha vazia entre turmas
-        current_row += 1
+    format_label = st.selectbox("Formato", list(EXPORT_FORMATS), key="export_format")
+    fmt = EXPORT_FORMATS[format_label]
+    if fmt == "xlsx":
+        options = (st.checkbox("Uma planilha por turma", key="export_sheet_per_turma"),)
+    else:
+        options = tabular_export_options()
+        if options is None:
+            return
+    
+    # O arquivo só é gerado quando pedido e fica guardado enquanto os dados
+    # (versão da sessão) e as opções não mudarem
+    cache_key = (st.session_state.state_version, fmt, options)
+    export = st.session_state.export_cache
+    if export is not None and export["key"] != cache_key:
+        st.info("Os dados ou as opções mudaram desde a última geração do arquivo.")
+        discard_export()
+        export = None
+    
+    if export is None:
+        if not st.button("Gerar arquivo", type="primary"):
+            return
+        with metrics.timed("export", format=fmt) as timer:
+            export = build_export(fmt, options)
+            if export is not None:
+                timer.add(rows=export["rows"], bytes=export["size"])
+        if export is None:
+            return
+        export["key"] = cache_key
+        st.session_state.export_cache = export
+    
+    st.download_button(
+        f"Baixar {format_label}",
+        # Lido só quando o botão é clicado, não a cada reexecução
+        lambda: read_export(export),
+        export["file_name"],
+        export["mime_type"]
+    )
+    
+    # O envio ao Drive roda em segundo plano; a página não espera pela resposta.
+    # A chave (escolas, data ou período, arquivo) faz reenvios atualizarem o mesmo arquivo no Drive,
+    # e um conteúdo igual ao último enviado nem chega a ser enviado
+    if st.button("Enviar para o Google Drive"):
+        # O arquivo do Drive é compartilhado por todas as sessões: se outra sessão gravou
+        # presenças desde a geração, o arquivo é refeito para não sobrescrevê-las
+        attendance = export_attendance_book() if fmt == "xlsx" else None
+        if export_content_hash(fmt, options, attendance) != export["sha256"]:
+            fresh = build_export(fmt, options, attendance)
+            if fresh is None:
+                return
+            discard_export()
+            # O botão de download acima lê `export` só no clique: passa a baixar o novo arquivo
+            export = fresh
+            export["key"] = cache_key
+            st.session_state.export_cache = export
+        job_id = get_export_queue().enqueue(
+            read_export(export),
+            export["file_name"],
+            export["mime_type"],
+            os.environ.get("PAESTRO_DRIVE_FOLDER", "Paestro"),
+            export["drive_key"],
+            export["sha256"]
+        )
+        st.session_state.drive_jobs.append(job_id)
+    
+    if st.session_state.drive_jobs:
+        display_drive_jobs()
+
+def export_attendance_book():
+    """
+    Attendance of every session class on the selected date, as exported: the marks saved
+    in the database (by this or any other session), with this session's unsaved edits on top
+    """
+    store = get_attendance_store()
+    day = current_day()
+    saved = {school: store.load_day(school, day) for school in session_schools()}
+    book = AttendanceBook()
+    for turma, students in st.session_state.classes.items():
+        school, name = class_origin(turma)
+        class_attendance = book.ensure_class(turma, students)
+        class_attendance.load_saved(saved.get(school, {}).get(name, {}))
+        # A sessão só conhece as turmas que abriu; das demais, vale o que está no banco
+        edited = st.session_state.attendance.get(turma)
+        if edited is not None:
+            for position in edited.changes():
+                class_attendance.set_status_at(position, edited.get_status_at(position))
+                class_attendance.set_observation_at(position, edited.get_observation_at(position))
+    return book
+
+def tabular_export_options():
+    """
+    Schools and period of a tabular export, read from the database; None while the
+    period is incomplete
+    """
+    day = st.session_state.attendance_date
+    st.caption(
+        "Uma linha por aluno e dia, com as presenças salvas no banco: escola, turma, data, "
+        "aluno, presença e observação."
+    )
+    schools = session_schools()
+    try:
+        known = get_attendance_store().school_names()
+    except Exception:
+        known = []
+    col1, col2 = st.columns(2)
+    with col1:
+        selected = st.multiselect(
+            "Escolas",
+            list(dict.fromkeys(schools + known)),
+            default=schools,
+            key="export_schools"
+        )
+    with col2:
+        period = st.date_input("Período", value=(day, day), format="DD/MM/YYYY", key="export_period")
+    if not selected:
+        st.info("Escolha ao menos uma escola.")
+        return None
+    if len(period) < 2:
+        st.info("Escolha a data final do período.")
+        return None
+    attendance = st.session_state.attendance
+    if any(attendance.get(turma) is not None and attendance.get(turma).changes()
+           for turma in st.session_state.classes):
+        st.warning("Há presenças não salvas nesta sessão; elas não entram no arquivo.")
+    return tuple(selected), period[0], period[1]
+
+def build_export(fmt, options, attendance=None):
+    """Generate the export file for the current session data; returns None on failure"""
+    if fmt != "xlsx":
+        return build_tabular_export(fmt, options)
     
-    # Ajusta largura das colunas
-    ws.column_dimensions["A"].width = 30
-    ws.column_dimensions["B"].width = 15
-    ws.column_dimensions["C"].width = 40
+    if attendance is None:
+        try:
+            attendance = export_attendance_book()
+        except Exception as e:
+            st.error(f"Erro ao ler as presenças salvas: {e}")
+            return None
+    # Tenta extrair o nome da escola do HTML, se possível
+    school_name = get_school_name()
+    file_name = f"Presenca_{st.session_state.attendance_date:%Y%m%d}.xlsx"
+    (sheet_per_turma,) = options
     
-    output = io.BytesIO()
     try:
-        wb.save(output)
-        excel_data = output.getvalue()
-        file_base_name = f"Presenca_{datetime.now().strftime('%Y%m%d')}"
-        st.download_button(
-            "Baixar Excel (XLSX)",
-            excel_data,
-            f"{file_base_name}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        # Gravação em streaming (openpyxl write_only) para um arquivo temporário
+        output, rows = export_to_tempfile(
+            school_name,
+            st.session_state.classes,
+            attendance,
+            sheet_per_turma=sheet_per_turma,
+            schools=st.session_state.schools
         )
     except Exception as e:
         st.error(f"Erro ao criar arquivo Excel: {e}")
         st.info("Por favor, baixe o arquivo CSV como alternativa.")
+        return None
+    
+    return new_export(output, rows, file_name, XLSX_MIME_TYPE,
+                      export_content_hash(fmt, options, attendance),
+                      export_key(school_name, current_day(), file_name))
+
+def build_tabular_export(fmt, options):
+    """Generate a Parquet/Arrow/CSV file with the saved marks of the chosen schools and period"""
+    schools, start, end = options
+    extension, mime_type = COLUMNAR_FORMATS[fmt]
+    period = f"{start:%Y%m%d}" if start == end else f"{start:%Y%m%d}_{end:%Y%m%d}"
+    file_name = f"Presenca_{period}{extension}"
+    try:
+        output, rows = export_store_to_tempfile(fmt, get_attendance_store(), schools, start, end)
+        sha256 = export_content_hash(fmt, options)
+    except Exception as e:
+        st.error(f"Erro ao criar o arquivo {fmt.upper()}: {e}")
+        return None
+    if not rows:
+        output.close()
+        st.warning("Não há presenças salvas dessas escolas no período escolhido.")
+        return None
+    return new_export(output, rows, file_name, mime_type, sha256, export_key(*schools, file_name))
+
+def new_export(output, rows, file_name, mime_type, sha256, drive_key):
+    """
+    Cached export entry. The spooled file itself is kept (in memory up to 16 MB, then on
+    disk), not its bytes: they are only read when downloaded or sent to Drive
+    """
+    output.seek(0, os.SEEK_END)
+    size = output.tell()
+    output.seek(0)
+    return {"file": output, "size": size, "rows": rows, "lock": threading.Lock(),
+            "file_name": file_name, "mime_type": mime_type, "sha256": sha256,
+            "drive_key": drive_key}
+
+def read_export(export):
+    """Contents of a cached export; may run in the download handler's thread"""
+    with export["lock"]:
+        export["file"].seek(0)
+        return export["file"].read()
+
+def discard_export():
+    """Drop the cached export and its temporary file"""
+    export = st.session_state.export_cache
+    st.session_state.export_cache = None
+    if export is not None:
+        with export["lock"]:
+            export["file"].close()
+
+def export_content_hash(fmt, options, attendance=None):
+    """Hash of the exported rows and options; stable across generations, unlike XLSX bytes"""
+    if fmt != "xlsx":
+        schools, start, end = options
+        return records_sha256(iter_store_records(get_attendance_store(), schools, start, end), fmt, *options)
+    records = iter_records(
+        get_school_name(),
+        st.session_state.classes,
+        attendance,
+        st.session_state.attendance_date,
+        st.session_state.schools
+    )
+    return records_sha256(records, fmt, *options, get_school_name())
+
+@st.fragment(run_every=3)
+def display_drive_jobs():
+    """Show the status of this session's Drive uploads, refreshing on its own"""
+    st.caption("Envios para o Google Drive")
+    queue = get_export_queue()
+    for job_id in reversed(st.session_state.drive_jobs):
+        job = queue.get_job(job_id)
+        if job is None:
+            continue
+        if job["status"] == DONE:
+            if job["action"] == "unchanged":
+                st.success(f"{job['filename']}: sem alterações desde o último envio - {job['url']}")
+            elif job["action"] == "updated":
+                st.success(f"{job['filename']}: atualizado - {job['url']}")
+            else:
+                st.success(f"{job['filename']}: enviado - {job['url']}")
+        elif job["status"] == FAILED:
+            st.error(f"{job['filename']}: falhou após {job['attempts']} tentativa(s) - {job['error']}")
+        else:
+            detail = f" (tentativa {job['attempts']}: {job['error']})" if job["error"] else ""
+            st.info(f"{job['filename']}: aguardando envio{detail}")
+
+def summary_frame(rows):
+    """Summary rows (P/F/FJ counts) as a table with absence rates"""
+    import pandas as pd
+    
+    frame = pd.DataFrame(rows)
+    total = frame["present"] + frame["absent"] + frame["justified"]
+    frame["absence_rate"] = ((frame["absent"] + frame["justified"]) / total.where(total > 0) * 100).round(1)
+    frame["unjustified_rate"] = (frame["absent"] / total.where(total > 0) * 100).round(1)
+    return frame.rename(columns={
+        "school": "Escola", "turma": "Turma", "student": "Aluno", "date": "Data", "days": "Dias",
+        "present": "P", "absent": "F", "justified": "FJ",
+        "absence_rate": "Faltas (%)", "unjustified_rate": "Faltas sem justificativa (%)",
+    })
+
+def display_summary():
+    """Absence rates per turma, student and day, read from the summaries kept by the store"""
+    schools = session_schools()
+    school = schools[0]
+    if len(schools) > 1:
+        school = st.selectbox("Escola:", schools, key="summary_school")
+    store = get_attendance_store()
+    try:
+        turmas = store.turma_summaries(school)
+    except Exception as e:
+        st.error(f"Erro ao ler os resumos: {e}")
+        return
+    if not turmas:
+        st.info("Nenhuma presença gravada ainda para esta escola.")
+        return
+    
+    st.subheader(f"Faltas por turma - {school}")
+    st.dataframe(summary_frame(turmas), hide_index=True, width="stretch")
+    
+    turma = st.selectbox("Detalhar turma:", [row["turma"] for row in turmas], key="summary_turma")
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.caption("Por aluno")
+        st.dataframe(summary_frame(store.student_summaries(school, turma)),
+                     hide_index=True, width="stretch")
+    with col2:
+        st.caption("Por dia")
+        st.dataframe(summary_frame(store.daily_summaries(school, turma)),
+                     hide_index=True, width="stretch")
 
 def reset_app():
     """Reset app state"""
@@ -262,19 +825,92 @@ def reset_app():
             del st.session_state[key]
         st.rerun()
 
+def debug_enabled():
+    """Debug panel is shown with PAESTRO_DEBUG=1 or ?debug=1 in the URL"""
+    return os.environ.get("PAESTRO_DEBUG") == "1" or st.query_params.get("debug") == "1"
+
+def store_profile_report(report):
+    """Keep the profiling report in the session (called even if the run is interrupted)"""
+    st.session_state.profile_report = report
+
+def display_debug_panel():
+    """Sidebar panel with per-operation timings and single-rerun profiling"""
+    with st.sidebar.expander("Depuração", expanded=False):
+        rows = metrics.snapshot()
+        if rows:
+            st.dataframe(
+                [
+                    {
+                        "Operação": " ".join([row["op"], *row["labels"].values()]),
+                        "Chamadas": row["calls"],
+                        "Erros": row["errors"],
+                        "p50 (ms)": round(row["p50"] * 1000, 1),
+                        "p95 (ms)": round(row["p95"] * 1000, 1),
+                        "Máx. (ms)": round(row["max"] * 1000, 1),
+                        "Linhas": row["rows"],
+                        "KiB": round(row["bytes"] / 1024, 1),
+                    }
+                    for row in rows
+                ],
+                hide_index=True,
+                width="stretch"
+            )
+            st.download_button("Baixar métricas (Prometheus)", metrics.prometheus_text(),
+                               "paestro_metrics.prom", "text/plain")
+        else:
+            st.caption("Nenhuma operação medida ainda.")
+        
+        # O perfilamento vale para a próxima execução completa da página
+        # (interações dentro de fragmentos não reexecutam a página inteira)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("cProfile", help="Perfila a próxima execução da página"):
+                st.session_state.profile_next = "cprofile"
+        with col2:
+            if st.button("tracemalloc", help="Mede as alocações da próxima execução da página"):
+                st.session_state.profile_next = "tracemalloc"
+        if st.session_state.profile_next:
+            st.caption(f"{st.session_state.profile_next} ativo na próxima execução.")
+
+def display_profile_report():
+    """Report of the last profiled run, shown after the page so it covers all of it"""
+    report = st.session_state.profile_report
+    if not report:
+        return
+    with st.sidebar.expander("Último perfilamento", expanded=False):
+        st.download_button("Baixar relatório", report, "paestro_profile.txt", "text/plain")
+        st.code(report[:5000], language=None)
+
 def main():
     """Main application function"""
-    st.title("📋 Sistema de Controle de Presença")
-    
     # Initialize session state
     initialize_session_state()
     
+    mode = st.session_state.profile_next
+    try:
+        if mode:
+            st.session_state.profile_next = None
+            metrics.profile(render_page, store_profile_report, mode)
+        else:
+            render_page()
+    finally:
+        metrics.write_prometheus()
+    
+    if debug_enabled():
+        display_profile_report()
+
+def render_page():
+    """Render the whole page"""
+    st.title("📋 Sistema de Controle de Presença")
+    
     # App layout using tabs
-    tab1, tab2, tab3 = st.tabs(["Upload", "Marcar Presença", "Exportar"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Upload", "Marcar Presença", "Exportar", "Resumo"])
     
     with tab1:
         st.header("Importar Arquivo HTML")
         file_uploaded = handle_file_upload()
+        handle_batch_upload()
+        file_uploaded = file_uploaded or st.session_state.file_uploaded
         
         if file_uploaded:
             display_class_selection()
@@ -282,7 +918,8 @@ def main():
     with tab2:
         st.header("Marcar Presença")
         if st.session_state.file_uploaded:
-            display_attendance_form()
+            # Fragmento: editar presenças não reexecuta as abas de upload e exportação
+            st.fragment(display_attendance_form)()
         else:
             st.info("Por favor, faça o upload de um arquivo HTML primeiro.")
     
@@ -293,9 +930,21 @@ def main():
         else:
             st.info("Por favor, faça o upload de um arquivo HTML e marque a presença primeiro.")
     
+    with tab4:
+        st.header("Resumo de Faltas")
+        display_summary()
+    
     # Add a reset button on the sidebar
     st.sidebar.header("Ações")
     reset_app()
+    
+    cache_stats = get_roster_cache().stats()
+    st.sidebar.caption(
+        f"Cache de relatórios: {cache_stats['hits']} acertos / {cache_stats['misses']} falhas"
+    )
+    
+    if debug_enabled():
+        display_debug_panel()
 
 if __name__ == "__main__":
     main()
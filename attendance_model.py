@@ -0,0 +1,233 @@
+"""
+Modelo compacto de presença por turma.
+
+Em vez de dicionários de dicionários indexados pelo nome completo do aluno, cada turma
+guarda a situação de todos os alunos em um `bytearray` (um byte por aluno, na ordem da
+lista de chamada) e apenas as observações preenchidas, em um dicionário esparso. Os
+alunos não ganham um objeto próprio: até um objeto com `__slots__` custa mais que as
+duas entradas de dicionário que ele substituiria.
+
+Cada turma também guarda uma cópia do que já foi gravado no banco (a "base"); ao salvar,
+apenas as posições que diferem da base são enviadas. Um `AttendanceBook` corresponde a
+um dia de chamada.
+"""
+
+STATUS_OPTIONS = ("P", "F", "FJ")
+
+# Código 0 = ainda não marcado
+_STATUS_CODES = {status: code for code, status in enumerate(STATUS_OPTIONS, start=1)}
+_STATUS_VALUES = (None,) + STATUS_OPTIONS
+
+
+def status_code(status):
+    """Converte "P"/"F"/"FJ" (ou None) no código armazenado."""
+    if status is None or status == "":
+        return 0
+    try:
+        return _STATUS_CODES[status]
+    except KeyError:
+        raise ValueError(f"Situação de presença inválida: {status!r}") from None
+
+
+def status_value(code):
+    """Converte um código armazenado de volta em "P"/"F"/"FJ" (ou None)."""
+    return _STATUS_VALUES[code]
+
+
+class ClassAttendance:
+    """Lista de chamada de uma turma com a presença indexada pela posição do aluno."""
+
+    __slots__ = ("turma", "students", "status", "observations", "_index",
+                 "_saved_status", "_saved_observations")
+
+    def __init__(self, turma, students):
+        self.turma = turma
+        # Os nomes são os mesmos objetos str da lista de turmas, sem cópia por aluno
+        self.students = tuple(students)
+        self.status = bytearray(len(self.students))
+        self.observations = {}  # posição -> texto, apenas quando preenchida
+        self._index = None
+        # Base: o que está gravado no banco (nada, até a primeira leitura ou gravação)
+        self._saved_status = bytearray(len(self.students))
+        self._saved_observations = {}
+
+    def __len__(self):
+        return len(self.students)
+
+    def index_of(self, student):
+        """Posição do aluno na lista de chamada (a primeira, se o nome se repetir)."""
+        if self._index is None:
+            # Montado apenas quando alguém busca por nome; a tela usa as posições
+            index = {}
+            for position, name in enumerate(self.students):
+                index.setdefault(name, position)
+            self._index = index
+        return self._index[student]
+
+    def get_status_at(self, position):
+        return _STATUS_VALUES[self.status[position]]
+
+    def set_status_at(self, position, status):
+        self.status[position] = status_code(status)
+
+    def get_observation_at(self, position):
+        return self.observations.get(position, "")
+
+    def set_observation_at(self, position, observation):
+        if observation:
+            self.observations[position] = observation
+        else:
+            self.observations.pop(position, None)
+
+    def get_status(self, student):
+        return self.get_status_at(self.index_of(student))
+
+    def set_status(self, student, status):
+        self.set_status_at(self.index_of(student), status)
+
+    def get_observation(self, student):
+        return self.get_observation_at(self.index_of(student))
+
+    def set_observation(self, student, observation):
+        self.set_observation_at(self.index_of(student), observation)
+
+    def replace_marks(self, codes, observations):
+        """
+        Substitui todas as marcações da turma de uma só vez.
+
+        Parâmetros:
+          codes: sequência de códigos (bytes-like), um por aluno, na ordem da lista.
+          observations: dict posição -> texto; textos vazios são descartados.
+        """
+        if len(codes) != len(self.status):
+            raise ValueError("A quantidade de marcações não corresponde à turma.")
+        self.status[:] = codes
+        self.observations = {pos: text for pos, text in observations.items() if text}
+
+    def load_saved(self, marks):
+        """
+        Aplica marcações lidas do banco, atualizando também a base.
+
+        Parâmetros:
+          marks: dict aluno -> (situação, observação); alunos fora da lista são ignorados.
+        """
+        for student, (status, observation) in marks.items():
+            try:
+                position = self.index_of(student)
+            except KeyError:
+                continue
+            self.set_status_at(position, status)
+            self.set_observation_at(position, observation)
+            self._saved_status[position] = self.status[position]
+            self._set_saved_observation(position, observation)
+
+    def changes(self):
+        """
+        Posições cuja situação ou observação difere do que está gravado.
+
+        A comparação das situações é feita de uma vez entre os dois bytearrays; só
+        quando eles diferem as posições são procuradas uma a uma.
+        """
+        changed = set()
+        if self.status != self._saved_status:
+            saved = self._saved_status
+            changed.update(i for i, code in enumerate(self.status) if code != saved[i])
+        if self.observations != self._saved_observations:
+            saved = self._saved_observations
+            changed.update(
+                position for position in self.observations.keys() | saved.keys()
+                if self.observations.get(position, "") != saved.get(position, "")
+            )
+        return sorted(changed)
+
+    def changed_rows(self, positions=None):
+        """(aluno, situação, observação) apenas das posições alteradas (ou das indicadas)."""
+        if positions is None:
+            positions = self.changes()
+        return [
+            (self.students[i], _STATUS_VALUES[self.status[i]], self.observations.get(i, ""))
+            for i in positions
+        ]
+
+    def mark_saved(self, positions=None):
+        """Atualiza a base após uma gravação das `positions` (todas, se omitidas)."""
+        if positions is None:
+            self._saved_status[:] = self.status
+            self._saved_observations = dict(self.observations)
+            return
+        for i in positions:
+            self._saved_status[i] = self.status[i]
+            self._set_saved_observation(i, self.observations.get(i, ""))
+
+    def _set_saved_observation(self, position, observation):
+        if observation:
+            self._saved_observations[position] = observation
+        else:
+            self._saved_observations.pop(position, None)
+
+    def mark_all(self, status):
+        """Marca todos os alunos com a mesma situação."""
+        self.status[:] = bytes([status_code(status)]) * len(self.status)
+
+    def mark_unmarked(self, status):
+        """Marca com `status` apenas os alunos ainda sem marcação."""
+        self.status[:] = self.status.replace(b"\x00", bytes([status_code(status)]))
+
+    def rows(self):
+        """Gera (aluno, situação, observação) na ordem da lista de chamada."""
+        observations = self.observations
+        for position, name in enumerate(self.students):
+            yield (
+                name,
+                _STATUS_VALUES[self.status[position]],
+                observations.get(position, ""),
+            )
+
+
+class AttendanceBook:
+    """Presença de todas as turmas de uma sessão em um dia de chamada."""
+
+    __slots__ = ("_classes",)
+
+    def __init__(self):
+        self._classes = {}
+
+    def __contains__(self, turma):
+        return turma in self._classes
+
+    def __len__(self):
+        return len(self._classes)
+
+    def ensure_class(self, turma, students):
+        """Retorna a turma, criando-a (sem marcações) se ainda não existir."""
+        attendance = self._classes.get(turma)
+        if attendance is None:
+            attendance = self._classes[turma] = ClassAttendance(turma, students)
+        return attendance
+
+    def get(self, turma):
+        return self._classes.get(turma)
+
+    def get_status(self, turma, student, default=None):
+        attendance = self._classes.get(turma)
+        if attendance is None:
+            return default
+        try:
+            return attendance.get_status(student)
+        except KeyError:
+            return default
+
+    def set_status(self, turma, student, status):
+        self._classes[turma].set_status(student, status)
+
+    def get_observation(self, turma, student, default=""):
+        attendance = self._classes.get(turma)
+        if attendance is None:
+            return default
+        try:
+            return attendance.get_observation(student)
+        except KeyError:
+            return default
+
+    def set_observation(self, turma, student, observation):
+        self._classes[turma].set_observation(student, observation)
@@ -1,6 +1,70 @@
-from lxml import html
+from collections import namedtuple
+from datetime import datetime
+import codecs
+import io
+import os
 import re
 
+_TURMA_RE = re.compile(r'Turma:\s*(.+?\))')
+_LETTER_RE = re.compile(r'[A-Za-zÀ-ÖØ-öø-ÿ]')
+_STRING = None  # XPath "string()" compilado, criado junto com a importação do lxml
+
+# "0001 - 1º ANO A (MATUTINO)" -> código, nome e turno
+_TURMA_PARTS_RE = re.compile(r'^(?:(\w+)\s+-\s+)?(.*?)\s*(?:\(([^()]*)\))?$')
+_EMITTED_RE = re.compile(r'Emitido em\s*(\d{2}/\d{2}/\d{4})(?:\s+(\d{2}:\d{2}))?')
+
+TurmaInfo = namedtuple("TurmaInfo", ["code", "name", "shift"])
+
+# Início do arquivo examinado em busca da codificação declarada (<meta charset>, BOM)
+_PRESCAN_BYTES = 8192
+_DECLARED_CHARSET_RE = re.compile(
+    rb'<meta[^>]*charset\s*=|^\s*<\?xml[^>]*encoding\s*=', re.IGNORECASE)
+_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+class ParsedReport:
+    """
+    Resultado do processamento de um relatório: as turmas e os metadados lidos do
+    cabeçalho, extraídos na mesma passada. Substitui guardar o HTML inteiro para
+    consultas posteriores.
+    """
+
+    __slots__ = ("classes", "school_name", "municipality", "emitted_at", "turmas", "codes")
+
+    def __init__(self, classes=None, school_name=None, municipality=None, emitted_at=None,
+                 turmas=None, codes=None):
+        self.classes = classes if classes is not None else {}  # turma -> [alunos]
+        self.school_name = school_name
+        self.municipality = municipality
+        self.emitted_at = emitted_at  # datetime, ou None se o relatório não informar
+        self.turmas = turmas if turmas is not None else {}  # turma -> TurmaInfo
+        # turma -> [códigos dos alunos], na mesma ordem de `classes` ("" se ausente)
+        self.codes = codes if codes is not None else {}
+
+    def to_dict(self):
+        """Representação em tipos JSON, usada pelo cache em disco."""
+        return {
+            "classes": self.classes,
+            "school_name": self.school_name,
+            "municipality": self.municipality,
+            "emitted_at": self.emitted_at.isoformat() if self.emitted_at else None,
+            "turmas": {turma: list(info) for turma, info in self.turmas.items()},
+            "codes": self.codes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói o resultado a partir de `to_dict`, com listas próprias."""
+        emitted_at = data.get("emitted_at")
+        return cls(
+            {turma: list(alunos) for turma, alunos in data["classes"].items()},
+            data.get("school_name"),
+            data.get("municipality"),
+            datetime.fromisoformat(emitted_at) if emitted_at else None,
+            {turma: TurmaInfo(*info) for turma, info in data.get("turmas", {}).items()},
+            {turma: list(codes) for turma, codes in data.get("codes", {}).items()},
+        )
+
 def parse_html_content(html_content):
     """
     Processa cada tabela com classe "jrPage" para extrair turmas e alunos.
@@ -13,88 +77,252 @@ def parse_html_content(html_content):
       4. A partir da linha imediatamente após o cabeçalho, extrai os nomes dos alunos (usando a célula da coluna "Nome")
          até encontrar uma linha que contenha "Total de Matrículas" ou "Turma:".
       5. Se a turma continuar em outra tabela (sem um novo marcador "Turma:"), continua a extração de alunos.
+    
+    Os passos 1 a 4 são feitos em uma única passada por tabela (ver `parse_html_stream`).
          
     Retorna:
       dict: Chave = nome da turma, Valor = lista de nomes de alunos.
     """
-    tree = html.fromstring(html_content)
-    classes = {}
-    current_turma = None  # Para armazenar a última turma processada
+    return parse_html_stream(html_content)
+
+def _scan_table(table, current_turma):
+    """
+    Percorre uma única vez as linhas de uma tabela "jrPage".
     
-    # Processa cada tabela principal (geralmente com classe "jrPage")
-    tables = tree.xpath("//table[contains(@class, 'jrPage')]")
+    Cada <tr> tem o texto calculado apenas uma vez; a mesma passada detecta a linha
+    "Turma:", o cabeçalho "Código"/"Nome" e coleta os alunos. Os alunos só são
+    atribuídos à turma no fim da tabela, pois a linha "Turma:" vale para a tabela toda.
     
-    for table in tables:
-        rows = table.xpath(".//tr")
-        turma_row = None
-        
-        # Procura a primeira linha que contenha "Turma:" (mas não "Total de Matrículas")
-        for row in rows:
-            row_text = row.text_content().strip()
-            if "Turma:" in row_text and "Total de Matrículas" not in row_text:
-                turma_row = row
-                break
+    Retorna:
+      tuple: (turma vigente após a tabela, alunos encontrados na tabela, códigos desses
+              alunos na coluna "Código", ou "" quando ausente).
+    """
+    turma_found = False
+    nome_index = None
+    codigo_index = None
+    header_seen = False
+    collecting = False
+    students = []
+    codes = []
+    
+    for row in table.iter("tr"):
+        row_text = _text(row).strip()
         
-        if turma_row:
-            # Extrai o nome da turma: tudo após "Turma:" até o primeiro ")".
-            turma_text = turma_row.text_content().strip()
-            match = re.search(r'Turma:\s*(.+?\))', turma_text)
+        # Apenas a primeira linha "Turma:" (que não seja o rodapé) define a turma
+        if not turma_found and "Turma:" in row_text and "Total de Matrículas" not in row_text:
+            turma_found = True
+            match = _TURMA_RE.search(row_text)
             if match:
                 current_turma = match.group(1).strip()
-                if current_turma not in classes:
-                    classes[current_turma] = []
         
-        if not current_turma:
-            continue  # Se nenhuma turma foi definida, pula a tabela
-        
-        # Procura a linha de cabeçalho que contenha "Código" e "Nome"
-        header_row = None
-        header_index = None
-        for idx, row in enumerate(rows):
-            text = row.text_content().strip()
-            if "Código" in text and "Nome" in text:
-                header_row = row
-                header_index = idx
-                break
-        if header_row is None or header_index is None:
-            continue
-        
-        # Determina o índice da coluna "Nome" na linha de cabeçalho.
-        header_cells = header_row.xpath(".//th")
-        if not header_cells:
-            header_cells = header_row.xpath(".//td")
-        nome_index = None
-        for i, cell in enumerate(header_cells):
-            if "Nome" in cell.text_content():
-                nome_index = i
-                break
-        if nome_index is None:
-            continue
-        
-        # A partir da linha imediatamente após o cabeçalho, extrai os nomes
-        students = []
-        for row in rows[header_index + 1:]:
-            row_text = row.text_content().strip()
+        if collecting:
             if "Total de Matrículas" in row_text or "Turma:" in row_text:
-                break
-            cells = row.xpath(".//td")
+                collecting = False
+                continue
+            cells = list(row.iter("td"))
             if len(cells) > nome_index:
-                student_name = cells[nome_index].text_content().strip()
-                if student_name and re.search(r'[A-Za-zÀ-ÖØ-öø-ÿ]', student_name):
+                student_name = _text(cells[nome_index]).strip()
+                if student_name and _LETTER_RE.search(student_name):
                     students.append(student_name)
+                    code = ""
+                    if codigo_index is not None and len(cells) > codigo_index:
+                        code = _text(cells[codigo_index]).strip()
+                    codes.append(code)
+        elif not header_seen and "Código" in row_text and "Nome" in row_text:
+            # Determina os índices das colunas "Código" e "Nome" na linha de cabeçalho
+            header_seen = True
+            header_cells = list(row.iter("th")) or list(row.iter("td"))
+            for i, cell in enumerate(header_cells):
+                cell_text = _text(cell)
+                if codigo_index is None and "Código" in cell_text:
+                    codigo_index = i
+                if "Nome" in cell_text:
+                    nome_index = i
+                    collecting = True
+                    break
         
-        classes[current_turma].extend(students)  # Adiciona os alunos à turma existente
+        if turma_found and header_seen and not collecting:
+            break  # Nada mais a extrair desta tabela
+    
+    return current_turma, students, codes
+
+def _etree():
+    """Importa o lxml no primeiro relatório processado, fora da inicialização da aplicação."""
+    global _STRING
+    from lxml import etree
+    if _STRING is None:
+        _STRING = etree.XPath("string()")
+    return etree
+
+def _text(element):
+    """Texto de um elemento e seus descendentes (equivale a `text_content()` do lxml.html)."""
+    return _STRING(element)
+
+def iter_students(source, encoding="utf-8"):
+    """
+    Versão em streaming de `parse_html_content`, gerando pares (turma, aluno).
+    
+    O relatório é lido incrementalmente com `lxml.etree.iterparse`, sem montar a
+    árvore completa: cada tabela "jrPage" é processada ao ser fechada e descartada
+    em seguida, de modo que o pico de memória fica limitado a uma página.
+    
+    Parâmetros:
+      source: objeto de arquivo binário, caminho (`os.PathLike`), bytes ou str com o HTML.
+      encoding: codificação usada quando o relatório não a declara (em <meta charset>
+                ou BOM); a declarada, quando existe, prevalece. Ignorada para str.
+    """
+    for turma, students, _ in _iter_tables(source, encoding):
+        for student in students:
+            yield turma, student
+
+def parse_html_stream(source, encoding="utf-8"):
+    """
+    Equivalente a `parse_html_content`, mas usando o parser em streaming.
     
+    Retorna:
+      dict: Chave = nome da turma, Valor = lista de nomes de alunos.
+    """
+    classes = {}
+    for turma, students, _ in _iter_tables(source, encoding):
+        classes.setdefault(turma, []).extend(students)
     return classes
 
+def parse_report(source, encoding="utf-8"):
+    """
+    Processa o relatório em streaming, como `parse_html_stream`, e extrai também os
+    metadados: escola, prefeitura e data de emissão (do cabeçalho da primeira página),
+    código, nome e turno de cada turma e o código de cada aluno.
+    
+    Retorna:
+      ParsedReport: turmas e metadados do relatório.
+    """
+    report = ParsedReport()
+    for turma, students, codes in _iter_tables(source, encoding, report):
+        if turma not in report.classes:
+            report.classes[turma] = []
+            report.codes[turma] = []
+            report.turmas[turma] = parse_turma(turma)
+        report.classes[turma].extend(students)
+        report.codes[turma].extend(codes)
+    return report
+
+def parse_turma(turma):
+    """Separa "0001 - 1º ANO A (MATUTINO)" em TurmaInfo("0001", "1º ANO A", "MATUTINO")."""
+    code, name, shift = _TURMA_PARTS_RE.match(turma.strip()).groups()
+    return TurmaInfo(code, name or turma, shift)
+
+def _scan_header(table, report):
+    """
+    Lê as linhas do cabeçalho da página (antes de "Turma:" ou "Código"/"Nome") e
+    preenche escola, prefeitura e data de emissão em `report`.
+    """
+    for row in table.iter("tr"):
+        row_text = _text(row).strip()
+        if "Turma:" in row_text or ("Código" in row_text and "Nome" in row_text):
+            break
+        
+        match = _EMITTED_RE.search(row_text)
+        if match and report.emitted_at is None:
+            report.emitted_at = datetime.strptime(
+                " ".join(part for part in match.groups() if part),
+                "%d/%m/%Y %H:%M" if match.group(2) else "%d/%m/%Y"
+            )
+        
+        for cell in row.iter("td"):
+            cell_text = " ".join(_text(cell).split())
+            if not cell_text or not _LETTER_RE.search(cell_text):
+                continue
+            if cell_text.upper().startswith("PREFEITURA"):
+                report.municipality = report.municipality or cell_text
+            elif (report.school_name is None
+                  and not cell_text.upper().startswith("SECRETARIA")
+                  and "Emitido em" not in cell_text
+                  and "Página" not in cell_text):
+                report.school_name = cell_text
+
+def _iter_tables(source, encoding, report=None):
+    """
+    Gera (turma, alunos, códigos) para cada tabela "jrPage", liberando-a após o uso. Se
+    `report` for informado, os metadados do cabeçalho da primeira página são
+    gravados nele.
+    """
+    if isinstance(source, str):
+        # Texto já decodificado: a codificação dos bytes é a escolhida aqui, não a declarada
+        source, encoding = io.BytesIO(source.encode("utf-8")), "utf-8"
+    else:
+        source, head = _with_head(source)
+        if _declares_charset(head):
+            encoding = None  # O lxml segue a declaração do relatório
+    
+    etree = _etree()
+    current_turma = None
+    for _, table in etree.iterparse(source, events=("end",), tag="table", html=True,
+                                    encoding=encoding, recover=True):
+        if "jrPage" not in (table.get("class") or ""):
+            continue  # Tabelas internas são tratadas junto com a jrPage que as contém
+        
+        if report is not None:
+            _scan_header(table, report)
+            report = None  # O cabeçalho se repete em todas as páginas
+        current_turma, students, codes = _scan_table(table, current_turma)
+        
+        # Libera a tabela já processada e os irmãos anteriores
+        table.clear()
+        parent = table.getparent()
+        if parent is not None:
+            while table.getprevious() is not None:
+                del parent[0]
+        
+        if current_turma is not None:
+            yield current_turma, students, codes
+
+def _declares_charset(head):
+    return head.startswith(_BOMS) or _DECLARED_CHARSET_RE.search(head) is not None
+
+def _with_head(source):
+    """
+    Lê o início do relatório sem consumi-lo. Retorna (fonte para o iterparse, início):
+    caminhos seguem como caminho, bytes viram BytesIO e arquivos voltam à posição original.
+    """
+    if isinstance(source, os.PathLike):
+        source = os.fspath(source)  # iterparse abre o arquivo diretamente
+        with open(source, "rb") as f:
+            return source, f.read(_PRESCAN_BYTES)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source), bytes(source[:_PRESCAN_BYTES])
+    head = source.read(_PRESCAN_BYTES)
+    if source.seekable():
+        source.seek(-len(head), io.SEEK_CUR)
+        return source, head
+    return io.BufferedReader(_Replay(head, source)), head
+
+class _Replay(io.RawIOBase):
+    """Arquivo não posicionável com o início já lido devolvido antes do restante."""
+
+    def __init__(self, head, rest):
+        self._head = memoryview(head)
+        self._rest = rest
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+        data = self._rest.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
 # Exemplo de uso:
 if __name__ == '__main__':
     file_path = "RelatorioEmitidoPeloEducarWEB (1).html"
-    with open(file_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    
-    turmas = parse_html_content(html_content)
-    for turma, alunos in turmas.items():
+    with open(file_path, "rb") as f:
+        report = parse_report(f)
+    print(f"Escola: {report.school_name} - emitido em {report.emitted_at}")
+    for turma, alunos in report.classes.items():
         print(f"Turma: {turma} - {len(alunos)} alunos")
         for aluno in alunos:
             print("   ", aluno)
\ No newline at end of file
@@ -0,0 +1,444 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    school      TEXT NOT NULL,
+    turma       TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    student     TEXT NOT NULL,
+    status      TEXT,
+    observation TEXT NOT NULL DEFAULT '',
+    updated_at  TEXT NOT NULL,
+    PRIMARY KEY (school, turma, date, student)
+) WITHOUT ROWID;
+-- Leitura de um dia (ou de um período) de todas as turmas de uma escola
+CREATE INDEX IF NOT EXISTS attendance_by_day ON attendance (school, date);
+
+-- Resumos mantidos a cada gravação (ver `_update_summaries`); contagens de P, F e FJ
+CREATE TABLE IF NOT EXISTS summary_day (
+    school    TEXT NOT NULL,
+    turma     TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    present   INTEGER NOT NULL,
+    absent    INTEGER NOT NULL,
+    justified INTEGER NOT NULL,
+    PRIMARY KEY (school, turma, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summary_turma (
+    school    TEXT NOT NULL,
+    turma     TEXT NOT NULL,
+    days      INTEGER NOT NULL,
+    present   INTEGER NOT NULL,
+    absent    INTEGER NOT NULL,
+    justified INTEGER NOT NULL,
+    PRIMARY KEY (school, turma)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summary_student (
+    school    TEXT NOT NULL,
+    turma     TEXT NOT NULL,
+    student   TEXT NOT NULL,
+    present   INTEGER NOT NULL,
+    absent    INTEGER NOT NULL,
+    justified INTEGER NOT NULL,
+    PRIMARY KEY (school, turma, student)
+) WITHOUT ROWID;
+"""
+
+# Versão dos resumos (PRAGMA user_version); bancos anteriores são reconstruídos ao abrir
+_SUMMARY_VERSION = 1
+
+# Situação -> posição da contagem (present, absent, justified)
+_COUNT_INDEX = {"P": 0, "F": 1, "FJ": 2}
+
+_ADD_STUDENT = """
+INSERT INTO summary_student (school, turma, student, present, absent, justified)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (school, turma, student)
+DO UPDATE SET present = present + excluded.present,
+              absent = absent + excluded.absent,
+              justified = justified + excluded.justified
+"""
+
+_ADD_DAY = """
+INSERT INTO summary_day (school, turma, date, present, absent, justified)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (school, turma, date)
+DO UPDATE SET present = present + excluded.present,
+              absent = absent + excluded.absent,
+              justified = justified + excluded.justified
+"""
+
+_ADD_TURMA = """
+INSERT INTO summary_turma (school, turma, days, present, absent, justified)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (school, turma)
+DO UPDATE SET days = days + excluded.days,
+              present = present + excluded.present,
+              absent = absent + excluded.absent,
+              justified = justified + excluded.justified
+"""
+
+# Contagens de uma turma em um dia, somadas ao resumo por aluno sem passar pelo Python
+_COPY_STUDENT_COUNTS = """
+INSERT INTO summary_student (school, turma, student, present, absent, justified)
+SELECT school, turma, student, status IS 'P', status IS 'F', status IS 'FJ'
+FROM attendance WHERE school = ? AND turma = ? AND date = ?
+ON CONFLICT (school, turma, student)
+DO UPDATE SET present = present + excluded.present,
+              absent = absent + excluded.absent,
+              justified = justified + excluded.justified
+"""
+
+# Alunos lidos por consulta ao buscar as marcações anteriores (limite de parâmetros do SQLite)
+_IN_CHUNK = 500
+
+_UPSERT = """
+INSERT INTO attendance (school, turma, date, student, status, observation, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (school, turma, date, student)
+DO UPDATE SET status = excluded.status,
+              observation = excluded.observation,
+              updated_at = excluded.updated_at
+"""
+
+
+class AttendanceStore:
+    """
+    Armazena as marcações de presença em um arquivo SQLite local.
+
+    O banco usa o modo WAL, permitindo que vários fiscais gravem ao mesmo tempo enquanto
+    outros leem. Cada thread (sessão do Streamlit) recebe a sua própria conexão.
+
+    As contagens de P, F e FJ por turma, por dia e por aluno ficam em tabelas de resumo
+    atualizadas na mesma transação de cada gravação, a partir da diferença entre as
+    marcações anteriores e as novas; consultá-las não percorre o histórico.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            outdated = conn.execute("PRAGMA user_version").fetchone()[0] < _SUMMARY_VERSION
+            if outdated and conn.execute("SELECT 1 FROM attendance LIMIT 1").fetchone() is None:
+                # Banco novo: não há o que reconstruir
+                conn.execute(f"PRAGMA user_version = {_SUMMARY_VERSION}")
+                outdated = False
+        if outdated:
+            self.rebuild_summaries()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_class(self, school, turma, date, rows):
+        """
+        Grava marcações de uma turma em uma única transação.
+
+        Só os alunos de `rows` são lidos e gravados, então `rows` pode conter apenas o
+        que mudou desde a última gravação (ver `ClassAttendance.changes`): o custo é
+        proporcional às alterações, não ao tamanho da turma.
+
+        Parâmetros:
+          rows: iterável de (aluno, situação, observação).
+
+        Retorna:
+          int: quantidade de linhas gravadas.
+        """
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        params = [
+            (school, turma, date, student, status, observation or "", updated_at)
+            for student, status, observation in rows
+        ]
+        if not params:
+            return 0
+        with self._connection() as conn:  # commit ao final, rollback em caso de erro
+            # Trava de escrita antes de ler as marcações anteriores: sem ela o sqlite3 só
+            # abre a transação no primeiro UPSERT, e outra gravação entre a leitura e o
+            # UPSERT deixaria os resumos contando a marcação antiga e a nova
+            conn.execute("BEGIN IMMEDIATE")
+            previous = self._previous_marks(conn, school, turma, date, [row[3] for row in params])
+            new_day = conn.execute(
+                "SELECT 1 FROM summary_day WHERE school = ? AND turma = ? AND date = ?",
+                (school, turma, date),
+            ).fetchone() is None
+            conn.executemany(_UPSERT, params)
+            self._update_summaries(conn, school, turma, date, previous, params, new_day)
+        return len(params)
+
+    def _previous_marks(self, conn, school, turma, date, students):
+        students = list(dict.fromkeys(students))
+        previous = {}
+        for start in range(0, len(students), _IN_CHUNK):
+            chunk = students[start:start + _IN_CHUNK]
+            previous.update(conn.execute(
+                "SELECT student, status FROM attendance WHERE school = ? AND turma = ? AND date = ? "
+                f"AND student IN ({', '.join('?' * len(chunk))})",
+                (school, turma, date, *chunk),
+            ))
+        return previous
+
+    def _update_summaries(self, conn, school, turma, date, previous, params, new_day):
+        # Como no UPSERT, a última linha de um aluno repetido é a que vale;
+        # `previous` tem as marcações anteriores apenas desses alunos
+        current = {row[3]: row[4] for row in params}
+
+        student_deltas = []
+        for student, status in current.items():
+            old = previous.get(student)
+            if old == status:
+                continue
+            delta = [0, 0, 0]
+            if old in _COUNT_INDEX:
+                delta[_COUNT_INDEX[old]] -= 1
+            if status in _COUNT_INDEX:
+                delta[_COUNT_INDEX[status]] += 1
+            if any(delta):
+                student_deltas.append((school, turma, student, *delta))
+        conn.executemany(_ADD_STUDENT, student_deltas)
+
+        delta = [a - b for a, b in zip(_count(current.values()), _count(previous.values()))]
+        conn.execute(_ADD_DAY, (school, turma, date, *delta))
+        conn.execute(_ADD_TURMA, (school, turma, int(new_day), *delta))
+
+    def copy_day(self, school, turma, source, target):
+        """
+        Copia as marcações de uma turma de `source` para `target` (datas ISO).
+
+        A cópia é um único INSERT ... SELECT dentro do SQLite, sem trazer as linhas para
+        o Python, e os resumos recebem as contagens do novo dia na mesma transação.
+
+        Retorna:
+          int: quantidade de linhas copiadas.
+
+        Raises:
+          ValueError: se a turma já tiver marcações em `target`.
+        """
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        with self._connection() as conn:
+            # A verificação do dia de destino e a cópia na mesma transação de escrita
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(
+                "SELECT 1 FROM summary_day WHERE school = ? AND turma = ? AND date = ?",
+                (school, turma, target),
+            ).fetchone() is not None:
+                raise ValueError(f"A turma {turma} já tem presenças gravadas em {target}.")
+            copied = conn.execute(
+                "INSERT INTO attendance (school, turma, date, student, status, observation, updated_at) "
+                "SELECT school, turma, ?, student, status, observation, ? FROM attendance "
+                "WHERE school = ? AND turma = ? AND date = ?",
+                (target, updated_at, school, turma, source),
+            ).rowcount
+            if not copied:
+                return 0
+            counts = conn.execute(
+                "SELECT SUM(status IS 'P'), SUM(status IS 'F'), SUM(status IS 'FJ') FROM attendance "
+                "WHERE school = ? AND turma = ? AND date = ?",
+                (school, turma, target),
+            ).fetchone()
+            conn.execute(_ADD_DAY, (school, turma, target, *counts))
+            conn.execute(_ADD_TURMA, (school, turma, 1, *counts))
+            conn.execute(_COPY_STUDENT_COUNTS, (school, turma, target))
+        return copied
+
+    def previous_date(self, school, turma, before):
+        """Última data (ISO) anterior a `before` com presenças gravadas da turma, ou None."""
+        return self._connection().execute(
+            "SELECT MAX(date) FROM summary_day WHERE school = ? AND turma = ? AND date < ?",
+            (school, turma, before),
+        ).fetchone()[0]
+
+    def rebuild_summaries(self):
+        """
+        Recalcula todas as tabelas de resumo a partir das marcações gravadas.
+
+        Usado na migração de bancos antigos ou para corrigir resumos; as contagens são
+        feitas com group-bys do pandas sobre a tabela inteira, não linha a linha.
+
+        Retorna:
+          int: quantidade de marcações lidas.
+        """
+        import pandas as pd
+
+        conn = self._connection()
+        marks = pd.read_sql_query("SELECT school, turma, date, student, status FROM attendance", conn)
+        for status, column in (("P", "present"), ("F", "absent"), ("FJ", "justified")):
+            marks[column] = (marks["status"] == status).astype("int64")
+        counts = ["present", "absent", "justified"]
+
+        by_day = marks.groupby(["school", "turma", "date"], sort=False)[counts].sum().reset_index()
+        by_turma = by_day.groupby(["school", "turma"], sort=False).agg(
+            days=("date", "size"), present=("present", "sum"),
+            absent=("absent", "sum"), justified=("justified", "sum"),
+        ).reset_index()
+        by_student = marks.groupby(["school", "turma", "student"], sort=False)[counts].sum().reset_index()
+
+        with conn:
+            conn.execute("DELETE FROM summary_day")
+            conn.execute("DELETE FROM summary_turma")
+            conn.execute("DELETE FROM summary_student")
+            conn.executemany(
+                "INSERT INTO summary_day VALUES (?, ?, ?, ?, ?, ?)",
+                _records(by_day),
+            )
+            conn.executemany(
+                "INSERT INTO summary_turma VALUES (?, ?, ?, ?, ?, ?)",
+                _records(by_turma),
+            )
+            conn.executemany(
+                "INSERT INTO summary_student VALUES (?, ?, ?, ?, ?, ?)",
+                _records(by_student),
+            )
+            conn.execute(f"PRAGMA user_version = {_SUMMARY_VERSION}")
+        return len(marks)
+
+    def turma_summaries(self, school=None):
+        """
+        Contagens acumuladas por turma, lidas das tabelas de resumo.
+
+        Retorna:
+          list: dicts com school, turma, days, present, absent e justified.
+        """
+        query = "SELECT school, turma, days, present, absent, justified FROM summary_turma"
+        params = ()
+        if school is not None:
+            query += " WHERE school = ?"
+            params = (school,)
+        return _dicts(self._connection().execute(query + " ORDER BY school, turma", params))
+
+    def student_summaries(self, school, turma):
+        """
+        Contagens acumuladas de cada aluno de uma turma.
+
+        Retorna:
+          list: dicts com student, present, absent e justified.
+        """
+        return _dicts(self._connection().execute(
+            "SELECT student, present, absent, justified FROM summary_student "
+            "WHERE school = ? AND turma = ? ORDER BY student",
+            (school, turma),
+        ))
+
+    def daily_summaries(self, school, turma):
+        """
+        Contagens de uma turma em cada dia gravado.
+
+        Retorna:
+          list: dicts com date, present, absent e justified, em ordem de data.
+        """
+        return _dicts(self._connection().execute(
+            "SELECT date, present, absent, justified FROM summary_day "
+            "WHERE school = ? AND turma = ? ORDER BY date",
+            (school, turma),
+        ))
+
+    def load_class(self, school, turma, date):
+        """
+        Retorna as marcações gravadas de uma turma em uma data.
+
+        Retorna:
+          dict: aluno -> (situação, observação).
+        """
+        cursor = self._connection().execute(
+            "SELECT student, status, observation FROM attendance "
+            "WHERE school = ? AND turma = ? AND date = ?",
+            (school, turma, date),
+        )
+        return {student: (status, observation) for student, status, observation in cursor}
+
+    def load_day(self, school, date):
+        """
+        Retorna as marcações gravadas de todas as turmas de uma escola em uma data.
+
+        Retorna:
+          dict: turma -> {aluno: (situação, observação)}.
+        """
+        cursor = self._connection().execute(
+            "SELECT turma, student, status, observation FROM attendance "
+            "WHERE school = ? AND date = ?",
+            (school, date),
+        )
+        marks = {}
+        for turma, student, status, observation in cursor:
+            marks.setdefault(turma, {})[student] = (status, observation)
+        return marks
+
+    def iter_marks(self, schools, start, end, chunk_rows=10_000):
+        """
+        Gera as marcações gravadas das escolas `schools` entre as datas `start` e `end`
+        (ISO, inclusive), lidas do cursor em lotes de `chunk_rows`, sem carregar o
+        período inteiro em memória.
+
+        Gera:
+          tuple: (escola, turma, data, aluno, situação, observação), ordenadas por escola,
+                 data, turma e aluno (a ordem do índice, sem ordenação à parte).
+        """
+        schools = list(dict.fromkeys(schools))
+        if not schools:
+            return
+        cursor = self._connection().execute(
+            "SELECT school, turma, date, student, status, observation FROM attendance "
+            f"WHERE school IN ({', '.join('?' * len(schools))}) AND date BETWEEN ? AND ? "
+            "ORDER BY school, date, turma, student",
+            (*schools, start, end),
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def turmas(self, schools, start, end):
+        """Turmas com marcações gravadas das escolas `schools` entre `start` e `end`, em ordem."""
+        schools = list(dict.fromkeys(schools))
+        if not schools:
+            return []
+        cursor = self._connection().execute(
+            "SELECT DISTINCT turma FROM attendance "
+            f"WHERE school IN ({', '.join('?' * len(schools))}) AND date BETWEEN ? AND ? "
+            "ORDER BY turma",
+            (*schools, start, end),
+        )
+        return [turma for turma, in cursor]
+
+    def school_names(self):
+        """Escolas com marcações gravadas (lidas do resumo por turma), em ordem."""
+        return [school for school, in self._connection().execute(
+            "SELECT DISTINCT school FROM summary_turma ORDER BY school"
+        )]
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _count(statuses):
+    counts = [0, 0, 0]
+    for status in statuses:
+        index = _COUNT_INDEX.get(status)
+        if index is not None:
+            counts[index] += 1
+    return counts
+
+
+def _dicts(cursor):
+    keys = [column[0] for column in cursor.description]
+    return [dict(zip(keys, row)) for row in cursor]
+
+
+def _records(frame):
+    # tolist() devolve int/str do Python; o sqlite3 não aceita os escalares do NumPy
+    return zip(*(frame[column].tolist() for column in frame.columns))
@@ -0,0 +1,175 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from attendance_parser import parse_report
+
+
+def parse_reports(reports, max_workers=None, progress=None, cache=None):
+    """
+    Processa vários relatórios do EducarWEB em paralelo, um processo por núcleo.
+
+    Parâmetros:
+      reports: lista de pares (nome do arquivo, bytes do relatório).
+      max_workers: número de processos (padrão: número de núcleos).
+      progress: função opcional chamada como progress(concluídos, total, nome) a cada relatório.
+      cache: `RosterCache` opcional; relatórios já conhecidos não são reprocessados.
+
+    Cada relatório é isolado: um arquivo inválido é registrado em `errors` e não
+    interrompe o restante do lote. Um arquivo idêntico a outro do lote (mesmo SHA-256)
+    é ignorado, e uma turma que já veio de outro arquivo da mesma escola não é somada à
+    primeira: fica a do primeiro arquivo, e o conflito é registrado em `errors`.
+
+    Retorna:
+      tuple: (schools, errors), onde schools = {escola: ParsedReport} e
+             errors = {nome do arquivo: mensagem de erro}. A escola é a lida do
+             relatório (ver `school_name_for`).
+    """
+    reports = list(reports)
+    total = len(reports)
+    results = [None] * total  # (report, error) na ordem do lote
+    done = 0
+
+    def finish(index, report=None, error=None):
+        nonlocal done
+        done += 1
+        results[index] = (report, error)
+        if progress:
+            progress(done, total, reports[index][0])
+
+    pending = []
+    seen = {}  # SHA-256 -> primeiro arquivo com esse conteúdo
+    for index, (name, data) in enumerate(reports):
+        key = cache.key_for(data) if cache else hashlib.sha256(data).hexdigest()
+        if key in seen:
+            finish(index, error=f"Arquivo idêntico a {seen[key]}; ignorado.")
+            continue
+        seen[key] = name
+        report = cache.get(key) if cache else None
+        if report is not None:
+            finish(index, report)
+        else:
+            pending.append((index, data, key))
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(pending) <= 1:
+        # Sem ganho em abrir processos para um único relatório
+        for index, data, key in pending:
+            report, error = _parse_isolated(data)
+            _store(cache, key, report)
+            finish(index, report, error)
+    else:
+        # forkserver: um fork do servidor do Streamlit (com threads segurando locks do
+        # SQLite, do cache e das métricas) poderia travar o processo filho
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 mp_context=multiprocessing.get_context("forkserver")) as executor:
+            futures = {
+                executor.submit(_parse_isolated, data): (index, key)
+                for index, data, key in pending
+            }
+            for future in as_completed(futures):
+                index, key = futures[future]
+                try:
+                    report, error = future.result()
+                except Exception as e:  # Ex.: processo encerrado abruptamente
+                    report, error = None, str(e)
+                _store(cache, key, report)
+                finish(index, report, error)
+
+    # Agrupados na ordem do lote, e não na de conclusão: o primeiro arquivo de cada
+    # escola é sempre o mesmo
+    schools = {}
+    sources = {}  # (escola, turma) -> arquivo de onde a turma veio
+    errors = {}
+    for (name, _), (report, error) in zip(reports, results):
+        if error is None and not report.classes:
+            error = "Nenhuma turma encontrada no arquivo."
+        if error is not None:
+            errors[name] = error
+            continue
+        conflicts = _merge_school(schools, sources, school_name_for(name, report), report, name)
+        if conflicts:
+            errors[name] = "Turmas já carregadas de outro arquivo da mesma escola, ignoradas: " + ", ".join(
+                f"{turma} ({origin})" for turma, origin in conflicts
+            )
+    return schools, errors
+
+
+def school_name_for(file_name, report=None):
+    """
+    Nome usado para agrupar as turmas de um relatório: a escola lida do relatório ou,
+    se ela não foi encontrada, o nome do arquivo sem extensão.
+    """
+    if report is not None and report.school_name:
+        return report.school_name
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def flatten_schools(schools):
+    """
+    Converte {escola: ParsedReport} no formato {turma: [alunos]} usado pela aplicação,
+    prefixando cada turma com a escola quando houver mais de uma.
+    """
+    if len(schools) == 1:
+        report = next(iter(schools.values()))
+        return {turma: list(alunos) for turma, alunos in report.classes.items()}
+    return {
+        turma_key(school, turma, len(schools)): list(alunos)
+        for school, report in schools.items()
+        for turma, alunos in report.classes.items()
+    }
+
+
+def class_origins(schools):
+    """
+    {chave de `flatten_schools`: (escola, turma original)}, para gravar e exportar cada
+    turma com a escola e o nome que ela tem no relatório, e não com a chave prefixada.
+    """
+    return {
+        turma_key(school, turma, len(schools)): (school, turma)
+        for school, report in schools.items()
+        for turma in report.classes
+    }
+
+
+def turma_key(school, turma, n_schools):
+    """Chave da turma em `flatten_schools`: prefixada com a escola quando há mais de uma."""
+    return f"{school} - {turma}" if n_schools > 1 else turma
+
+
+def _parse_isolated(data):
+    # Executado nos processos filhos: devolve o erro em vez de propagar a exceção
+    try:
+        return parse_report(data), None
+    except Exception as e:
+        return None, f"Erro ao processar o arquivo: {e}"
+
+
+def _store(cache, key, report):
+    if cache is not None and report is not None and report.classes:
+        cache.put(key, report)
+
+
+def _merge_school(schools, sources, school, report, name):
+    """
+    Acrescenta as turmas de `report` (arquivo `name`) à escola. Retorna os conflitos:
+    [(turma, arquivo de onde ela já veio)].
+    """
+    merged = schools.get(school)
+    if merged is None:
+        schools[school] = report
+        sources.update(((school, turma), name) for turma in report.classes)
+        return []
+    # Dois arquivos da mesma escola: as turmas novas são somadas, os metadados do primeiro
+    # valem; uma turma repetida não é concatenada à primeira
+    conflicts = []
+    for turma, alunos in report.classes.items():
+        if turma in merged.classes:
+            conflicts.append((turma, sources[school, turma]))
+            continue
+        merged.classes[turma] = alunos
+        merged.codes[turma] = report.codes.get(turma) or [""] * len(alunos)
+        merged.turmas[turma] = report.turmas.get(turma)
+        sources[school, turma] = name
+    return conflicts
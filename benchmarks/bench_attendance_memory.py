@@ -0,0 +1,94 @@
+"""
+Compara a memória por sessão do layout antigo (dicionários de dicionários indexados pelo
+nome do aluno) com o modelo compacto de `attendance_model`.
+
+Uso:
+    python benchmarks/bench_attendance_memory.py [--classes 40] [--students 35]
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance_model import STATUS_OPTIONS, AttendanceBook  # noqa: E402
+
+FIRST_NAMES = ["ANA", "JOÃO", "MARIA", "PEDRO", "LUCAS", "JÚLIA", "GABRIEL", "BEATRIZ"]
+LAST_NAMES = ["SILVA", "SOUZA", "OLIVEIRA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA"]
+
+
+def make_rosters(n_classes, n_students, seed=0):
+    rng = random.Random(seed)
+    rosters = {}
+    for c in range(n_classes):
+        rosters[f"{c + 1}º ANO {chr(65 + c % 26)} (Matutino)"] = [
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)} {c}-{s}"
+            for s in range(n_students)
+        ]
+    return rosters
+
+
+def marks_for(rosters, seed=1):
+    rng = random.Random(seed)
+    return {
+        turma: [
+            (rng.choice(STATUS_OPTIONS), "chegou atrasado" if rng.random() < 0.05 else "")
+            for _ in alunos
+        ]
+        for turma, alunos in rosters.items()
+    }
+
+
+def build_dict_layout(rosters, marks):
+    attendance_status, observations = {}, {}
+    for turma, alunos in rosters.items():
+        attendance_status[turma] = {}
+        observations[turma] = {}
+        for student, (status, observation) in zip(alunos, marks[turma]):
+            attendance_status[turma][student] = status
+            observations[turma][student] = observation
+    return attendance_status, observations
+
+
+def build_compact_layout(rosters, marks):
+    book = AttendanceBook()
+    for turma, alunos in rosters.items():
+        attendance = book.ensure_class(turma, alunos)
+        for position, (status, observation) in enumerate(marks[turma]):
+            attendance.set_status_at(position, status)
+            attendance.set_observation_at(position, observation)
+    return book
+
+
+def measure(builder, *args):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = builder(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--students", type=int, default=35)
+    args = parser.parse_args(argv)
+
+    rosters = make_rosters(args.classes, args.students)
+    marks = marks_for(rosters)
+    total = args.classes * args.students
+
+    dict_bytes, _ = measure(build_dict_layout, rosters, marks)
+    compact_bytes, _ = measure(build_compact_layout, rosters, marks)
+
+    print(f"{args.classes} turmas x {args.students} alunos ({total} alunos)")
+    print(f"  dicionários aninhados: {dict_bytes / 1024:10.1f} KiB ({dict_bytes / total:6.1f} B/aluno)")
+    print(f"  modelo compacto:       {compact_bytes / 1024:10.1f} KiB ({compact_bytes / total:6.1f} B/aluno)")
+    print(f"  redução:               {100 * (1 - compact_bytes / dict_bytes):10.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compara envios ao Drive com e sem chave de exportação em um Drive falso local.
+
+Simula um fiscal que exporta a mesma turma várias vezes no dia: `--repeats` envios com
+o mesmo conteúdo seguidos de `--changes` envios com conteúdo alterado. Para cada modo,
+relata as requisições, uploads e bytes recebidos pelo servidor e os arquivos e
+permissões criados. Com `--error-rate`, o Drive falso responde 503 a essa fração das
+requisições, e a fila tem de concluir os envios repetindo as tentativas. Tudo roda sem rede: o Drive falso (fake_drive.py) conta as
+requisições e as credenciais são um token qualquer.
+
+Por fim, confere a deduplicação com um XLSX de verdade: a mesma lista de presença é
+exportada duas vezes, com bytes diferentes (o openpyxl grava a hora no arquivo), e o
+segundo envio tem de sair "unchanged" graças ao hash dos registros (`records_sha256`).
+
+Uso:
+    python benchmarks/bench_drive_exports.py [--repeats 5] [--changes 2] [--size 200000] [--error-rate 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_drive import start_fake_drive  # noqa: E402
+
+
+def wait_for(queue, job_ids, timeout=60):
+    from drive_queue import DONE, FAILED
+
+    deadline = time.monotonic() + timeout
+    jobs = []
+    for job_id in job_ids:
+        while True:
+            job = queue.get_job(job_id)
+            if job["status"] in (DONE, FAILED):
+                jobs.append(job)
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"envio {job_id} não terminou")
+            time.sleep(0.01)
+    return jobs
+
+
+def use_fake_drive(error_rate=0.0):
+    """Inicia o Drive falso e aponta o cliente do Drive para ele."""
+    import gdrive_exporter
+    from google.oauth2.credentials import Credentials
+
+    server, state, root_url = start_fake_drive(error_rate=error_rate)
+    os.environ["GOOGLE_DRIVE_API_ROOT"] = root_url
+    gdrive_exporter.reset_drive_client()
+    gdrive_exporter.load_credentials = lambda: Credentials(token="fake")
+    return server, state
+
+
+def scenario(keyed, payloads, tmp, error_rate=0.0):
+    from drive_queue import ExportQueue, export_key
+
+    server, state = use_fake_drive(error_rate)
+    queue = ExportQueue(os.path.join(tmp, f"queue_{keyed}.db"), base_delay=0.05, max_delay=0.5,
+                        max_attempts=20).start()
+    key = export_key("E.M. EXEMPLO", "1º ANO A", "2026-03-10") if keyed else None
+    start = time.perf_counter()
+    jobs = []
+    for data in payloads:
+        # Um envio de cada vez, como um fiscal clicando várias vezes ao longo do dia
+        jobs += wait_for(queue, [queue.enqueue(data, "Presenca.csv", "text/csv", "Paestro", key)])
+    elapsed = time.perf_counter() - start
+    queue.stop()
+    server.shutdown()
+    return state.summary(), jobs, elapsed
+
+
+def xlsx_check(tmp):
+    """
+    Exporta o mesmo XLSX duas vezes, com mais de um segundo de intervalo, pela fila.
+
+    Retorna:
+      tuple: (ações dos dois envios, True se os bytes dos dois arquivos diferem).
+    """
+    from attendance_model import AttendanceBook
+    from columnar_export import iter_records, records_sha256
+    from drive_queue import ExportQueue, export_key
+    from xlsx_export import XLSX_MIME_TYPE, export_to_tempfile
+
+    classes = {"1º ANO A": ["ANA SOUZA", "BRUNO LIMA", "CARLA DIAS"]}
+    attendance = AttendanceBook()
+    attendance.ensure_class("1º ANO A", classes["1º ANO A"]).mark_all("P")
+    key = export_key("E.M. EXEMPLO", "2026-03-10", "Presenca_20260310.xlsx")
+
+    server, _ = use_fake_drive()
+    queue = ExportQueue(os.path.join(tmp, "queue_xlsx.db"), base_delay=0.05).start()
+    jobs = []
+    payloads = []
+    try:
+        for attempt in range(2):
+            if attempt:
+                time.sleep(2.1)  # As datas do zip têm resolução de 2 s
+            output, _ = export_to_tempfile("E.M. EXEMPLO", classes, attendance)
+            with output:
+                data = output.read()
+            payloads.append(data)
+            content_hash = records_sha256(
+                iter_records("E.M. EXEMPLO", classes, attendance), "xlsx", False, "E.M. EXEMPLO"
+            )
+            jobs += wait_for(queue, [queue.enqueue(data, "Presenca_20260310.xlsx", XLSX_MIME_TYPE,
+                                                   "Paestro", key, content_hash)])
+    finally:
+        queue.stop()
+        server.shutdown()
+    return [job["action"] for job in jobs], payloads[0] != payloads[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Envios ao Drive com e sem deduplicação.")
+    parser.add_argument("--repeats", type=int, default=5, help="envios com o mesmo conteúdo")
+    parser.add_argument("--changes", type=int, default=2, help="envios seguintes com conteúdo alterado")
+    parser.add_argument("--size", type=int, default=200_000, help="tamanho do arquivo em bytes")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fração das requisições respondidas com 503 pelo Drive falso")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    base = bytes(rng.getrandbits(8) for _ in range(args.size))
+    payloads = [base] * args.repeats + [base + str(i).encode() for i in range(args.changes)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for keyed in (False, True):
+            summary, jobs, elapsed = scenario(keyed, payloads, tmp, args.error_rate)
+            actions = [job["action"] or job["status"] for job in jobs]
+            print(f"{'com chave' if keyed else 'sem chave'}: {len(payloads)} envios em {elapsed:.2f} s")
+            print(f"  requisições {summary['requests']}, uploads {summary['uploads']}, "
+                  f"{summary['bytes_received'] / 1024:.0f} KiB recebidos")
+            print(f"  arquivos {summary['files']} (incluindo a pasta), permissões {summary['permissions']}")
+            if args.error_rate:
+                print(f"  erros 503 injetados {summary['errors_injected']}, "
+                      f"tentativas {sum(job['attempts'] for job in jobs)}")
+            print(f"  resultado: {', '.join(actions)}")
+
+        actions, bytes_differ = xlsx_check(tmp)
+    print(f"XLSX exportado duas vezes (bytes {'diferentes' if bytes_differ else 'iguais'}): "
+          f"{', '.join(actions)}")
+    if actions != ["created", "unchanged"]:
+        print("ERRO: o segundo envio do mesmo XLSX deveria ser 'unchanged'.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
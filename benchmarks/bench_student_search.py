@@ -0,0 +1,62 @@
+"""
+Mede a montagem do índice de busca de alunos e o tempo de cada busca em um relatório
+sintético com muitas turmas (padrão: 1.430 turmas x 35 alunos, cerca de 50 mil nomes).
+
+Uso:
+    python benchmarks/bench_student_search.py [--classes 1430] [--students 35]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from attendance_parser import parse_report  # noqa: E402
+from student_index import StudentIndex  # noqa: E402
+from synthetic_report import generate_report  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da busca de alunos.")
+    parser.add_argument("--classes", type=int, default=1430)
+    parser.add_argument("--students", type=int, default=35)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    report = parse_report(generate_report(args.classes, args.students).encode("utf-8"))
+
+    start = time.perf_counter()
+    index = StudentIndex.from_reports({"ESCOLA": report})
+    build = time.perf_counter() - start
+    print(f"Índice: {len(index):,} alunos montado em {build * 1000:.1f} ms")
+
+    # Buscas típicas: prefixo do nome, nome + sobrenome sem acento e código exato
+    rng = random.Random(0)
+    turmas = list(report.classes)
+    queries = []
+    for _ in range(args.queries):
+        turma = rng.choice(turmas)
+        position = rng.randrange(len(report.classes[turma]))
+        name = report.classes[turma][position].split()
+        queries.append(rng.choice([
+            name[0][:3].lower(),
+            f"{name[0]} {name[-1][:4]}".lower().replace("ú", "u").replace("ã", "a"),
+            report.codes[turma][position],
+        ]))
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    for label, q in (("mediana", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        print(f"Busca {label:<8} {timings[int(q * (len(timings) - 1))] * 1e6:8.1f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Verifica o custo de inicialização da aplicação com `python -X importtime`.
+
+Em um processo novo, importa o Streamlit e depois os módulos da aplicação, e soma o
+tempo acumulado de importação dos módulos do projeto (o que eles carregam além do
+próprio Streamlit). Falha (código de saída 1) se esse tempo passar do orçamento ou se
+alguma dependência pesada for carregada na inicialização: essas só devem ser
+importadas quando o recurso que as usa é acionado (parse, exportação, Drive).
+
+Com --render, mede também o tempo até a primeira renderização: um processo novo executa
+app.py com o AppTest do Streamlit, incluindo a importação do próprio Streamlit.
+
+Uso:
+    python benchmarks/check_startup.py                    # orçamento padrão
+    python benchmarks/check_startup.py --budget-ms 120 --render
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos importados na inicialização: a aplicação e o exportador do Drive
+STARTUP_MODULES = ("app", "gdrive_exporter")
+
+# Dependências que não podem ser carregadas antes do primeiro uso
+DEFERRED_MODULES = (
+    "pandas", "numpy", "pyarrow", "openpyxl", "lxml",
+    "googleapiclient", "google_auth_httplib2", "httplib2",
+)
+
+DEFAULT_BUDGET_MS = 150
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def project_modules():
+    return {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")}
+
+
+def measure_imports(modules):
+    """
+    Importa `modules` em um processo novo, depois do Streamlit.
+
+    Retorna:
+      tuple: ({módulo do projeto: microssegundos acumulados}, conjunto de módulos carregados).
+    """
+    code = "import streamlit; " + "; ".join(f"import {name}" for name in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    own = project_modules()
+    times = {}
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        loaded.add(name)
+        # Só os módulos do projeto no nível mais alto: os aninhados já estão no acumulado
+        if indent == 1 and name in own:
+            times[name] = cumulative
+    return times, loaded
+
+
+def measure_first_render():
+    """Segundos até a primeira execução completa de app.py em um processo novo."""
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "at = AppTest.from_file('app.py', default_timeout=60).run()\n"
+        "assert not at.exception, at.exception\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        # Banco e cache descartáveis, para não tocar nos dados da instalação
+        env = dict(os.environ, PAESTRO_DB_PATH=os.path.join(tmp, "paestro.db"),
+                   PAESTRO_CACHE_DIR=os.path.join(tmp, "rosters"))
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True, env=env,
+        )
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação na inicialização.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"tempo máximo de importação dos módulos do projeto (padrão: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições (vale a melhor)")
+    parser.add_argument("--render", action="store_true", help="mede também o tempo até a primeira renderização")
+    args = parser.parse_args(argv)
+
+    best_total = None
+    for _ in range(args.repeat):
+        times, loaded = measure_imports(STARTUP_MODULES)
+        total = sum(times.values()) / 1000
+        if best_total is None or total < best_total:
+            best_total, best_times = total, times
+
+    for name, micros in sorted(best_times.items(), key=lambda item: -item[1]):
+        print(f"  {name:<20} {micros / 1000:8.1f} ms")
+    print(f"Importação dos módulos do projeto: {best_total:.1f} ms (orçamento {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if best_total > args.budget_ms:
+        print("ERRO: tempo de importação acima do orçamento.")
+        failed = True
+    eager = sorted(name for name in DEFERRED_MODULES if name in loaded)
+    if eager:
+        print(f"ERRO: dependências carregadas na inicialização: {', '.join(eager)}")
+        failed = True
+
+    if args.render:
+        print(f"Primeira renderização (processo novo, com o Streamlit): {measure_first_render():.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Servidor HTTP local que imita o subconjunto da API do Google Drive v3 usado pelo
+`gdrive_exporter`, para experimentos e medições sem acesso à internet.
+
+Conta requisições e bytes recebidos e pode injetar latência e erros 5xx.
+
+Uso com a aplicação:
+    python benchmarks/fake_drive.py --port 8089
+    GOOGLE_DRIVE_API_ROOT=http://127.0.0.1:8089/ streamlit run app.py
+
+As credenciais continuam sendo lidas normalmente; um token.json com um "token"
+qualquer e "expiry" no futuro é suficiente, pois o servidor não as valida.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+
+class FakeDriveState:
+    """Arquivos, permissões e contadores do servidor falso."""
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        self.files = {}
+        self.permissions = {}
+        self.requests = []
+        self.bytes_received = 0
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+
+    def count(self, method, path):
+        with self.lock:
+            self.requests.append((method, path))
+
+    def summary(self):
+        with self.lock:
+            return {
+                "requests": len(self.requests),
+                "uploads": sum(1 for _, path in self.requests if path.startswith("/upload/")),
+                "errors_injected": sum(1 for _, path in self.requests if path.endswith("[503]")),
+                "bytes_received": self.bytes_received,
+                "files": len(self.files),
+                "permissions": sum(len(p) for p in self.permissions.values()),
+            }
+
+
+def start_fake_drive(port=0, latency=0.0, error_rate=0.0):
+    """
+    Inicia o servidor em uma thread.
+
+    Retorna:
+      tuple: (servidor, estado, URL raiz para GOOGLE_DRIVE_API_ROOT).
+    """
+    state = FakeDriveState(latency, error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _split_head(part):
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        if separator in part:
+            head, _, body = part.partition(separator)
+            return head, body
+    return part, b""
+
+
+def _strip_newline(data):
+    if data.endswith(b"\r\n"):
+        return data[:-2]
+    if data.endswith(b"\n"):
+        return data[:-1]
+    return data
+
+
+def _parse_related(body, content_type):
+    # Upload "multipart/related": metadados JSON seguidos do conteúdo do arquivo
+    boundary = content_type.split("boundary=")[1].strip('"').encode()
+    parts = body.split(b"--" + boundary)
+    metadata = json.loads(_split_head(parts[1])[1].strip() or b"{}")
+    content = _strip_newline(_split_head(parts[2])[1])
+    return metadata, content
+
+
+def _make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def _send(self, code, payload, content_type="application/json"):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self, method):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            with state.lock:
+                state.bytes_received += length
+
+            if state.latency:
+                time.sleep(state.latency)
+            if state.error_rate and random.random() < state.error_rate:
+                state.count(method, url.path + " [503]")
+                self._send(503, {"error": {"code": 503, "message": "Backend Error"}})
+                return
+
+            if url.path.startswith("/batch/"):
+                state.count(method, url.path)  # A requisição do lote; as internas vêm depois
+                self._batch(body)
+                return
+            code, payload = _handle(state, method, url, body, self.headers.get("Content-Type", ""))
+            self._send(code, payload)
+
+        def _batch(self, body):
+            boundary = self.headers["Content-Type"].split("boundary=")[1].strip('"')
+            response_boundary = "batch_" + uuid.uuid4().hex
+            parts = []
+            for part in body.split(("--" + boundary).encode())[1:]:
+                part = part.strip(b"\r\n")
+                if part in (b"--", b""):
+                    continue
+                head, inner = _split_head(part)
+                content_id = re.search(rb"Content-ID: <(.*?)>", head, re.I).group(1).decode()
+                request_head, request_body = _split_head(inner)
+                method, target = request_head.splitlines()[0].decode().split(" ")[:2]
+                code, payload = _handle(state, method, urlparse(target), request_body.strip(), "")
+                parts.append(
+                    f"--{response_boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 {code} OK\r\nContent-Type: application/json\r\n\r\n"
+                    f"{json.dumps(payload)}\r\n"
+                )
+            payload = ("".join(parts) + f"--{response_boundary}--\r\n").encode()
+            self._send(200, payload, f"multipart/mixed; boundary={response_boundary}")
+
+    return Handler
+
+
+def _handle(state, method, url, body, content_type):
+    path = url.path
+    state.count(method, path)
+
+    if method == "GET" and path == "/drive/v3/files":
+        # A aplicação busca pastas por nome e exportações por appProperties
+        query = parse_qs(url.query).get("q", [""])[0]
+        match = re.search(r"appProperties has \{ key='([^']*)' and value='((?:[^'\\]|\\.)*)' \}", query)
+        if match:
+            key, value = match.group(1), re.sub(r"\\(.)", r"\1", match.group(2))
+            files = [
+                {"id": file_id, "name": meta.get("name"), "appProperties": meta.get("appProperties", {}),
+                 "webViewLink": f"https://drive.fake/{file_id}"}
+                for file_id, meta in list(state.files.items())
+                if meta.get("appProperties", {}).get(key) == value
+            ]
+            return 200, {"files": files}
+        match = re.search(r"name='((?:[^'\\]|\\.)*)'", query)
+        name = re.sub(r"\\(.)", r"\1", match.group(1)) if match else None
+        files = [
+            {"id": file_id, "name": meta["name"]}
+            for file_id, meta in list(state.files.items())
+            if meta.get("mimeType") == FOLDER_MIME_TYPE and meta.get("name") == name
+        ]
+        return 200, {"files": files}
+
+    if method == "POST" and path == "/drive/v3/files":
+        file_id = uuid.uuid4().hex
+        state.files[file_id] = dict(json.loads(body or b"{}"), content=b"")
+        return 200, {"id": file_id}
+
+    if method == "POST" and path == "/upload/drive/v3/files":
+        if "multipart" in content_type:
+            metadata, content = _parse_related(body, content_type)
+        else:
+            metadata, content = {}, body
+        file_id = uuid.uuid4().hex
+        state.files[file_id] = dict(metadata, content=content)
+        return 200, {"id": file_id, "webViewLink": f"https://drive.fake/{file_id}"}
+
+    match = re.match(r"/upload/drive/v3/files/([^/]+)$", path)
+    if method == "PATCH" and match and match.group(1) in state.files:
+        file_id = match.group(1)
+        metadata, content = _parse_related(body, content_type) if "multipart" in content_type else ({}, body)
+        # Atualização parcial: appProperties são mescladas, como no Drive
+        properties = dict(state.files[file_id].get("appProperties", {}), **metadata.pop("appProperties", {}))
+        state.files[file_id].update(metadata, content=content, appProperties=properties)
+        return 200, {"id": file_id, "webViewLink": f"https://drive.fake/{file_id}"}
+
+    match = re.match(r"/drive/v3/files/([^/]+)/permissions$", path)
+    if method == "POST" and match and match.group(1) in state.files:
+        state.permissions.setdefault(match.group(1), []).append(json.loads(body))
+        return 200, {"id": "anyoneWithLink"}
+
+    return 404, {"error": {"code": 404, "message": f"Not found: {method} {path}"}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do Google Drive.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="atraso por requisição, em segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 503")
+    args = parser.parse_args(argv)
+
+    server, state, root_url = start_fake_drive(args.port, args.latency, args.error_rate)
+    print(f"Fake Drive em {root_url} (Ctrl+C para encerrar)")
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(state.summary()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Teste de carga da aplicação com várias sessões simultâneas no mesmo processo.
+
+Cada sessão é um `AppTest` do Streamlit executando app.py sem navegador nem servidor, em
+uma thread própria, como as sessões reais de um único processo do Streamlit. Todas
+compartilham os recursos de `st.cache_resource` (cache de relatórios e banco), que ficam
+em um diretório temporário. Nenhum acesso à rede é feito: o envio ao Drive não é usado.
+
+O AppTest troca um `Runtime` global a cada execução, então duas execuções não podem
+ocorrer ao mesmo tempo: as reexecuções passam por uma fila (lock). A latência é medida
+desde o pedido da sessão, incluindo a espera na fila, como acontece com as sessões que
+disputam o GIL em um servidor real; o tempo de serviço (sem a espera) é relatado à parte.
+
+Roteiro de cada sessão: abre a aplicação, envia um relatório sintético, alterna entre
+turmas, marca a presença no modo de edição escolhido, salva e gera a exportação.
+
+Relata a latência de cada reexecução (p50/p95 por etapa e no total), o tempo de CPU
+do processo e a memória residente acrescentada por sessão. `--mode` recebe o rótulo de
+qualquer opção do seletor "Modo de edição", para comparar o formulário com a grade ou
+com modos futuros; `--json` grava o resultado para comparação posterior.
+
+Uso:
+    python benchmarks/load_test.py --sessions 8 --classes 40 --mode Formulário
+    python benchmarks/load_test.py --sessions 8 --mode Grade --json grade.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from synthetic_report import generate_report  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Uma execução do AppTest por vez (ver o docstring do módulo)
+_RUN_LOCK = threading.Lock()
+
+
+def current_rss():
+    """Memória residente atual do processo, em bytes (Linux); senão o pico."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Session:
+    """Uma sessão simulada; registra a latência de cada reexecução por etapa."""
+
+    def __init__(self, number, report, mode, switches, timeout, think=0.0):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.report = report
+        self.mode = mode
+        self.switches = switches
+        self.think = think
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.latencies = defaultdict(list)
+        self.service = []
+
+    def _run(self, step, widget=None):
+        if self.think:
+            time.sleep(self.think)  # Tempo do fiscal entre uma ação e outra
+        requested = time.perf_counter()
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            (widget or self.app).run()
+        finished = time.perf_counter()
+        self.latencies[step].append(finished - requested)
+        self.service.append(finished - started)
+        if self.app.exception:
+            raise RuntimeError(f"sessão {self.number}, etapa {step}: {self.app.exception[0].value}")
+
+    def _button(self, label):
+        for button in self.app.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"botão {label!r} não encontrado")
+
+    def play(self):
+        self._run("abrir")
+
+        uploader = self.app.file_uploader[0]
+        uploader.set_value((f"relatorio_{self.number}.html", self.report, "text/html"))
+        self._run("upload")
+
+        turmas = self.app.selectbox(key="class_selectbox").options
+        for turma in turmas[1:self.switches + 1]:
+            self.app.selectbox(key="class_selectbox").select(turma)
+            self._run("trocar_turma")
+
+        self.app.radio(key="attendance_mode").set_value(self.mode)
+        self._run("modo")
+        self.mark_attendance()
+
+        self.app.selectbox(key="export_format").select("Excel (XLSX)")
+        self._run("exportar", self._button("Gerar arquivo").click())
+
+    def mark_attendance(self):
+        """Marca a turma atual no modo escolhido e salva."""
+        if self.app.radio(key="attendance_mode").value == "Grade":
+            self._run("marcar", self._button("Marcar todos como presentes").click())
+        else:
+            turma = self.app.session_state.selected_class
+            day = self.app.session_state.attendance_date.isoformat()
+            for i, student in enumerate(self.app.session_state.students):
+                self.app.radio(key=f"{turma}_{day}_attendance_idx_{i}").set_value("P" if i % 4 else "F")
+        self._run("salvar", self._button("Salvar Presença").click())
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(sessions, classes, students, mode, switches, distinct, timeout, think=0.0):
+    reports = [
+        generate_report(classes, students, seed=i if distinct else 0).encode("utf-8")
+        for i in range(sessions)
+    ]
+    # O Streamlit é importado antes da medição, para não contar a importação como sessão
+    import streamlit.testing.v1  # noqa: F401
+
+    rss_before = current_rss()
+    cpu_before = time.process_time()
+    players = [Session(i, reports[i], mode, switches, timeout, think) for i in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    def play(session):
+        barrier.wait()  # Todas as sessões começam juntas
+        session.play()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(play, players))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+    rss_per_session = (current_rss() - rss_before) / sessions
+
+    steps = defaultdict(list)
+    for session in players:
+        for step, values in session.latencies.items():
+            steps[step].extend(values)
+    everything = [value for values in steps.values() for value in values]
+    steps["total"] = everything
+    service = [value for session in players for value in session.service]
+
+    latencies = {
+        step: {
+            "reruns": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "mean_ms": round(statistics.fmean(values) * 1000, 1),
+        }
+        for step, values in steps.items()
+    }
+    return {
+        "sessions": sessions,
+        "classes": classes,
+        "students": students,
+        "mode": mode,
+        "elapsed_seconds": round(elapsed, 2),
+        "cpu_seconds": round(cpu, 2),
+        "cpu_utilization": round(cpu / elapsed, 2) if elapsed else None,
+        "rss_per_session_bytes": round(rss_per_session),
+        "service_p50_ms": round(percentile(service, 0.50) * 1000, 1),
+        "service_p95_ms": round(percentile(service, 0.95) * 1000, 1),
+        "latencies": latencies,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas (AppTest).")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--classes", type=int, default=20, help="turmas por relatório")
+    parser.add_argument("--students", type=int, default=35, help="alunos por turma")
+    parser.add_argument("--switches", type=int, default=3, help="trocas de turma por sessão")
+    parser.add_argument("--mode", default="Formulário", help='opção do "Modo de edição" usada para marcar')
+    parser.add_argument("--distinct-reports", action="store_true",
+                        help="um relatório diferente por sessão (padrão: o mesmo, como em uma escola)")
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="pausa de cada sessão antes de cada ação (padrão: 0, carga máxima)")
+    parser.add_argument("--timeout", type=float, default=120, help="tempo máximo por reexecução (s)")
+    parser.add_argument("--json", metavar="ARQUIVO", help="grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Banco, fila e cache isolados: o teste não toca nos dados da instalação
+        os.environ["PAESTRO_DB_PATH"] = os.path.join(tmp, "paestro.db")
+        os.environ["PAESTRO_CACHE_DIR"] = os.path.join(tmp, "rosters")
+        result = run(args.sessions, args.classes, args.students, args.mode, args.switches,
+                     args.distinct_reports, args.timeout, args.think_ms / 1000)
+
+    print(f"{result['sessions']} sessões, modo {result['mode']!r}, "
+          f"{result['classes']} turmas x {result['students']} alunos")
+    for step, stats in result["latencies"].items():
+        print(f"  {step:<14} {stats['reruns']:>5} reexecuções  p50 {stats['p50_ms']:8.1f} ms  "
+              f"p95 {stats['p95_ms']:8.1f} ms")
+    print(f"Tempo de serviço (sem a fila): p50 {result['service_p50_ms']:.1f} ms  "
+          f"p95 {result['service_p95_ms']:.1f} ms")
+    print(f"Tempo total {result['elapsed_seconds']:.2f} s, CPU {result['cpu_seconds']:.2f} s "
+          f"({result['cpu_utilization']:.0%} de um núcleo)")
+    print(f"Memória residente por sessão: {result['rss_per_session_bytes'] / 2**20:.1f} MiB")
+
+    if args.json:
+        document = dict(result, created_at=datetime.now().isoformat(timespec="seconds"),
+                        python=platform.python_version(), machine=platform.machine())
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Mede o desempenho do processamento de relatórios, da montagem das listas de chamada e
+da geração das exportações (XLSX, Parquet, Arrow IPC e CSV) em relatórios sintéticos de
+vários tamanhos.
+
+Para cada etapa e tamanho são registrados o tempo de parede (melhor de N repetições),
+a vazão em linhas de alunos por segundo e o pico de memória (medido com tracemalloc em
+uma execução separada, para não distorcer o tempo). O tracemalloc só enxerga alocações
+do Python: a memória interna do libxml2 durante o parse e os buffers do Arrow não entram
+na conta. As exportações registram também o tamanho do arquivo gerado.
+
+Uso:
+    python benchmarks/run_benchmarks.py                       # mede e imprime
+    python benchmarks/run_benchmarks.py --save                # grava baselines/<nome>.json
+    python benchmarks/run_benchmarks.py --compare baselines/default.json
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from attendance_model import STATUS_OPTIONS, AttendanceBook  # noqa: E402
+from attendance_parser import parse_html_stream  # noqa: E402
+from columnar_export import write_attendance_columnar  # noqa: E402
+from synthetic_report import generate_report  # noqa: E402
+from xlsx_export import write_attendance_xlsx  # noqa: E402
+
+# nome -> (turmas, alunos por turma)
+SIZES = {
+    "pequeno": (10, 30),
+    "medio": (100, 35),
+    "grande": (600, 35),
+}
+
+
+def build_rosters(classes):
+    """Monta a lista de chamada de todas as turmas e marca todos os alunos."""
+    book = AttendanceBook()
+    for turma, alunos in classes.items():
+        attendance = book.ensure_class(turma, alunos)
+        for position in range(len(attendance)):
+            attendance.set_status_at(position, STATUS_OPTIONS[position % 3])
+    return book
+
+
+def output_size(write):
+    """Executa `write` em um buffer em memória e retorna o tamanho do arquivo gerado."""
+    buffer = io.BytesIO()
+    write(buffer)
+    return buffer.tell()
+
+
+def columnar(fmt):
+    return lambda ctx: output_size(
+        lambda f: write_attendance_columnar(f, fmt, "ESCOLA", ctx["parse"], ctx["rosters"]))
+
+
+# Etapas cujo resultado é o tamanho do arquivo gerado
+EXPORT_STAGES = ("xlsx", "parquet", "arrow", "csv")
+
+
+def stages(report_bytes):
+    """Etapas medidas, na ordem do fluxo da aplicação; cada função recebe os resultados anteriores."""
+    return [
+        ("parse", lambda ctx: parse_html_stream(report_bytes)),
+        ("rosters", lambda ctx: build_rosters(ctx["parse"])),
+        ("xlsx", lambda ctx: output_size(
+            lambda f: write_attendance_xlsx(f, "ESCOLA", ctx["parse"], ctx["rosters"]))),
+        ("parquet", columnar("parquet")),
+        ("arrow", columnar("arrow")),
+        ("csv", columnar("csv")),
+    ]
+
+
+def measure(fn, ctx, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn(ctx)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run(sizes, repeat):
+    results = {}
+    for size_name in sizes:
+        n_classes, n_students = SIZES[size_name]
+        report = generate_report(n_classes, n_students).encode("utf-8")
+        rows = n_classes * n_students
+        ctx = {}
+        for stage, fn in stages(report):
+            seconds, peak, ctx[stage] = measure(fn, ctx, repeat)
+            key = f"{stage}/{size_name}"
+            results[key] = {
+                "rows": rows,
+                "input_bytes": len(report),
+                "seconds": round(seconds, 5),
+                "rows_per_second": round(rows / seconds) if seconds else None,
+                "peak_bytes": peak,
+            }
+            size = ""
+            if stage in EXPORT_STAGES:
+                results[key]["output_bytes"] = ctx[stage]
+                size = f"  arquivo {ctx[stage] / 2**10:9.1f} KiB"
+            print(
+                f"{key:<18} {rows:>7} linhas  {seconds * 1000:10.1f} ms  "
+                f"{rows / seconds:12,.0f} linhas/s  pico {peak / 2**20:8.2f} MiB{size}"
+            )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Compara com uma baseline; retorna a lista de regressões acima da tolerância."""
+    regressions = []
+    print(f"\nComparação com a baseline ({baseline['created_at']}, tolerância {tolerance:.0%}):")
+    for key, current in results.items():
+        previous = baseline["results"].get(key)
+        if not previous:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if not previous[metric]:
+                continue
+            change = current[metric] / previous[metric] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  <-- REGRESSÃO"
+                regressions.append((key, metric, change))
+            print(f"  {key:<18} {metric:<11} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de processamento e exportação.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por medição (vale a melhor)")
+    parser.add_argument("--save", action="store_true", help="grava o resultado como baseline")
+    parser.add_argument("--name", default="default", help="nome do arquivo de baseline")
+    parser.add_argument("--compare", metavar="ARQUIVO", help="baseline JSON para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="piora máxima aceita antes de acusar regressão (padrão: 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat)
+    document = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    if args.save:
+        os.makedirs(os.path.join(BENCH_DIR, "baselines"), exist_ok=True)
+        path = os.path.join(BENCH_DIR, "baselines", f"{args.name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nBaseline gravada em {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Gera relatórios HTML sintéticos no formato do EducarWEB (exportação JasperReports).
+
+Cada página é uma tabela "jrPage" com o cabeçalho da prefeitura e da escola, a linha
+"Turma:", o cabeçalho "Código"/"Nome", os alunos e, na última página de cada turma, o
+rodapé "Total de Matrículas". Turmas maiores que uma página continuam na página
+seguinte sem uma nova linha "Turma:", como nos relatórios reais.
+
+Uso:
+    python benchmarks/synthetic_report.py --classes 200 --students 35 -o relatorio.html
+"""
+import argparse
+import html
+import random
+
+FIRST_NAMES = [
+    "ANA", "JOÃO", "MARIA", "PEDRO", "LUCAS", "JÚLIA", "GABRIEL", "BEATRIZ", "MATHEUS",
+    "LAURA", "HEITOR", "SOFIA", "ARTHUR", "HELENA", "DAVI", "VALENTINA", "BERNARDO",
+    "ALICE", "THÉO", "LÍVIA", "CAUÃ", "ISADORA", "JOSÉ", "LETÍCIA",
+]
+LAST_NAMES = [
+    "SILVA", "SOUZA", "OLIVEIRA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA", "NASCIMENTO",
+    "LIMA", "ARAÚJO", "FERNANDES", "CARVALHO", "GOMES", "MARTINS", "ROCHA", "RIBEIRO",
+    "ALVES", "MONTEIRO", "MENDES", "BARBOSA", "CONCEIÇÃO", "DA CRUZ", "DOS SANTOS",
+]
+SHIFTS = ["MATUTINO", "VESPERTINO", "INTEGRAL", "NOTURNO"]
+SCHOOL_NAME = "E.M. PROFESSORA MARIA DA GLÓRIA"
+MUNICIPALITY = "PREFEITURA MUNICIPAL DE JOINVILLE"
+EMITTED_AT = "10/03/2025 08:15"
+
+_STYLE = 'style="font-family: Arial; font-size: 9px; height: 14px"'
+
+
+def _cell(text, colspan=1):
+    span = f' colspan="{colspan}"' if colspan > 1 else ""
+    return f'<td{span} {_STYLE}><span>{html.escape(text)}</span></td>'
+
+
+def _spacer():
+    # Células vazias de posicionamento, comuns na saída do JasperReports
+    return '<td style="width: 0px; height: 0px"></td>'
+
+
+def _page_header():
+    return (
+        f"<tr>{_spacer()}{_cell(MUNICIPALITY, 4)}</tr>\n"
+        f"<tr>{_spacer()}{_cell('SECRETARIA DE EDUCAÇÃO', 4)}</tr>\n"
+        f"<tr>{_spacer()}{_cell(SCHOOL_NAME, 3)}{_cell('Emitido em ' + EMITTED_AT)}</tr>\n"
+    )
+
+
+def _column_header():
+    return (
+        f"<tr>{_spacer()}{_cell('Código')}{_cell('Nome')}"
+        f"{_cell('Data Nasc.')}{_cell('Situação')}</tr>\n"
+    )
+
+
+def make_classes(n_classes, students_per_class, seed=0):
+    """
+    Monta as turmas sintéticas.
+
+    Retorna:
+      list: pares (texto da turma após "Turma:", [(código, nome)]).
+    """
+    rng = random.Random(seed)
+    classes = []
+    code = 100000
+    for c in range(n_classes):
+        year = c % 9 + 1
+        letter = chr(65 + (c // 9) % 26)
+        shift = SHIFTS[c % len(SHIFTS)]
+        turma = f"{c + 1:04d} - {year}º ANO {letter} ({shift})"
+        students = []
+        for _ in range(students_per_class):
+            code += rng.randint(1, 7)
+            name = " ".join([
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                rng.choice(LAST_NAMES),
+            ])
+            students.append((str(code), name))
+        classes.append((turma, students))
+    return classes
+
+
+def generate_report(n_classes=20, students_per_class=35, rows_per_page=30, seed=0):
+    """
+    Gera o HTML de um relatório com `n_classes` turmas de `students_per_class` alunos.
+
+    Retorna:
+      str: o documento HTML completo.
+    """
+    return "".join(iter_report(n_classes, students_per_class, rows_per_page, seed))
+
+
+def iter_report(n_classes=20, students_per_class=35, rows_per_page=30, seed=0):
+    """Gera o relatório em pedaços (uma página por vez), para arquivos grandes."""
+    yield (
+        '<!DOCTYPE html>\n<html><head><meta charset="UTF-8">'
+        "<title>RelatorioEmitidoPeloEducarWEB</title></head>\n"
+        '<body text="#000000" link="#000000" alink="#000000" vlink="#000000">\n'
+    )
+    for turma, students in make_classes(n_classes, students_per_class, seed):
+        for start in range(0, max(len(students), 1), rows_per_page):
+            page = students[start:start + rows_per_page]
+            parts = ['<table class="jrPage" cellpadding="0" cellspacing="0" border="0">\n', _page_header()]
+            if start == 0:
+                parts.append(f"<tr>{_spacer()}{_cell('Turma: ' + turma, 4)}</tr>\n")
+            parts.append(_column_header())
+            for code, name in page:
+                parts.append(
+                    f"<tr>{_spacer()}{_cell(code)}{_cell(name)}"
+                    f"{_cell('01/01/2015')}{_cell('Matriculado')}</tr>\n"
+                )
+            if start + rows_per_page >= len(students):
+                parts.append(f"<tr>{_spacer()}{_cell(f'Total de Matrículas: {len(students)}', 4)}</tr>\n")
+            parts.append("</table>\n")
+            yield "".join(parts)
+    yield "</body></html>\n"
+
+
+def write_report(path, n_classes=20, students_per_class=35, rows_per_page=30, seed=0):
+    """Grava o relatório em `path` sem montar o documento inteiro em memória."""
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in iter_report(n_classes, students_per_class, rows_per_page, seed):
+            f.write(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um relatório sintético do EducarWEB.")
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students", type=int, default=35)
+    parser.add_argument("--rows-per-page", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="RelatorioSintetico.html")
+    args = parser.parse_args(argv)
+    write_report(args.output, args.classes, args.students, args.rows_per_page, args.seed)
+    print(f"{args.output}: {args.classes} turmas x {args.students} alunos")
+
+
+if __name__ == "__main__":
+    main()
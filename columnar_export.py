@@ -0,0 +1,342 @@
+"""
+Exportação tabular (uma linha por aluno) das presenças, para análise em outras ferramentas.
+
+Cada registro tem as colunas escola, turma, data, aluno, presenca e observacao. Em
+Parquet e Arrow IPC as colunas são tipadas: escola, turma e presenca saem
+dicionarizadas (o texto é gravado uma vez e as linhas guardam apenas o índice) e a data
+é uma data de verdade, não um texto. Os dicionários são montados antes da primeira linha
+e são os mesmos em todos os lotes do arquivo.
+
+Há duas fontes de registros: as turmas da sessão em um dia (`write_attendance_columnar`)
+e as marcações gravadas no banco para várias escolas em um período
+(`write_store_columnar`), que é a usada na aba de exportação para análise.
+
+Os três formatos são gravados em lotes de até `chunk_rows` linhas, sem montar a tabela
+inteira em memória. O pyarrow só é importado quando Parquet ou Arrow é pedido.
+"""
+import csv
+import hashlib
+import io
+import tempfile
+from datetime import date
+
+from attendance_model import STATUS_OPTIONS
+from batch_import import turma_key
+
+COLUMNS = ("escola", "turma", "data", "aluno", "presenca", "observacao")
+
+# formato -> (extensão, tipo MIME)
+COLUMNAR_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+    "csv": (".csv", "text/csv"),
+}
+
+DEFAULT_CHUNK_ROWS = 64 * 1024
+
+
+def iter_classes(school_name, classes, schools=None):
+    """
+    Gera (escola, turma, chave) para cada turma de `classes`.
+
+    Quando a sessão tem várias escolas (`schools` com mais de uma), a escola e o nome
+    original da turma são separados da chave prefixada usada em `classes`.
+    """
+    if schools and len(schools) > 1:
+        for school, report in schools.items():
+            for turma in report.classes:
+                key = turma_key(school, turma, len(schools))
+                if key in classes:
+                    yield school, turma, key
+        return
+    for turma in classes:
+        yield school_name, turma, turma
+
+
+def iter_records(school_name, classes, attendance=None, day=None, schools=None):
+    """
+    Gera uma tupla por aluno, na ordem de `COLUMNS`.
+
+    Alunos sem marcação saem com presenca None; observações vazias saem como None.
+    """
+    day = day or date.today()
+    for school, turma, key in iter_classes(school_name, classes, schools):
+        class_attendance = attendance.get(key) if attendance is not None else None
+        if class_attendance is None:
+            for student in classes[key]:
+                yield (school, turma, day, student, None, None)
+            continue
+        for student, status, observation in class_attendance.rows():
+            yield (school, turma, day, student, status, observation or None)
+
+
+def iter_store_records(store, schools, start, end, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Gera uma tupla por marcação gravada no `AttendanceStore`, na ordem de `COLUMNS`, das
+    escolas `schools` entre as datas `start` e `end` (`date`, inclusive).
+
+    As linhas são lidas do banco em lotes de `chunk_rows`; observações vazias saem como None.
+    """
+    dates = {}  # Poucas datas distintas: cada texto ISO é convertido uma vez
+    for school, turma, day, student, status, observation in store.iter_marks(
+            schools, start.isoformat(), end.isoformat(), chunk_rows):
+        parsed = dates.get(day)
+        if parsed is None:
+            parsed = dates[day] = date.fromisoformat(day)
+        yield (school, turma, parsed, student, status, observation or None)
+
+
+def records_sha256(records, *options):
+    """
+    SHA-256 do conteúdo de uma exportação: os registros (na ordem de `COLUMNS`) e as
+    opções que mudam o arquivo (formato, uma planilha por turma...).
+
+    Os bytes de um XLSX mudam a cada geração, mesmo com os mesmos dados (o openpyxl grava
+    a hora nas propriedades do documento e nas entradas do zip), então os envios ao Drive
+    são deduplicados por este hash e não pelo hash do arquivo.
+    """
+    digest = hashlib.sha256(repr(options).encode("utf-8"))
+    for record in records:
+        # repr distingue None de "" e grava a data sem depender do formato do arquivo
+        digest.update(repr(record).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def write_attendance_columnar(target, fmt, school_name, classes, attendance=None, day=None,
+                              schools=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Grava as presenças em formato tabular.
+
+    Parâmetros:
+      target: caminho ou objeto de arquivo binário de destino.
+      fmt: "parquet", "arrow" (arquivo Arrow IPC) ou "csv".
+      school_name: escola das turmas quando a sessão tem uma só.
+      classes: dict {turma: [alunos]}.
+      attendance: `AttendanceBook` com as marcações (turmas ausentes saem em branco).
+      day: data dos registros (padrão: hoje).
+      schools: dict {escola: ParsedReport} de uma importação em lote, se houver.
+      chunk_rows: linhas por lote gravado.
+
+    Retorna:
+      int: quantidade de linhas gravadas.
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt!r}")
+    if fmt == "csv":
+        return _write_csv(target, iter_records(school_name, classes, attendance, day, schools), chunk_rows)
+    return _write_arrow(target, fmt, school_name, classes, attendance, day, schools, chunk_rows)
+
+
+def write_store_columnar(target, fmt, store, schools, start, end, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Grava em formato tabular as marcações salvas no banco, de várias escolas e dias.
+
+    Só entram alunos com marcação gravada; as turmas nunca salvas não aparecem.
+
+    Parâmetros:
+      target: caminho ou objeto de arquivo binário de destino.
+      fmt: "parquet", "arrow" (arquivo Arrow IPC) ou "csv".
+      store: `AttendanceStore` de onde as marcações são lidas.
+      schools: escolas incluídas.
+      start, end: primeira e última data (`date`) do período.
+      chunk_rows: linhas lidas do banco e gravadas por lote.
+
+    Retorna:
+      int: quantidade de linhas gravadas.
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt!r}")
+    records = iter_store_records(store, schools, start, end, chunk_rows)
+    if fmt == "csv":
+        return _write_csv(target, records, chunk_rows)
+    # Os dicionários do arquivo precisam das turmas antes da primeira linha
+    turmas = store.turmas(schools, start.isoformat(), end.isoformat())
+    return _write_records_arrow(target, fmt, records, schools, turmas, chunk_rows)
+
+
+def export_columnar_to_tempfile(fmt, school_name, classes, attendance=None, day=None, schools=None):
+    """
+    Gera a exportação tabular em um arquivo temporário (em memória até 16 MB, depois em disco).
+
+    Retorna:
+      tuple: (arquivo posicionado no início, quantidade de linhas).
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    rows = write_attendance_columnar(output, fmt, school_name, classes, attendance, day, schools)
+    output.seek(0)
+    return output, rows
+
+
+def export_store_to_tempfile(fmt, store, schools, start, end):
+    """
+    Gera a exportação tabular do banco (ver `write_store_columnar`) em um arquivo temporário.
+
+    Retorna:
+      tuple: (arquivo posicionado no início, quantidade de linhas).
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    try:
+        rows = write_store_columnar(output, fmt, store, schools, start, end)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output, rows
+
+
+def _write_csv(target, records, chunk_rows):
+    close = isinstance(target, str)
+    binary = open(target, "wb") if close else target
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="", write_through=False)
+    try:
+        writer = csv.writer(text)
+        writer.writerow(COLUMNS)
+        rows = 0
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                writer.writerows(chunk)
+                rows += len(chunk)
+                chunk.clear()
+        writer.writerows(chunk)
+        rows += len(chunk)
+        text.flush()
+    finally:
+        # Devolve o arquivo binário ao chamador sem fechá-lo
+        text.detach()
+        if close:
+            binary.close()
+    return rows
+
+
+def arrow_schema():
+    """Esquema Arrow dos registros (importa o pyarrow)."""
+    import pyarrow as pa
+    return pa.schema([
+        ("escola", pa.dictionary(pa.int32(), pa.string())),
+        ("turma", pa.dictionary(pa.int32(), pa.string())),
+        ("data", pa.date32()),
+        ("aluno", pa.string()),
+        ("presenca", pa.dictionary(pa.int8(), pa.string())),
+        ("observacao", pa.string()),
+    ])
+
+
+def _write_arrow(target, fmt, school_name, classes, attendance, day, schools, chunk_rows):
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    day = day or date.today()
+    sources = list(iter_classes(school_name, classes, schools))
+
+    # Dicionários fixos para o arquivo inteiro: cada lote só referencia os índices
+    school_index = {}
+    turma_index = {}
+    for school, turma, _ in sources:
+        school_index.setdefault(school, len(school_index))
+        turma_index.setdefault(turma, len(turma_index))
+    school_dict = pa.array(list(school_index), pa.string())
+    turma_dict = pa.array(list(turma_index), pa.string())
+    status_dict = pa.array(STATUS_OPTIONS, pa.string())
+
+    writer = _arrow_writer(target, fmt, schema)
+
+    rows = 0
+    schools_col, turmas_col, students_col, status_col, notes_col = [], [], [], [], []
+
+    def flush():
+        size = len(students_col)
+        if not size:
+            return
+        writer.write_batch(pa.RecordBatch.from_arrays([
+            pa.DictionaryArray.from_arrays(pa.array(schools_col, pa.int32()), school_dict),
+            pa.DictionaryArray.from_arrays(pa.array(turmas_col, pa.int32()), turma_dict),
+            pa.repeat(pa.scalar(day, pa.date32()), size),
+            pa.array(students_col, pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(status_col, pa.int8()), status_dict),
+            pa.array(notes_col, pa.string()),
+        ], schema=schema))
+        for column in (schools_col, turmas_col, students_col, status_col, notes_col):
+            column.clear()
+
+    try:
+        for school, turma, key in sources:
+            students = classes[key]
+            class_attendance = attendance.get(key) if attendance is not None else None
+            if class_attendance is not None:
+                students = class_attendance.students
+                # Código 0 (não marcado) vira nulo; os demais viram o índice no dicionário
+                status_col.extend(code - 1 if code else None for code in class_attendance.status)
+                observations = class_attendance.observations
+                notes_col.extend(observations.get(position) for position in range(len(students)))
+            else:
+                status_col.extend([None] * len(students))
+                notes_col.extend([None] * len(students))
+            students_col.extend(students)
+            schools_col.extend([school_index[school]] * len(students))
+            turmas_col.extend([turma_index[turma]] * len(students))
+            rows += len(students)
+            if len(students_col) >= chunk_rows:
+                flush()
+        flush()
+    finally:
+        writer.close()
+    return rows
+
+
+def _write_records_arrow(target, fmt, records, school_names, turma_names, chunk_rows):
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    school_index = {school: i for i, school in enumerate(dict.fromkeys(school_names))}
+    turma_index = {turma: i for i, turma in enumerate(dict.fromkeys(turma_names))}
+    status_index = {status: i for i, status in enumerate(STATUS_OPTIONS)}
+    school_dict = pa.array(list(school_index), pa.string())
+    turma_dict = pa.array(list(turma_index), pa.string())
+    status_dict = pa.array(STATUS_OPTIONS, pa.string())
+
+    writer = _arrow_writer(target, fmt, schema)
+    rows = 0
+    columns = schools_col, turmas_col, dates_col, students_col, status_col, notes_col = (
+        [], [], [], [], [], [])
+
+    def flush():
+        if not students_col:
+            return
+        writer.write_batch(pa.RecordBatch.from_arrays([
+            pa.DictionaryArray.from_arrays(pa.array(schools_col, pa.int32()), school_dict),
+            pa.DictionaryArray.from_arrays(pa.array(turmas_col, pa.int32()), turma_dict),
+            pa.array(dates_col, pa.date32()),
+            pa.array(students_col, pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(status_col, pa.int8()), status_dict),
+            pa.array(notes_col, pa.string()),
+        ], schema=schema))
+        for column in columns:
+            column.clear()
+
+    try:
+        for school, turma, day, student, status, observation in records:
+            schools_col.append(school_index[school])
+            turmas_col.append(turma_index[turma])
+            dates_col.append(day)
+            students_col.append(student)
+            status_col.append(status_index.get(status))
+            notes_col.append(observation)
+            rows += 1
+            if len(students_col) >= chunk_rows:
+                flush()
+        flush()
+    finally:
+        writer.close()
+    return rows
+
+
+def _arrow_writer(target, fmt, schema):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(target, schema, compression="zstd")
+    # Sem compressão: o arquivo pode ser lido com memory map, sem cópia
+    import pyarrow as pa
+    return pa.ipc.new_file(target, schema)
@@ -0,0 +1,299 @@
+"""
+Conversão em lote de relatórios do EducarWEB, sem a interface do Streamlit.
+
+Cada relatório gera um arquivo no diretório de saída (CSV, XLSX ou JSON Lines) com a
+lista de chamada de todas as turmas e as colunas de presença e observação em branco,
+prontas para serem preenchidas. Os relatórios são processados em paralelo, um processo
+por núcleo, e cada processo grava o seu arquivo à medida que percorre as turmas.
+
+O SHA-256 de cada relatório fica registrado, por formato, em um manifesto no diretório
+de saída; na execução seguinte, relatórios com o mesmo conteúdo (e saída no mesmo
+formato ainda presente) são pulados sem serem processados.
+
+Uso:
+    python convert_reports.py relatorios/ "entrada/*.html" -o saida/ --format csv
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from attendance_parser import parse_report
+from xlsx_export import write_attendance_xlsx
+
+FORMATS = ("csv", "xlsx", "jsonl")
+MANIFEST_NAME = ".paestro-manifest.json"
+REPORT_EXTENSIONS = (".html", ".htm")
+
+_COLUMNS = ("escola", "turma", "codigo_turma", "turno", "aluno", "presenca", "observacao")
+
+
+def find_reports(inputs):
+    """
+    Expande diretórios (recursivamente) e padrões glob em uma lista ordenada de
+    relatórios, sem repetições.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(
+                    os.path.join(root, name) for name in files
+                    if name.lower().endswith(REPORT_EXTENSIONS)
+                )
+        else:
+            paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def output_names(paths, fmt):
+    """Nome do arquivo de saída de cada relatório; nomes repetidos recebem um sufixo."""
+    names = {}
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = f"{stem}.{fmt}"
+        counter = 2
+        while name.lower() in used:
+            name = f"{stem}_{counter}.{fmt}"
+            counter += 1
+        used.add(name.lower())
+        names[path] = name
+    return names
+
+
+def convert_report(path, output_path, fmt, previous_hash=None):
+    """
+    Processa um relatório e grava a saída. Executado nos processos filhos.
+
+    Se o SHA-256 do conteúdo for igual a `previous_hash`, o relatório não é processado.
+
+    Retorna:
+      dict: path, sha256, status ("ok", "skipped" ou "error"), error, classes,
+            students, input_bytes, output_bytes e seconds.
+    """
+    start = time.perf_counter()
+    result = {
+        "path": path, "sha256": None, "status": "ok", "error": None,
+        "classes": 0, "students": 0, "input_bytes": 0, "output_bytes": 0, "seconds": 0.0,
+    }
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        result["input_bytes"] = len(data)
+        result["sha256"] = hashlib.sha256(data).hexdigest()
+        if result["sha256"] == previous_hash:
+            result["status"] = "skipped"
+            return result
+
+        report = parse_report(data)
+        del data
+        if not report.classes:
+            raise ValueError("Nenhuma turma encontrada no arquivo.")
+
+        result["classes"] = len(report.classes)
+        result["students"] = _write_output(report, output_path, fmt)
+        result["output_bytes"] = os.path.getsize(output_path)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _write_output(report, output_path, fmt):
+    # Grava em um temporário no mesmo diretório: uma execução interrompida nunca
+    # deixa um arquivo pela metade que pareceria atualizado na próxima
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp")
+    try:
+        if fmt == "xlsx":
+            with os.fdopen(fd, "wb") as f:
+                students = write_attendance_xlsx(f, report.school_name or "Escola", report.classes)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                if fmt == "csv":
+                    students = _write_csv(f, report)
+                else:
+                    students = _write_jsonl(f, report)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return students
+
+
+def _iter_rows(report):
+    school = report.school_name or ""
+    for turma, alunos in report.classes.items():
+        info = report.turmas.get(turma)
+        code = info.code if info else None
+        shift = info.shift if info else None
+        for aluno in alunos:
+            yield (school, turma, code or "", shift or "", aluno, "", "")
+
+
+def _write_csv(f, report):
+    writer = csv.writer(f)
+    writer.writerow(_COLUMNS)
+    students = 0
+    for row in _iter_rows(report):
+        writer.writerow(row)
+        students += 1
+    return students
+
+
+def _write_jsonl(f, report):
+    students = 0
+    for row in _iter_rows(report):
+        f.write(json.dumps(dict(zip(_COLUMNS, row)), ensure_ascii=False))
+        f.write("\n")
+        students += 1
+    return students
+
+
+def load_manifest(path):
+    """
+    Lê o manifesto das execuções anteriores: {relatório: {formato: {sha256, output}}}.
+
+    Entradas em outro formato (como as de versões anteriores, sem o nível do formato)
+    são descartadas, e os relatórios correspondentes são processados de novo.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    entries = {}
+    for report, outputs in manifest.items():
+        if isinstance(outputs, dict):
+            outputs = {fmt: entry for fmt, entry in outputs.items()
+                       if fmt in FORMATS and isinstance(entry, dict)}
+            if outputs:
+                entries[report] = outputs
+    return entries
+
+
+def save_manifest(path, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run(paths, output_dir, fmt, workers=None, force=False, progress=None):
+    """
+    Converte os relatórios em `paths` para `output_dir`.
+
+    Parâmetros:
+      workers: número de processos (padrão: número de núcleos).
+      force: processa todos os relatórios, mesmo os que não mudaram.
+      progress: função opcional chamada com o resultado de cada relatório.
+
+    Retorna:
+      list: resultados de `convert_report`, na ordem de `paths`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    names = output_names(paths, fmt)
+
+    jobs = []
+    for path in paths:
+        output_path = os.path.join(output_dir, names[path])
+        entry = manifest.get(path, {}).get(fmt, {})
+        previous_hash = None
+        if not force and entry.get("output") == names[path] and os.path.exists(output_path):
+            previous_hash = entry.get("sha256")
+        jobs.append((path, output_path, fmt, previous_hash))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    results = []
+    try:
+        if workers == 1:
+            for job in jobs:
+                results.append(_record(manifest, convert_report(*job), fmt, names, progress))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map mantém a ordem de entrada e entrega cada resultado assim que pronto
+                for result in executor.map(convert_report, *zip(*jobs)):
+                    results.append(_record(manifest, result, fmt, names, progress))
+    finally:
+        save_manifest(manifest_path, manifest)
+    return results
+
+
+def _record(manifest, result, fmt, names, progress):
+    path = result["path"]
+    if result["status"] == "ok":
+        manifest.setdefault(path, {})[fmt] = {"sha256": result["sha256"], "output": names[path]}
+    elif result["status"] == "error" and path in manifest:
+        manifest[path].pop(fmt, None)
+        if not manifest[path]:
+            del manifest[path]
+    if progress:
+        progress(result)
+    return result
+
+
+def summarize(results, elapsed):
+    """Texto com a vazão da execução."""
+    done = [r for r in results if r["status"] == "ok"]
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    failed = sum(1 for r in results if r["status"] == "error")
+    students = sum(r["students"] for r in done)
+    input_mb = sum(r["input_bytes"] for r in done) / 2**20
+    output_mb = sum(r["output_bytes"] for r in done) / 2**20
+    elapsed = max(elapsed, 1e-9)
+    return (
+        f"{len(results)} relatório(s): {len(done)} convertido(s), {skipped} sem alteração, "
+        f"{failed} com erro\n"
+        f"{sum(r['classes'] for r in done)} turmas, {students} alunos, "
+        f"{input_mb:.1f} MiB lidos, {output_mb:.1f} MiB gravados em {elapsed:.2f} s\n"
+        f"{len(done) / elapsed:.1f} relatórios/s, {input_mb / elapsed:.1f} MiB/s, "
+        f"{students / elapsed:,.0f} alunos/s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte relatórios do EducarWEB em listas de chamada.")
+    parser.add_argument("inputs", nargs="+", help="arquivos, diretórios ou padrões glob")
+    parser.add_argument("-o", "--output-dir", default="listas", help="diretório de saída (padrão: listas)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument("--force", action="store_true", help="reprocessa também os relatórios sem alteração")
+    parser.add_argument("-q", "--quiet", action="store_true", help="não lista cada relatório")
+    args = parser.parse_args(argv)
+
+    paths = find_reports(args.inputs)
+    if not paths:
+        print("Nenhum relatório encontrado.", file=sys.stderr)
+        return 2
+
+    def progress(result):
+        if result["status"] == "error":
+            print(f"ERRO  {result['path']}: {result['error']}", file=sys.stderr)
+        elif not args.quiet:
+            label = "ok   " if result["status"] == "ok" else "igual"
+            print(f"{label} {result['path']} ({result['students']} alunos, {result['seconds']:.2f} s)")
+
+    start = time.perf_counter()
+    results = run(paths, args.output_dir, args.format, args.workers, args.force, progress)
+    print(summarize(results, time.perf_counter() - start))
+    return 1 if any(r["status"] == "error" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
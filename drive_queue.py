@@ -0,0 +1,335 @@
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS drive_jobs (
+    id              TEXT PRIMARY KEY,
+    filename        TEXT NOT NULL,
+    folder_name     TEXT,
+    mimetype        TEXT NOT NULL,
+    payload         BLOB,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    result_url      TEXT,
+    error           TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS drive_jobs_due ON drive_jobs (status, next_attempt_at);
+
+-- Último arquivo enviado para cada chave de exportação (ver `enqueue`)
+CREATE TABLE IF NOT EXISTS drive_exports (
+    export_key  TEXT PRIMARY KEY,
+    file_id     TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    url         TEXT,
+    updated_at  REAL NOT NULL
+);
+"""
+
+# Colunas acrescentadas a bancos criados antes das exportações com chave
+_JOB_COLUMNS = {"export_key": "TEXT", "sha256": "TEXT", "action": "TEXT"}
+
+# Situações possíveis de um envio
+PENDING = "pending"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+
+
+def _upload_to_drive(data, filename, mimetype, folder_name, export_key=None, known=None,
+                     content_hash=None):
+    """
+    Envia ao Drive. Com chave, usa `sync_export` (atualiza o arquivo existente em vez de
+    criar outro); sem chave, cria um arquivo novo.
+
+    Retorna:
+      dict: id, url, sha256 e action ("created", "updated" ou "unchanged").
+    """
+    # Importado só quando o primeiro envio é executado
+    from gdrive_exporter import sync_export, upload_bytes
+    if export_key:
+        return sync_export(data, filename, mimetype, folder_name, export_key, known, content_hash)
+    return {"id": None, "url": upload_bytes(data, filename, mimetype, folder_name),
+            "sha256": None, "action": "created"}
+
+
+def export_key(*parts):
+    """Chave estável de uma exportação, por exemplo export_key(escola, turma, data)."""
+    return "|".join(str(part) for part in parts)
+
+
+def is_retryable(error):
+    """
+    Indica se vale a pena tentar o envio de novo: erros 5xx e 429 do Drive e falhas
+    de rede são temporários; credenciais ausentes e demais erros 4xx não são.
+    """
+    if type(error).__name__ == "DriveCredentialsError":
+        return False
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status is not None:
+        return int(status) >= 500 or int(status) == 429
+    return True
+
+
+class ExportQueue:
+    """
+    Fila de envios ao Google Drive executada em threads de fundo.
+
+    Os envios são gravados em SQLite antes de serem executados, de modo que sobrevivem a
+    um reinício do servidor. Um envio em andamento fica reservado por `lease_timeout`
+    segundos; depois disso, considera-se que o processo que o executava parou e ele volta
+    para a fila. Outros processos com o mesmo banco (ou um reinício logo após uma queda)
+    não repetem envios que ainda podem estar em andamento, e o resultado de uma reserva
+    vencida é descartado se o envio já tiver sido retomado por outra thread. Cada envio
+    com erro temporário é repetido com espera exponencial (com variação aleatória) até
+    `max_attempts` tentativas.
+
+    O conteúdo de um envio é apagado assim que ele termina (concluído ou com falha
+    definitiva), e os registros terminados há mais de `retention` segundos são removidos,
+    para que a fila não faça crescer sem limite o banco, que é o mesmo das presenças.
+
+    Envios com `export_key` são deduplicados pelo SHA-256 do conteúdo (ou pelo
+    `content_hash` informado, para arquivos como o XLSX, cujos bytes mudam a cada
+    geração mesmo com os mesmos dados): o arquivo enviado
+    por último para cada chave fica registrado em `drive_exports`, e um conteúdo igual é
+    concluído na hora, sem chegar ao Drive; um conteúdo novo atualiza o mesmo arquivo.
+    """
+
+    def __init__(self, db_path, uploader=_upload_to_drive, workers=2, max_attempts=5,
+                 base_delay=2.0, max_delay=300.0, lease_timeout=900.0, retention=7 * 24 * 3600.0):
+        self.db_path = db_path
+        self.uploader = uploader
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_timeout = lease_timeout
+        self.retention = retention
+        self._next_purge = 0.0
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(drive_jobs)")}
+        for column, column_type in _JOB_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE drive_jobs ADD COLUMN {column} {column_type}")
+        now = time.time()
+        self._reclaim_expired(conn, now)
+        self._purge_finished(conn, now)
+
+    def _purge_finished(self, conn, now):
+        """Remove os envios terminados há mais de `retention` segundos (no máximo uma vez por hora)."""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + min(self.retention, 3600.0)
+        conn.execute(
+            "DELETE FROM drive_jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, now - self.retention),
+        )
+
+    def _reclaim_expired(self, conn, now):
+        """Devolve à fila os envios cuja reserva venceu (o processo que os executava parou)."""
+        conn.execute(
+            "UPDATE drive_jobs SET status = ?, next_attempt_at = ?, updated_at = ? "
+            "WHERE status = ? AND updated_at < ?",
+            (PENDING, now, now, RUNNING, now - self.lease_timeout),
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def start(self):
+        """Inicia as threads de envio (uma única vez)."""
+        if self._threads:
+            return self
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"drive-export-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Encerra as threads após o envio em andamento."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, data, filename, mimetype="text/csv", folder_name=None, export_key=None,
+                content_hash=None):
+        """
+        Agenda um envio e retorna imediatamente.
+
+        Com `export_key`, se o último envio dessa chave teve o mesmo conteúdo, o envio é
+        registrado como concluído ("unchanged") sem ser executado. `content_hash`
+        substitui o SHA-256 de `data` na comparação (ver `records_sha256`).
+
+        Retorna:
+          str: identificador do envio, usado em `get_job`.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connection()
+        sha256 = (content_hash or hashlib.sha256(data).hexdigest()) if export_key else None
+        if export_key:
+            known = self._known_export(export_key)
+            if known and known["sha256"] == sha256:
+                conn.execute(
+                    "INSERT INTO drive_jobs (id, filename, folder_name, mimetype, status, "
+                    "next_attempt_at, result_url, created_at, updated_at, export_key, sha256, action) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, filename, folder_name, mimetype, DONE, now, known["url"], now, now,
+                     export_key, sha256, "unchanged"),
+                )
+                return job_id
+        conn.execute(
+            "INSERT INTO drive_jobs (id, filename, folder_name, mimetype, payload, status, "
+            "next_attempt_at, created_at, updated_at, export_key, sha256) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, filename, folder_name, mimetype, sqlite3.Binary(data), PENDING, now, now, now,
+             export_key, sha256),
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def _known_export(self, export_key):
+        row = self._connection().execute(
+            "SELECT file_id, sha256, url FROM drive_exports WHERE export_key = ?", (export_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "sha256": row[1], "url": row[2]}
+
+    def get_job(self, job_id):
+        """
+        Retorna a situação de um envio, ou None se ele não existir.
+
+        Retorna:
+          dict: id, filename, status, attempts, url, error, next_attempt_at e action
+                ("created", "updated" ou "unchanged", depois de concluído).
+        """
+        row = self._connection().execute(
+            "SELECT id, filename, status, attempts, result_url, error, next_attempt_at, action "
+            "FROM drive_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "filename", "status", "attempts", "url", "error", "next_attempt_at", "action")
+        return dict(zip(keys, row))
+
+    def _claim_next(self):
+        """Reserva o próximo envio vencido; retorna (job, segundos até o próximo)."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_expired(conn, now)
+            self._purge_finished(conn, now)
+            row = conn.execute(
+                "SELECT id, filename, folder_name, mimetype, payload, attempts, next_attempt_at, "
+                "export_key, sha256 FROM drive_jobs WHERE status IN (?, ?) "
+                # Um envio por chave de cada vez, para não criar o mesmo arquivo duas vezes
+                "AND (export_key IS NULL OR export_key NOT IN "
+                "(SELECT export_key FROM drive_jobs WHERE status = ? AND export_key IS NOT NULL)) "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (PENDING, RETRYING, RUNNING),
+            ).fetchone()
+            if row is None or row[6] > now:
+                conn.execute("COMMIT")
+                return None, (row[6] - now) if row else None
+            conn.execute(
+                "UPDATE drive_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row, 0
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            try:
+                job, wait = self._claim_next()
+            except sqlite3.Error:
+                job, wait = None, 1.0
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(timeout=min(wait, 30.0) if wait is not None else 30.0)
+                continue
+            self._execute(job)
+
+    def _execute(self, job):
+        job_id, filename, folder_name, mimetype, payload, attempts, _, key, sha256 = job
+        attempts += 1
+        conn = self._connection()
+        # Só atualiza o envio se a reserva ainda for desta tentativa
+        lease = "WHERE id = ? AND status = ? AND attempts = ?"
+        lease_args = (job_id, RUNNING, attempts)
+        try:
+            if key:
+                # Consultado na hora do envio: um envio anterior da mesma chave pode ter
+                # terminado depois que este foi agendado
+                result = self.uploader(bytes(payload), filename, mimetype, folder_name,
+                                       key, self._known_export(key), sha256)
+            else:
+                result = self.uploader(bytes(payload), filename, mimetype, folder_name)
+        except Exception as e:
+            now = time.time()
+            if is_retryable(e) and attempts < self.max_attempts:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                conn.execute(
+                    "UPDATE drive_jobs SET status = ?, error = ?, next_attempt_at = ?, updated_at = ? "
+                    + lease,
+                    (RETRYING, str(e), now + delay, now) + lease_args,
+                )
+                with self._wakeup:
+                    self._wakeup.notify()  # Recalcula a espera das outras threads
+            else:
+                conn.execute(
+                    # O conteúdo não será mais enviado
+                    "UPDATE drive_jobs SET status = ?, error = ?, payload = NULL, updated_at = ? " + lease,
+                    (FAILED, str(e), now) + lease_args,
+                )
+            return
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN")
+            # O conteúdo não é mais necessário depois do envio
+            updated = conn.execute(
+                "UPDATE drive_jobs SET status = ?, result_url = ?, error = NULL, payload = NULL, "
+                "action = ?, updated_at = ? " + lease,
+                (DONE, result["url"], result.get("action"), now) + lease_args,
+            ).rowcount
+            if updated and key and result.get("id"):
+                conn.execute(
+                    "INSERT OR REPLACE INTO drive_exports (export_key, file_id, sha256, url, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, result["id"], result["sha256"], result["url"], now),
+                )
@@ -1,131 +1,418 @@
 import os
-import pandas as pd
+import hashlib
 import io
 import json
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
+import threading
+import time
 import streamlit as st
 
+import metrics
+
+# The Google client libraries are imported inside the functions that use them, so that
+# importing this module (and starting the app) does not pay for them until the first upload
+
 # If modifying these SCOPES, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
-def get_credentials():
+# How long a folder name -> ID lookup is reused before asking Drive again
+FOLDER_CACHE_TTL = 600
+
+# Payloads up to this size go in a single multipart request instead of a resumable session
+SIMPLE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# appProperties stored on keyed exports (see sync_export)
+EXPORT_KEY_PROPERTY = 'paestroExportKey'
+EXPORT_HASH_PROPERTY = 'paestroSha256'
+
+# Per-process client state: credentials and the discovery-built service are created once
+_client_lock = threading.Lock()
+_credentials = None
+_service = None
+_thread_local = threading.local()
+_folder_cache = {}
+_folder_lock = threading.Lock()
+
+
+class DriveCredentialsError(Exception):
+    """Raised when no usable Google Drive credentials are configured."""
+
+
+def load_credentials():
     """
-    Get or create credentials for Google Drive API.
-    Prioritizes environment variables for service account credentials.
-    Falls back to interactive OAuth flow if needed.
-    
+    Load credentials for Google Drive API without touching the UI.
+    Prioritizes environment variables for service account credentials,
+    then falls back to a previously authorized token.json.
+
     Returns:
         Credentials: The Google API credentials
+
+    Raises:
+        DriveCredentialsError: If no valid credentials are available
     """
+    from google.auth.transport.requests import Request
+    from google.oauth2 import service_account
+    from google.oauth2.credentials import Credentials
+
     creds = None
-    
+    service_account_error = None
+
     # Try to use service account credentials from environment variables
     if os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON'):
         try:
             service_account_info = json.loads(os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON'))
-            creds = service_account.Credentials.from_service_account_info(
+            return service_account.Credentials.from_service_account_info(
                 service_account_info, scopes=SCOPES)
-            return creds
         except Exception as e:
-            st.warning(f"Error loading service account credentials: {e}")
-    
+            service_account_error = e
+
     # If service account credentials not available, try user credentials
     # Check if token.json exists
     if os.path.exists('token.json'):
         try:
-            creds = Credentials.from_authorized_user_info(json.loads(
-                open('token.json', 'r').read()), SCOPES)
+            with open('token.json', 'r') as f:
+                creds = Credentials.from_authorized_user_info(json.load(f), SCOPES)
         except Exception:
             pass
-    
-    # If no valid credentials available, we'll need to handle through the UI
+
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+
     if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # In a Streamlit app, we need to handle the OAuth flow differently
-            st.error("""
-            Google Drive authentication is required but not configured.
-            
-            Please provide API credentials through environment variables or contact the administrator.
-            """)
-            # Provide a fallback for testing - create a download button
-            st.info("In the meantime, you can download the file directly instead of using Google Drive.")
-            raise Exception("Google Drive credentials not configured")
-            
+        message = "Google Drive credentials not configured"
+        if service_account_error is not None:
+            message += f" (error loading service account credentials: {service_account_error})"
+        raise DriveCredentialsError(message)
+
     return creds
 
-def export_to_gdrive(df, filename, folder_name=None):
+
+def get_credentials():
+    """
+    Get or create credentials for Google Drive API.
+    Prioritizes environment variables for service account credentials.
+    Falls back to interactive OAuth flow if needed.
+
+    Returns:
+        Credentials: The Google API credentials
+    """
+    try:
+        return load_credentials()
+    except DriveCredentialsError:
+        # In a Streamlit app, we need to handle the OAuth flow differently
+        st.error("""
+        Google Drive authentication is required but not configured.
+
+        Please provide API credentials through environment variables or contact the administrator.
+        """)
+        # Provide a fallback for testing - create a download button
+        st.info("In the meantime, you can download the file directly instead of using Google Drive.")
+        raise
+
+
+def get_drive_service():
+    """
+    Return the per-process Drive client, building it on first use.
+
+    The discovery document is processed once per process. Credentials are refreshed
+    when they expire. Set GOOGLE_DRIVE_API_ROOT (e.g. http://127.0.0.1:8080/) to point
+    the client at another server, such as a local fake Drive used in development.
+
+    Returns:
+        Resource: The Drive v3 service
+    """
+    global _credentials, _service
+    with _client_lock:
+        if _service is None:
+            _credentials = load_credentials()
+            _service = _build_service(_credentials)
+        elif not _credentials.valid and getattr(_credentials, 'refresh_token', True):
+            from google.auth.transport.requests import Request
+            _credentials.refresh(Request())
+        return _service
+
+
+def _build_service(creds):
+    from googleapiclient.discovery import build, build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+
+    root_url = os.environ.get('GOOGLE_DRIVE_API_ROOT')
+    if not root_url:
+        return build('drive', 'v3', credentials=creds, cache_discovery=False)
+
+    # Rewrite every URL in the bundled discovery document, including the upload and
+    # batch endpoints that the client_options api_endpoint override leaves untouched
+    document = json.loads(get_static_doc('drive', 'v3'))
+    root_url = root_url.rstrip('/') + '/'
+    document['rootUrl'] = document['mtlsRootUrl'] = root_url
+    document['baseUrl'] = root_url + document['servicePath']
+    return build_from_document(document, credentials=creds)
+
+
+def reset_drive_client():
+    """Forget the cached client, credentials and folder IDs (e.g. after changing credentials)."""
+    global _credentials, _service
+    with _client_lock:
+        _credentials = None
+        _service = None
+        _folder_cache.clear()
+    _thread_local.__dict__.clear()
+
+
+def _thread_http():
+    """
+    Authorized HTTP transport for the current thread.
+
+    httplib2 is not thread-safe, so the shared service object is executed with a
+    per-thread transport, as recommended by google-api-python-client.
+    """
+    http = getattr(_thread_local, 'http', None)
+    if http is None or http.credentials is not _credentials:
+        import google_auth_httplib2
+        import httplib2
+        http = google_auth_httplib2.AuthorizedHttp(_credentials, http=httplib2.Http())
+        _thread_local.http = http
+    return http
+
+
+def _execute(request, call, size=0):
+    """
+    Execute a Drive request (or batch) on this thread's transport, recording the
+    round-trip under the "drive" metric with the bytes sent.
+    """
+    with metrics.timed('drive', call=call) as timer:
+        timer.add(bytes=size)
+        return request.execute(http=_thread_http())
+
+
+def find_or_create_folder(service, folder_name):
+    """
+    Return the ID of the Drive folder with the given name, creating it if needed.
+    Lookups are cached for FOLDER_CACHE_TTL seconds.
+
+    Args:
+        service: Drive service returned by get_drive_service()
+        folder_name (str): Name of the folder
+
+    Returns:
+        str: The folder ID
+    """
+    now = time.monotonic()
+    cached = _folder_cache.get(folder_name)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    # Serialized so that concurrent exports don't create the same folder twice
+    with _folder_lock:
+        cached = _folder_cache.get(folder_name)
+        if cached and cached[1] > now:
+            return cached[0]
+        folder_id = _lookup_folder(service, folder_name)
+        _folder_cache[folder_name] = (folder_id, now + FOLDER_CACHE_TTL)
+        return folder_id
+
+
+def _lookup_folder(service, folder_name):
+    escaped_name = folder_name.replace("\\", "\\\\").replace("'", "\\'")
+    query = f"name='{escaped_name}' and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
+    results = _execute(service.files().list(
+        q=query, spaces='drive', fields='files(id)', pageSize=1
+    ), 'list')
+
+    if results.get('files', []):
+        # Folder exists, use its ID
+        folder_id = results['files'][0]['id']
+    else:
+        # Create folder
+        folder_metadata = {'name': folder_name, 'mimeType': FOLDER_MIME_TYPE}
+        folder = _execute(service.files().create(body=folder_metadata, fields='id'), 'create_folder')
+        folder_id = folder.get('id')
+
+    return folder_id
+
+
+def share_files(service, file_ids):
+    """
+    Make files readable by anyone with the link, in a single batch request.
+
+    Args:
+        service: Drive service returned by get_drive_service()
+        file_ids (list): IDs of the files to share
+
+    Raises:
+        Exception: The first error reported by Drive for any of the files
+    """
+    errors = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            errors.append(exception)
+
+    permission = {'type': 'anyone', 'role': 'reader'}
+    batch = service.new_batch_http_request(callback=on_response)
+    for file_id in file_ids:
+        batch.add(service.permissions().create(fileId=file_id, body=permission, fields='id'))
+    _execute(batch, 'share')
+
+    if errors:
+        raise errors[0]
+
+
+def upload_bytes(data, filename, mimetype='text/csv', folder_name=None):
+    """
+    Upload a payload to Google Drive and make it readable by anyone with the link.
+    Does not touch the Streamlit UI, so it can run in background threads.
+
+    Args:
+        data (bytes): File content
+        filename (str): Name of the file to create
+        mimetype (str): MIME type of the content
+        folder_name (str, optional): Name of the folder to create or use
+
+    Returns:
+        str: URL to the created file
+    """
+    service = get_drive_service()
+    return _create_file(service, data, filename, mimetype, folder_name).get('webViewLink')
+
+
+def _media(data, mimetype):
+    from googleapiclient.http import MediaIoBaseUpload
+
+    # Small files go in one multipart request; large ones use a resumable session
+    return MediaIoBaseUpload(io.BytesIO(data), mimetype=mimetype,
+                             resumable=len(data) > SIMPLE_UPLOAD_MAX_BYTES)
+
+
+def _create_file(service, data, filename, mimetype, folder_name, app_properties=None):
+    # Prepare file metadata and media content
+    file_metadata = {'name': filename}
+    if folder_name:
+        file_metadata['parents'] = [find_or_create_folder(service, folder_name)]
+    if app_properties:
+        file_metadata['appProperties'] = app_properties
+
+    file = _execute(service.files().create(
+        body=file_metadata,
+        media_body=_media(data, mimetype),
+        fields='id, webViewLink',
+        supportsAllDrives=True
+    ), 'create', len(data))
+
+    # Drive batch requests cannot carry media uploads, so sharing is a separate call
+    share_files(service, [file.get('id')])
+    return file
+
+
+def find_export(service, export_key):
+    """
+    Look up the file previously created by sync_export for export_key.
+
+    Returns:
+        dict or None: id, url and sha256 of the file's current content
+    """
+    escaped_key = export_key.replace("\\", "\\\\").replace("'", "\\'")
+    query = (f"appProperties has {{ key='{EXPORT_KEY_PROPERTY}' and value='{escaped_key}' }} "
+             "and trashed=false")
+    results = _execute(service.files().list(
+        q=query, spaces='drive', fields='files(id, webViewLink, appProperties)', pageSize=1
+    ), 'list')
+    files = results.get('files', [])
+    if not files:
+        return None
+    return {
+        'id': files[0]['id'],
+        'url': files[0].get('webViewLink'),
+        'sha256': (files[0].get('appProperties') or {}).get(EXPORT_HASH_PROPERTY),
+    }
+
+
+def sync_export(data, filename, mimetype='text/csv', folder_name=None, export_key=None, known=None,
+                content_hash=None):
+    """
+    Upload a payload under a stable key, creating the Drive file only once.
+
+    The payload is identified by its SHA-256 (or by content_hash, when the caller knows
+    a hash of the content that is stable across generations). If the file for export_key already holds
+    the same content nothing is sent; if the content changed, the file is updated in
+    place, keeping its ID, link and permission. Only a new file is shared.
+
+    Args:
+        data (bytes): File content
+        filename (str): File name (applied on create and update)
+        mimetype (str): MIME type of the content
+        folder_name (str, optional): Folder used when the file is created
+        export_key (str): Stable identifier of the export, e.g. school|turma|date
+        known (dict, optional): Last id/url/sha256 recorded locally for export_key;
+            when omitted the file is looked up on Drive by its appProperties
+        content_hash (str, optional): Hash used instead of the SHA-256 of data, e.g.
+            columnar_export.records_sha256 for XLSX files, whose bytes differ on every save
+
+    Returns:
+        dict: id, url, sha256 and action ("created", "updated" or "unchanged")
+    """
+    from googleapiclient.errors import HttpError
+
+    sha256 = content_hash or hashlib.sha256(data).hexdigest()
+    if known and known.get('sha256') == sha256:
+        return dict(known, action='unchanged')
+
+    service = get_drive_service()
+    existing = known or find_export(service, export_key)
+    if existing and existing.get('sha256') == sha256:
+        return dict(existing, action='unchanged')
+
+    if existing:
+        try:
+            file = _execute(service.files().update(
+                fileId=existing['id'],
+                body={'name': filename, 'appProperties': {EXPORT_HASH_PROPERTY: sha256}},
+                media_body=_media(data, mimetype),
+                fields='id, webViewLink',
+                supportsAllDrives=True
+            ), 'update', len(data))
+            return {'id': file.get('id'), 'url': file.get('webViewLink'),
+                    'sha256': sha256, 'action': 'updated'}
+        except HttpError as e:
+            # The file was deleted on Drive since it was recorded: create it again
+            if int(getattr(e.resp, 'status', 0)) != 404:
+                raise
+
+    file = _create_file(service, data, filename, mimetype, folder_name,
+                        {EXPORT_KEY_PROPERTY: export_key, EXPORT_HASH_PROPERTY: sha256})
+    return {'id': file.get('id'), 'url': file.get('webViewLink'),
+            'sha256': sha256, 'action': 'created'}
+
+
+def export_to_gdrive(df, filename, folder_name=None, export_key=None):
     """
     Export a DataFrame to Google Drive as a CSV file
-    
+
     Args:
         df (pd.DataFrame): DataFrame to export
         filename (str): Name of the file to create
         folder_name (str, optional): Name of the folder to create or use
-        
+        export_key (str, optional): Stable key (e.g. school|turma|date); repeated
+            exports with the same key update one file instead of creating new ones
+
     Returns:
         str: URL to the created file
     """
+    # Convert DataFrame to CSV
+    csv_data = df.to_csv(index=False).encode('utf-8')
+
     try:
-        creds = get_credentials()
-        service = build('drive', 'v3', credentials=creds)
-        
-        # Convert DataFrame to CSV
-        csv_data = df.to_csv(index=False).encode('utf-8')
-        csv_buffer = io.BytesIO(csv_data)
-        
-        # Prepare file metadata and media content
-        file_metadata = {'name': filename}
-        
-        # Create or find folder if needed
-        if folder_name:
-            # Check if folder exists
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
-            
-            if results.get('files', []):
-                # Folder exists, use its ID
-                folder_id = results['files'][0]['id']
-            else:
-                # Create folder
-                folder_metadata = {
-                    'name': folder_name,
-                    'mimeType': 'application/vnd.google-apps.folder'
-                }
-                folder = service.files().create(body=folder_metadata, fields='id').execute()
-                folder_id = folder.get('id')
-            
-            # Set parent folder for the file
-            file_metadata['parents'] = [folder_id]
-        
-        # Upload file
-        media = MediaIoBaseUpload(csv_buffer, mimetype='text/csv', resumable=True)
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink',
-            supportsAllDrives=True
-        ).execute()
-        
-        # Make file readable by anyone with the link
-        permission = {
-            'type': 'anyone',
-            'role': 'reader'
-        }
-        service.permissions().create(fileId=file.get('id'), body=permission).execute()
-        
-        return file.get('webViewLink')
-        
+        try:
+            if export_key:
+                return sync_export(csv_data, filename, 'text/csv', folder_name, export_key)['url']
+            return upload_bytes(csv_data, filename, 'text/csv', folder_name)
+        except DriveCredentialsError:
+            get_credentials()  # Shows the configuration message in the UI
+            raise
     except Exception as e:
         st.error(f"Error with Google Drive integration: {str(e)}")
         # For testing/development environment, provide a fallback
-        csv_data = df.to_csv(index=False)
         st.download_button(
             "Download CSV (Google Drive export failed)",
             csv_data,
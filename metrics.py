@@ -0,0 +1,238 @@
+"""
+Medições leves dos caminhos críticos: duração, linhas processadas e bytes gravados.
+
+Cada operação medida (`timed("parse")`, `timed("export", format="xlsx")`...) acumula, por
+processo, a quantidade de chamadas e de erros, um histograma de durações com faixas
+fixas, o total de linhas e de bytes e as últimas durações (para percentis exatos no
+painel de depuração). O custo por chamada é de alguns microssegundos.
+
+Saídas opcionais, ligadas por variáveis de ambiente:
+  PAESTRO_METRICS_LOG: arquivo JSON Lines com um registro por chamada medida.
+  PAESTRO_METRICS_PROM: arquivo no formato texto do Prometheus (por exemplo, para o
+                        textfile collector do node_exporter), regravado por `write_prometheus`.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Limites superiores das faixas do histograma, em segundos
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+RECENT_SIZE = 256
+
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+_operations = {}  # (nome, (rótulos ordenados)) -> _Stats
+
+
+class _Stats:
+    __slots__ = ("calls", "errors", "seconds", "rows", "bytes", "buckets", "recent")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # a última faixa é +Inf
+        self.recent = deque(maxlen=RECENT_SIZE)
+
+
+class _Timer:
+    """Medição em andamento; `add` acumula linhas e bytes da chamada."""
+
+    __slots__ = ("name", "labels", "rows", "bytes", "_start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, rows=0, bytes=0):
+        self.rows += rows
+        self.bytes += bytes
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self._start, self.rows, self.bytes,
+               error=exc_type is not None and not _is_control_flow(exc_type), **self.labels)
+        return False
+
+
+def _is_control_flow(exc_type):
+    # st.rerun()/st.stop() interrompem o script com exceções que não são erros
+    return exc_type.__name__ in ("RerunException", "StopException")
+
+
+def timed(name, **labels):
+    """
+    Mede um trecho de código:
+
+        with metrics.timed("export", format="xlsx") as m:
+            rows = write(...)
+            m.add(rows=rows, bytes=size)
+    """
+    return _Timer(name, labels)
+
+
+def record(name, seconds, rows=0, bytes=0, error=False, **labels):
+    """Registra uma chamada já medida."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        stats = _operations.get(key)
+        if stats is None:
+            stats = _operations[key] = _Stats()
+        stats.calls += 1
+        stats.errors += bool(error)
+        stats.seconds += seconds
+        stats.rows += rows
+        stats.bytes += bytes
+        stats.buckets[bisect_left(BUCKETS, seconds)] += 1
+        stats.recent.append(seconds)
+
+    log_path = os.environ.get("PAESTRO_METRICS_LOG")
+    if log_path:
+        line = json.dumps({
+            "ts": round(time.time(), 3), "op": name, **labels, "seconds": round(seconds, 6),
+            "rows": rows, "bytes": bytes, "error": bool(error),
+        }, ensure_ascii=False)
+        with _log_lock, open(log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def snapshot():
+    """
+    Estado atual de todas as operações.
+
+    Retorna:
+      list: dicts com op, labels, calls, errors, seconds, rows, bytes, p50, p95 e max
+            (percentis das últimas RECENT_SIZE chamadas, em segundos).
+    """
+    with _lock:
+        items = [(key, stats.calls, stats.errors, stats.seconds, stats.rows, stats.bytes,
+                  sorted(stats.recent)) for key, stats in _operations.items()]
+    result = []
+    for (name, labels), calls, errors, seconds, rows, size, recent in sorted(items):
+        result.append({
+            "op": name, "labels": dict(labels), "calls": calls, "errors": errors,
+            "seconds": seconds, "rows": rows, "bytes": size,
+            "p50": recent[int(0.50 * (len(recent) - 1))] if recent else None,
+            "p95": recent[int(0.95 * (len(recent) - 1))] if recent else None,
+            "max": recent[-1] if recent else None,
+        })
+    return result
+
+
+def reset():
+    """Descarta todas as medições (usado em testes e benchmarks)."""
+    with _lock:
+        _operations.clear()
+
+
+def prometheus_text():
+    """Medições no formato texto de exposição do Prometheus."""
+    with _lock:
+        items = sorted((key, stats.calls, stats.errors, stats.seconds, stats.rows, stats.bytes,
+                        list(stats.buckets)) for key, stats in _operations.items())
+    lines = [
+        "# HELP paestro_operation_duration_seconds Duração das operações medidas.",
+        "# TYPE paestro_operation_duration_seconds histogram",
+    ]
+    for (name, labels), calls, _, seconds, _, _, buckets in items:
+        base = _labels(name, labels)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), buckets):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'paestro_operation_duration_seconds_bucket{{{base},le="{le}"}} {cumulative}')
+        lines.append(f"paestro_operation_duration_seconds_sum{{{base}}} {seconds:.6f}")
+        lines.append(f"paestro_operation_duration_seconds_count{{{base}}} {calls}")
+    for metric, index, help_text in (
+        ("paestro_operation_errors_total", 2, "Chamadas que terminaram com erro."),
+        ("paestro_operation_rows_total", 4, "Linhas processadas."),
+        ("paestro_operation_bytes_total", 5, "Bytes lidos ou gravados."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for item in items:
+            (name, labels) = item[0]
+            lines.append(f"{metric}{{{_labels(name, labels)}}} {item[index]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Regrava o arquivo do Prometheus (padrão: PAESTRO_METRICS_PROM) de forma atômica."""
+    path = path or os.environ.get("PAESTRO_METRICS_PROM")
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def profile(func, on_report, mode="cprofile", limit=40):
+    """
+    Executa `func()` sob o cProfile ("cprofile") ou o tracemalloc ("tracemalloc") e
+    entrega a `on_report` um relatório em texto com as `limit` entradas mais caras.
+
+    O relatório é entregue mesmo que `func` termine com exceção, como o st.rerun(),
+    que interrompe o script; a exceção segue adiante.
+    """
+    import io
+
+    report = io.StringIO()
+    if mode == "tracemalloc":
+        import tracemalloc
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(16)
+        before = tracemalloc.take_snapshot()
+        try:
+            return func()
+        finally:
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            report.write(f"Memória rastreada: atual {current / 2**20:.1f} MiB, pico {peak / 2**20:.1f} MiB\n")
+            report.write("Maiores diferenças de alocação por linha:\n")
+            for stat in after.compare_to(before, "lineno")[:limit]:
+                report.write(f"{stat}\n")
+            on_report(report.getvalue())
+    else:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: só um perfilador por vez (outra sessão já está perfilando)
+            on_report("Outro perfilamento está em andamento; tente novamente.")
+            return func()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+            on_report(report.getvalue())
+
+
+def _labels(name, labels):
+    pairs = [("op", name)] + list(labels)
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
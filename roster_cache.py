@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from attendance_parser import ParsedReport, parse_report
+
+# Versão do formato dos arquivos em disco; arquivos de outra versão são ignorados
+_FORMAT_VERSION = 3
+
+
+class RosterCache:
+    """
+    Cache de relatórios já processados (turmas e metadados), indexado pelo SHA-256
+    do relatório enviado.
+
+    Possui dois níveis:
+      - memória: LRU limitado a `max_entries` relatórios, compartilhado entre as sessões;
+      - disco: um arquivo JSON por relatório em `cache_dir`, que sobrevive a reinícios do
+        servidor e é limitado a `max_disk_bytes` (os arquivos menos usados são removidos).
+
+    Todas as operações são protegidas por um lock, pois o Streamlit executa cada sessão
+    em uma thread própria.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=64, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(data):
+        """Retorna a chave (SHA-256 em hexadecimal) dos bytes do relatório."""
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, key):
+        """Retorna o `ParsedReport` em cache para `key`, ou None se não houver."""
+        with self._lock:
+            document = self._memory.get(key)
+            if document is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return ParsedReport.from_dict(document)
+
+        document = self._read_disk(key)
+        with self._lock:
+            if document is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, document)
+        return ParsedReport.from_dict(document)
+
+    def put(self, key, report):
+        """Armazena o relatório processado nos dois níveis do cache."""
+        # Guardado como dict com listas próprias: cada sessão recebe uma cópia em `get`
+        document = ParsedReport.from_dict(report.to_dict()).to_dict()
+        with self._lock:
+            self._remember(key, document)
+        self._write_disk(key, document)
+
+    def get_or_parse(self, data, parser=parse_report):
+        """
+        Retorna o `ParsedReport` do relatório `data` (bytes), processando-o apenas se
+        ainda não estiver em cache.
+        """
+        key = self.key_for(data)
+        report = self.get(key)
+        if report is None:
+            report = parser(data)
+            if report.classes:
+                self.put(key, report)
+        return report
+
+    def stats(self):
+        """Contadores de uso do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        """Esvazia os dois níveis do cache e zera os contadores."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            for path, _, _ in self._disk_entries():
+                _remove_quietly(path)
+
+    def _remember(self, key, document):
+        self._memory[key] = document
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+            os.utime(path)  # Marca como usado recentemente para a remoção LRU
+        except (OSError, ValueError):
+            return None
+        if not isinstance(document, dict) or document.get("version") != _FORMAT_VERSION:
+            return None  # Gravado por uma versão anterior; será reprocessado
+        return document
+
+    def _write_disk(self, key, document):
+        if not self.cache_dir:
+            return
+        # Escrita atômica: outra sessão nunca lê um arquivo pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dict(document, version=_FORMAT_VERSION), f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            _remove_quietly(tmp_path)
+            return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        if not self.cache_dir:
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, info.st_mtime, info.st_size))
+        return entries
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_disk_bytes:
+                break
+            _remove_quietly(path)
+            total -= size
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
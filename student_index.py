@@ -0,0 +1,135 @@
+"""
+Índice de busca de alunos em todas as turmas carregadas.
+
+Nomes e códigos são normalizados (minúsculas, sem acentos) e quebrados em palavras. As
+palavras de todos os alunos ficam em uma única lista ordenada, de modo que um prefixo é
+localizado com busca binária e os alunos que começam com ele ocupam um trecho contíguo
+da lista. Uma busca com várias palavras cruza os trechos de cada palavra, começando
+pelo prefixo mais raro.
+"""
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from batch_import import turma_key
+
+StudentMatch = namedtuple("StudentMatch", ["turma", "position", "student", "code"])
+
+# Maior ponto de código Unicode: prefixo + _MAX fica depois de toda palavra com o prefixo
+_MAX = "\U0010ffff"
+
+
+def fold(text):
+    """Normaliza para busca: sem acentos, em minúsculas e com espaços simples."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+class StudentIndex:
+    """Índice de prefixos (palavras do nome e código) de todos os alunos da sessão."""
+
+    __slots__ = ("_turmas", "_entry_turma", "_entry_position", "_names", "_codes",
+                 "_entry_tokens", "_tokens", "_token_entries")
+
+    def __init__(self, rosters=()):
+        """
+        Parâmetros:
+          rosters: iterável de (turma, alunos, códigos); códigos pode ser None.
+        """
+        self._turmas = []
+        self._entry_turma = array("I")
+        self._entry_position = array("I")
+        self._names = []
+        self._codes = []
+        self._entry_tokens = []
+        interned = {}  # Palavras repetidas ("silva") compartilham o mesmo objeto
+        pairs = []
+        for turma, students, codes in rosters:
+            turma_id = len(self._turmas)
+            self._turmas.append(turma)
+            for position, student in enumerate(students):
+                code = codes[position] if codes and position < len(codes) else ""
+                entry = len(self._names)
+                tokens = tuple(
+                    interned.setdefault(token, token)
+                    for token in dict.fromkeys(fold(f"{student} {code}").split())
+                )
+                self._entry_turma.append(turma_id)
+                self._entry_position.append(position)
+                self._names.append(student)
+                self._codes.append(code)
+                self._entry_tokens.append(tokens)
+                pairs.extend((token, entry) for token in tokens)
+        pairs.sort()
+        self._tokens = [token for token, _ in pairs]
+        self._token_entries = array("I", (entry for _, entry in pairs))
+
+    @classmethod
+    def from_reports(cls, schools):
+        """Monta o índice a partir de {escola: ParsedReport}, com as chaves de `flatten_schools`."""
+        return cls(
+            (turma_key(school, turma, len(schools)), students, report.codes.get(turma))
+            for school, report in schools.items()
+            for turma, students in report.classes.items()
+        )
+
+    def __len__(self):
+        return len(self._names)
+
+    def search(self, query, limit=20):
+        """
+        Alunos cujo nome ou código tem palavras começando com cada palavra da busca.
+
+        Retorna:
+          list: até `limit` StudentMatch(turma, posição na lista de chamada, aluno, código).
+        """
+        words = fold(query).split()
+        if not words or limit <= 0:
+            return []
+
+        ranges = []
+        for word in dict.fromkeys(words):
+            start = bisect_left(self._tokens, word)
+            end = bisect_left(self._tokens, word + _MAX, start)
+            if start == end:
+                return []
+            ranges.append((end - start, start, end, word))
+        ranges.sort()
+        _, start, end, _ = ranges[0]
+
+        if len(ranges) == 1:
+            # Uma palavra: os alunos saem na ordem das palavras, até o limite
+            matches = []
+            seen = set()
+            for i in range(start, end):
+                entry = self._token_entries[i]
+                if entry not in seen:
+                    seen.add(entry)
+                    matches.append(self._match(entry))
+                    if len(matches) >= limit:
+                        break
+            return matches
+
+        # Várias palavras: interseção dos trechos em C; um trecho muito maior que os
+        # candidatos restantes é conferido palavra a palavra, sem montar o conjunto
+        candidates = set(self._token_entries[start:end])
+        for size, start, end, word in ranges[1:]:
+            if len(candidates) * 8 < size:
+                candidates = {
+                    entry for entry in candidates
+                    if any(token.startswith(word) for token in self._entry_tokens[entry])
+                }
+            else:
+                candidates.intersection_update(self._token_entries[start:end])
+            if not candidates:
+                return []
+        return [self._match(entry) for entry in sorted(candidates)[:limit]]
+
+    def _match(self, entry):
+        return StudentMatch(
+            self._turmas[self._entry_turma[entry]],
+            self._entry_position[entry],
+            self._names[entry],
+            self._codes[entry],
+        )
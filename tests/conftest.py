@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+sys.path[:0] = [ROOT, BENCH_DIR]
+
+
+@pytest.fixture
+def fake_drive(monkeypatch):
+    """Drive falso local (benchmarks/fake_drive.py) com o cliente do Drive apontado para ele."""
+    import gdrive_exporter
+    from fake_drive import start_fake_drive
+    from google.oauth2.credentials import Credentials
+
+    server, state, root_url = start_fake_drive()
+    monkeypatch.setenv("GOOGLE_DRIVE_API_ROOT", root_url)
+    monkeypatch.setattr(gdrive_exporter, "load_credentials", lambda: Credentials(token="fake"))
+    monkeypatch.setattr(gdrive_exporter, "_folder_cache", {})
+    gdrive_exporter.reset_drive_client()
+    yield state
+    server.shutdown()
+    gdrive_exporter.reset_drive_client()
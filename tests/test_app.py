@@ -0,0 +1,209 @@
+import os
+
+import pytest
+
+from synthetic_report import SCHOOL_NAME as SYNTHETIC_SCHOOL, generate_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def new_session(tmp_path, monkeypatch):
+    """Abre sessões do app que compartilham o banco e o cache deste teste."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from drive_queue import ExportQueue
+
+    monkeypatch.setenv("PAESTRO_DB_PATH", str(tmp_path / "paestro.db"))
+    monkeypatch.setenv("PAESTRO_CACHE_DIR", str(tmp_path / "rosters"))
+    # Os recursos (banco, cache, fila) são por processo; sem limpar, seguiriam no banco
+    # do teste anterior
+    st.cache_resource.clear()
+    # A fila do app é parada ao final, para não continuar enviando durante outros testes
+    queues = []
+    start = ExportQueue.start
+    monkeypatch.setattr(ExportQueue, "start", lambda queue: queues.append(queue) or start(queue))
+
+    def open_session():
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+        assert not at.exception
+        return at
+
+    yield open_session
+    for queue in queues:
+        queue.stop()
+
+
+@pytest.fixture
+def app(new_session):
+    return new_session()
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label.startswith(label))
+
+
+def test_multi_school_batch_is_stored_under_each_school(app, tmp_path):
+    from attendance_store import AttendanceStore
+
+    reports = [
+        (name, generate_report(2, 4, seed=seed).replace(SYNTHETIC_SCHOOL, school).encode("utf-8"), "text/html")
+        for name, school, seed in (("a.html", "E.M. ALFA", 0), ("b.html", "E.M. BETA", 1))
+    ]
+    app.file_uploader(key="batch_files").set_value(reports).run()
+    button(app, "Processar lote").click().run()
+    assert not app.exception
+
+    key = next(k for k in app.session_state.classes if k.startswith("E.M. BETA - "))
+    app.selectbox(key="class_selectbox").select(key).run()
+    button(app, "Salvar Presença").click().run()
+    assert not app.exception
+
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    turma = key[len("E.M. BETA - "):]
+    (summary,) = store.turma_summaries("E.M. BETA")
+    assert summary["turma"] == turma
+    assert store.turma_summaries("Escola") == []
+    assert len(store.load_class("E.M. BETA", turma, app.session_state.attendance_date.isoformat())) == 4
+
+
+def test_generated_export_is_kept_in_its_temporary_file(app):
+    import io
+
+    from openpyxl import load_workbook
+
+    app.file_uploader(key="batch_files").set_value(
+        [("a.html", generate_report(2, 4, seed=0).encode("utf-8"), "text/html")]).run()
+    button(app, "Processar lote").click().run()
+    button(app, "Gerar arquivo").click().run()
+    assert not app.exception
+
+    export = app.session_state.export_cache
+    assert "data" not in export
+    export["file"].seek(0)
+    data = export["file"].read()
+    assert export["size"] == len(data)
+    assert load_workbook(io.BytesIO(data)).active.max_row > 8
+
+
+
+def test_failed_save_keeps_the_state_version(app, monkeypatch):
+    from attendance_store import AttendanceStore
+
+    app.file_uploader(key="batch_files").set_value(
+        [("a.html", generate_report(1, 3, seed=0).encode("utf-8"), "text/html")]).run()
+    button(app, "Processar lote").click().run()
+    version = app.session_state.state_version
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disco cheio")
+
+    monkeypatch.setattr(AttendanceStore, "save_class", fail)
+    button(app, "Salvar Presença").click().run()
+    assert any("disco cheio" in error.value for error in app.error)
+    assert app.session_state.state_version == version
+
+
+def test_grid_submit_without_changes_is_not_saved(app):
+    app.file_uploader(key="batch_files").set_value(
+        [("a.html", generate_report(1, 3, seed=0).encode("utf-8"), "text/html")]).run()
+    button(app, "Processar lote").click().run()
+    app.radio(key="attendance_mode").set_value("Grade").run()
+    button(app, "Marcar todos como presentes").click().run()
+
+    button(app, "Salvar Presença").click().run()
+    assert [s.value for s in app.success][-1] == "Dados de presença salvos com sucesso!"
+    version = app.session_state.state_version
+
+    button(app, "Salvar Presença").click().run()
+    assert not app.exception
+    assert [i.value for i in app.info][-1] == "Nenhuma alteração para salvar."
+    assert app.session_state.state_version == version
+
+
+REPORT = generate_report(2, 4, seed=0).encode("utf-8")
+
+
+def upload(at):
+    at.file_uploader(key="batch_files").set_value([("a.html", REPORT, "text/html")]).run()
+    button(at, "Processar lote").click().run()
+    assert not at.exception
+
+
+def mark_all_present(at, turma):
+    at.selectbox(key="class_selectbox").select(turma).run()
+    at.radio(key="attendance_mode").set_value("Grade").run()
+    button(at, "Marcar todos como presentes").click().run()
+    button(at, "Salvar Presença").click().run()
+    assert not at.exception
+
+
+def exported_marks(at):
+    """Presenças de cada turma na planilha gerada pela sessão."""
+    import io
+
+    from openpyxl import load_workbook
+
+    export = at.session_state.export_cache
+    export["file"].seek(0)
+    marks = {}
+    turma = None
+    for row in load_workbook(io.BytesIO(export["file"].read())).active.iter_rows(values_only=True):
+        if row[0] and str(row[0]).startswith("Turma: "):
+            turma = row[0][len("Turma: "):]
+            marks[turma] = []
+        elif turma and row[0] and row[0] != "Aluno":
+            marks[turma].append(row[1] or None)
+    return marks
+
+
+def test_export_includes_classes_saved_by_other_sessions(new_session):
+    a, b = new_session(), new_session()
+    upload(a)
+    turma = list(a.session_state.classes)[1]
+    mark_all_present(a, turma)
+
+    upload(b)
+    assert b.session_state.attendance.get(turma) is None  # B nunca abriu a turma
+    button(b, "Gerar arquivo").click().run()
+    assert not b.exception
+    assert exported_marks(b)[turma] == ["P"] * 4
+
+
+def test_drive_upload_regenerates_a_file_older_than_the_database(new_session, fake_drive):
+    a, b = new_session(), new_session()
+    upload(a)
+    upload(b)
+    button(b, "Gerar arquivo").click().run()
+    turma = list(b.session_state.classes)[1]
+    assert exported_marks(b)[turma] == [None] * 4
+
+    # A grava depois que B gerou o arquivo; o envio de B não pode apagar essas presenças
+    mark_all_present(a, turma)
+    button(b, "Enviar para o Google Drive").click().run()
+    assert not b.exception
+    assert exported_marks(b)[turma] == ["P"] * 4
+
+
+def test_tabular_export_reads_the_saved_marks_of_the_period(new_session):
+    import io
+
+    import pyarrow.parquet as pq
+
+    a, b = new_session(), new_session()
+    upload(a)
+    turma = list(a.session_state.classes)[1]
+    mark_all_present(a, turma)
+
+    upload(b)
+    b.selectbox(key="export_format").select("Parquet (análise)").run()
+    button(b, "Gerar arquivo").click().run()
+    assert not b.exception
+
+    export = b.session_state.export_cache
+    export["file"].seek(0)
+    table = pq.read_table(io.BytesIO(export["file"].read()))
+    assert table.column("turma").to_pylist() == [turma] * 4
+    assert table.column("presenca").to_pylist() == ["P"] * 4
+    assert export["rows"] == 4
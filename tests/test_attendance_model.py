@@ -0,0 +1,73 @@
+import pytest
+
+from attendance_model import AttendanceBook, ClassAttendance
+
+STUDENTS = ["ANA", "BIA", "CAIO", "DANI"]
+
+
+def test_new_class_has_no_changes():
+    assert ClassAttendance("1A", STUDENTS).changes() == []
+
+
+def test_changes_lists_only_edited_positions():
+    attendance = ClassAttendance("1A", STUDENTS)
+    attendance.set_status_at(1, "F")
+    attendance.set_observation_at(3, "atestado")
+    assert attendance.changes() == [1, 3]
+    assert attendance.changed_rows() == [("BIA", "F", ""), ("DANI", None, "atestado")]
+
+
+def test_reverting_an_edit_is_not_a_change():
+    attendance = ClassAttendance("1A", STUDENTS)
+    attendance.set_status_at(0, "P")
+    attendance.set_observation_at(0, "chegou tarde")
+    attendance.set_status_at(0, None)
+    attendance.set_observation_at(0, "")
+    assert attendance.changes() == []
+
+
+def test_mark_saved_updates_only_the_given_positions():
+    attendance = ClassAttendance("1A", STUDENTS)
+    attendance.mark_all("P")
+    attendance.set_observation_at(2, "saiu cedo")
+    attendance.mark_saved([0, 2])
+    assert attendance.changes() == [1, 3]
+
+    attendance.mark_saved()
+    assert attendance.changes() == []
+    attendance.set_observation_at(2, "")
+    assert attendance.changes() == [2]
+
+
+def test_load_saved_sets_current_and_saved_marks():
+    attendance = ClassAttendance("1A", STUDENTS)
+    attendance.set_status_at(3, "F")  # Edição ainda não gravada
+    attendance.load_saved({"BIA": ("FJ", "atestado"), "FORA DA LISTA": ("P", "")})
+
+    assert attendance.get_status_at(1) == "FJ"
+    assert attendance.get_observation_at(1) == "atestado"
+    assert attendance.changes() == [3]
+
+
+def test_bulk_updates_are_diffed_against_the_saved_marks():
+    attendance = ClassAttendance("1A", STUDENTS)
+    attendance.load_saved({"ANA": ("P", ""), "BIA": ("F", "")})
+    attendance.mark_unmarked("F")
+    assert attendance.changes() == [2, 3]
+
+    attendance.replace_marks(bytes([1, 2, 0, 0]), {})
+    assert attendance.changes() == []
+
+
+def test_replace_marks_rejects_wrong_length():
+    with pytest.raises(ValueError):
+        ClassAttendance("1A", STUDENTS).replace_marks(b"\x01", {})
+
+
+def test_book_keeps_one_class_per_turma():
+    book = AttendanceBook()
+    first = book.ensure_class("1A", STUDENTS)
+    assert book.ensure_class("1A", STUDENTS) is first
+    book.set_status("1A", "CAIO", "F")
+    assert book.get_status("1A", "CAIO") == "F"
+    assert book.get_status("2B", "CAIO", default="-") == "-"
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+
+import baseline_parser
+from attendance_parser import iter_students, parse_html_content, parse_report
+from synthetic_report import SCHOOL_NAME, generate_report, make_classes
+
+# O parser original testa a verdade de um elemento do lxml ("if turma_row:")
+pytestmark = pytest.mark.filterwarnings("ignore::FutureWarning")
+
+# Casos que o relatório sintético não gera: página antes da primeira turma, cabeçalho
+# com <th>, turma repetida mais adiante, linha sem letras na coluna "Nome" e uma turma
+# continuada em outra página sem nova linha "Turma:"
+EDGE_REPORT = """<html><body>
+<table class="jrPage"><tr><td>PREFEITURA MUNICIPAL</td></tr>
+<tr><td>Código</td><td>Nome</td></tr><tr><td>1</td><td>SEM TURMA</td></tr></table>
+<table class="jrPage"><tr><td>E.M. BORDA</td></tr>
+<tr><td>Turma: 0001 - 1º ANO A (MATUTINO) - sala 3</td></tr>
+<tr><th>Código</th><th>Nome</th></tr>
+<tr><td>10</td><td>  ANA  SOUZA </td></tr><tr><td>11</td><td>12345</td></tr>
+<tr><td>12</td><td></td></tr><tr><td>13</td><td>JOSÉ DA CRUZ</td></tr></table>
+<table class="jrPage"><tr><td>Código</td><td>Nome</td></tr>
+<tr><td>14</td><td>ÍRIS LIMA</td></tr>
+<tr><td colspan="2">Total de Matrículas: 3</td></tr><tr><td>15</td><td>DEPOIS DO TOTAL</td></tr></table>
+<table class="jrPage"><tr><td>Turma: 0002 - 2º ANO B (VESPERTINO)</td></tr>
+<tr><td>Código</td><td>Nome</td></tr><tr><td>20</td><td>BRUNO LIMA</td></tr></table>
+<table class="other"><tr><td>Turma: 0003 - FORA (NOTURNO)</td></tr></table>
+<table class="jrPage"><tr><td>Turma: 0001 - 1º ANO A (MATUTINO)</td></tr>
+<tr><td>Código</td><td>Nome</td></tr><tr><td>16</td><td>CARLA DIAS</td></tr></table>
+</body></html>"""
+
+REPORTS = [
+    pytest.param(generate_report(5, 35, rows_per_page=30, seed=1), id="page-breaks"),
+    pytest.param(generate_report(3, 0, seed=2), id="empty-classes"),
+    pytest.param(generate_report(12, 7, rows_per_page=3, seed=3), id="many-pages"),
+    pytest.param(EDGE_REPORT, id="edge-cases"),
+]
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_streaming_parser_matches_the_baseline(report):
+    expected = baseline_parser.parse_html_content(report)
+    assert list(parse_html_content(report).items()) == list(expected.items())
+    assert list(parse_report(report.encode("utf-8")).classes.items()) == list(expected.items())
+    # Pares (turma, aluno) na ordem do documento: turmas sem alunos não aparecem e uma
+    # turma repetida mais adiante não é agrupada
+    streamed = {}
+    for turma, student in iter_students(io.BytesIO(report.encode("utf-8"))):
+        streamed.setdefault(turma, []).append(student)
+    assert streamed == {turma: students for turma, students in expected.items() if students}
+
+
+def test_parse_report_reads_the_header_and_codes(tmp_path):
+    path = tmp_path / "relatorio.html"
+    path.write_text(generate_report(4, 10, rows_per_page=4, seed=5), encoding="utf-8")
+    report = parse_report(path)
+
+    classes = make_classes(4, 10, seed=5)
+    assert report.school_name == SCHOOL_NAME
+    assert list(report.classes) == [turma for turma, _ in classes]
+    for turma, students in classes:
+        assert report.classes[turma] == [name for _, name in students]
+        assert report.codes[turma] == [code for code, _ in students]
+    assert report.turmas["0001 - 1º ANO A (MATUTINO)"] == ("0001", "1º ANO A", "MATUTINO")
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def test_declared_charset_wins_over_the_fallback(tmp_path):
+    html = generate_report(3, 5, rows_per_page=4, seed=4)
+    expected = parse_report(html.encode("utf-8")).classes
+    latin1 = html.replace('<meta charset="UTF-8">',
+                          '<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">')
+    data = latin1.encode("iso-8859-1")
+    path = tmp_path / "latin1.html"
+    path.write_bytes(data)
+
+    for source in (data, io.BytesIO(data), path, io.BufferedReader(_Unseekable(data)), latin1):
+        report = parse_report(source)
+        assert report.classes == expected
+        assert report.school_name == SCHOOL_NAME
+
+
+def test_undeclared_reports_use_the_fallback_encoding():
+    html = generate_report(2, 3, seed=6).replace('<meta charset="UTF-8">', "")
+    expected = parse_report(generate_report(2, 3, seed=6)).classes
+    assert parse_report(html.encode("utf-8")).classes == expected
+    assert parse_report(html.encode("cp1252"), encoding="cp1252").classes == expected
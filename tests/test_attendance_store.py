@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+
+import pytest
+
+from attendance_store import AttendanceStore
+
+SCHOOL = "E.M. EXEMPLO"
+STUDENTS = [f"ALUNO {i:02d}" for i in range(30)]
+
+
+def summaries(store):
+    turmas = sorted(store.turma_summaries(), key=lambda row: row["turma"])
+    details = {
+        row["turma"]: (
+            sorted(store.student_summaries(SCHOOL, row["turma"]), key=lambda r: r["student"]),
+            store.daily_summaries(SCHOOL, row["turma"]),
+        )
+        for row in turmas
+    }
+    return turmas, details
+
+
+def assert_matches_rebuild(store):
+    incremental = summaries(store)
+    store.rebuild_summaries()
+    assert incremental == summaries(store)
+
+
+def random_rows(rng):
+    return [
+        (student, rng.choice([None, "P", "F", "FJ"]), rng.choice(["", "atestado"]))
+        for student in rng.sample(STUDENTS, rng.randint(1, 8))
+    ]
+
+
+def test_incremental_summaries_match_rebuild(tmp_path):
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    rng = random.Random(0)
+    for _ in range(200):
+        day = f"2026-03-{rng.randint(1, 6):02d}"
+        store.save_class(SCHOOL, rng.choice(["1º ANO A", "2º ANO B"]), day, random_rows(rng))
+    assert_matches_rebuild(store)
+
+
+def test_summaries_count_each_mark_once(tmp_path):
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "P", ""), ("BIA", "F", "")])
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "F", "")])
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-11", [("ANA", "FJ", "")])
+
+    assert store.turma_summaries(SCHOOL) == [{
+        "school": SCHOOL, "turma": "1º ANO A", "days": 2, "present": 0, "absent": 2, "justified": 1,
+    }]
+    by_student = {row["student"]: row for row in store.student_summaries(SCHOOL, "1º ANO A")}
+    assert (by_student["ANA"]["absent"], by_student["ANA"]["justified"]) == (1, 1)
+
+
+def test_save_between_read_and_write_of_another_save(tmp_path, monkeypatch):
+    """
+    Outra sessão grava o mesmo aluno enquanto esta já leu as marcações anteriores:
+    a segunda gravação tem de esperar a primeira, e os resumos contam só o valor final.
+    """
+    path = str(tmp_path / "paestro.db")
+    store, other = AttendanceStore(path), AttendanceStore(path)
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "P", "")])
+
+    interleaved = threading.Thread(
+        target=other.save_class, args=(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "F", "")])
+    )
+    read_previous = store._previous_marks
+
+    def read_then_let_other_session_write(*args):
+        previous = read_previous(*args)
+        if interleaved.ident is None:  # Só na primeira leitura
+            interleaved.start()
+            time.sleep(0.3)  # Tempo para a outra sessão gravar, se não estiver bloqueada
+        return previous
+
+    monkeypatch.setattr(store, "_previous_marks", read_then_let_other_session_write)
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "FJ", "")])
+    interleaved.join()
+
+    final = store.load_class(SCHOOL, "1º ANO A", "2026-03-10")["ANA"][0]
+    expected = {"present": 0, "absent": int(final == "F"), "justified": int(final == "FJ")}
+    (turma,) = store.turma_summaries(SCHOOL)
+    (day,) = store.daily_summaries(SCHOOL, "1º ANO A")
+    (student,) = store.student_summaries(SCHOOL, "1º ANO A")
+    for row in (turma, day, student):
+        assert {key: row[key] for key in expected} == expected
+    assert turma["days"] == 1
+    assert_matches_rebuild(store)
+
+
+def test_copy_day_copies_marks_and_summaries(tmp_path):
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "P", ""), ("BIA", "FJ", "atestado")])
+
+    assert store.previous_date(SCHOOL, "1º ANO A", "2026-03-11") == "2026-03-10"
+    assert store.copy_day(SCHOOL, "1º ANO A", "2026-03-10", "2026-03-11") == 2
+    assert store.load_class(SCHOOL, "1º ANO A", "2026-03-11") == {
+        "ANA": ("P", ""), "BIA": ("FJ", "atestado"),
+    }
+    (turma,) = store.turma_summaries(SCHOOL)
+    assert (turma["days"], turma["present"], turma["justified"]) == (2, 2, 2)
+    with pytest.raises(ValueError):
+        store.copy_day(SCHOOL, "1º ANO A", "2026-03-10", "2026-03-11")
+    assert_matches_rebuild(store)
+
+
+def test_concurrent_copies_to_the_same_day_count_it_once(tmp_path):
+    path = str(tmp_path / "paestro.db")
+    AttendanceStore(path).save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "P", "")])
+    stores = [AttendanceStore(path) for _ in range(4)]
+    barrier = threading.Barrier(len(stores))
+    outcomes = []
+
+    def copy(store):
+        # Pausa entre a verificação do dia de destino e a cópia, para que as cópias se cruzem
+        store._connection().set_trace_callback(
+            lambda sql: time.sleep(0.1) if sql.startswith("INSERT INTO attendance") else None
+        )
+        barrier.wait()
+        try:
+            outcomes.append(store.copy_day(SCHOOL, "1º ANO A", "2026-03-10", "2026-03-11"))
+        except ValueError:
+            outcomes.append("já copiado")
+
+    threads = [threading.Thread(target=copy, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes, key=str) == [1, "já copiado", "já copiado", "já copiado"]
+    (turma,) = stores[0].turma_summaries(SCHOOL)
+    assert (turma["days"], turma["present"]) == (2, 2)
+    assert_matches_rebuild(stores[0])
+
+
+def test_concurrent_saves_and_copies_match_rebuild(tmp_path):
+    path = str(tmp_path / "paestro.db")
+    days = [f"2026-03-{day:02d}" for day in range(1, 5)]
+    errors = []
+
+    def session(seed):
+        store = AttendanceStore(path)
+        # Pausa entre as verificações ("dia novo", "destino vazio") e as gravações,
+        # alargando as janelas de corrida
+        store._connection().set_trace_callback(
+            lambda sql: time.sleep(0.002) if sql.startswith("INSERT INTO attendance") else None
+        )
+        rng = random.Random(seed)
+        try:
+            for _ in range(60):
+                turma = rng.choice(["1º ANO A", "2º ANO B"])
+                if rng.random() < 0.15:
+                    source, target = rng.sample(days, 2)
+                    try:
+                        store.copy_day(SCHOOL, turma, source, target)
+                    except ValueError:
+                        pass  # Destino já tem marcações
+                else:
+                    store.save_class(SCHOOL, turma, rng.choice(days), random_rows(rng))
+        except Exception as e:  # pragma: no cover - reportado abaixo
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert_matches_rebuild(AttendanceStore(path))
+
+
+def test_load_day_groups_the_marks_of_every_turma(tmp_path):
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    store.save_class(SCHOOL, "1º ANO A", "2026-03-10", [("ANA", "P", ""), ("BIA", "F", "gripe")])
+    store.save_class(SCHOOL, "2º ANO B", "2026-03-10", [("CAIO", "FJ", "")])
+    store.save_class(SCHOOL, "2º ANO B", "2026-03-11", [("CAIO", "P", "")])
+    store.save_class("OUTRA", "1º ANO A", "2026-03-10", [("DANI", "P", "")])
+
+    assert store.load_day(SCHOOL, "2026-03-10") == {
+        "1º ANO A": {"ANA": ("P", ""), "BIA": ("F", "gripe")},
+        "2º ANO B": {"CAIO": ("FJ", "")},
+    }
+    assert store.load_day(SCHOOL, "2026-03-12") == {}
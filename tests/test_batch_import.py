@@ -0,0 +1,91 @@
+from attendance_parser import parse_report
+from batch_import import class_origins, flatten_schools, parse_reports, school_name_for
+from synthetic_report import SCHOOL_NAME as SYNTHETIC_SCHOOL, generate_report
+
+
+def report_of(school, n_classes=2, seed=0):
+    return generate_report(n_classes, 5, seed=seed).replace(SYNTHETIC_SCHOOL, school).encode("utf-8")
+
+
+def test_reports_are_grouped_by_the_school_read_from_them():
+    schools, errors = parse_reports(
+        [("lote1.html", report_of("E.M. ALFA")), ("lote2.html", report_of("E.M. BETA", seed=1))],
+        max_workers=1,
+    )
+    assert errors == {}
+    assert sorted(schools) == ["E.M. ALFA", "E.M. BETA"]
+
+
+def test_files_of_the_same_school_are_merged_without_mixing_classes():
+    manha, tarde = report_of("E.M. ALFA"), report_of("E.M. ALFA", 3, seed=1)
+    schools, errors = parse_reports([("manha.html", manha), ("tarde.html", tarde)], max_workers=1)
+
+    # As turmas 0001 e 0002 estão nos dois arquivos: ficam as do primeiro, sem somar alunos
+    first, second = parse_report(manha).classes, parse_report(tarde).classes
+    turmas = list(second)
+    assert list(schools) == ["E.M. ALFA"]
+    assert schools["E.M. ALFA"].classes == {
+        turmas[0]: first[turmas[0]], turmas[1]: first[turmas[1]], turmas[2]: second[turmas[2]],
+    }
+    assert errors == {"tarde.html": (
+        "Turmas já carregadas de outro arquivo da mesma escola, ignoradas: "
+        f"{turmas[0]} (manha.html), {turmas[1]} (manha.html)"
+    )}
+
+
+def test_identical_files_are_loaded_once():
+    data = report_of("E.M. ALFA")
+    schools, errors = parse_reports([("a.html", data), ("copia.html", data)], max_workers=1)
+    assert schools["E.M. ALFA"].classes == parse_report(data).classes
+    assert all(len(students) == 5 for students in schools["E.M. ALFA"].classes.values())
+    assert errors == {"copia.html": "Arquivo idêntico a a.html; ignorado."}
+
+
+def test_process_pool_merges_in_batch_order():
+    files = [
+        ("a.html", report_of("E.M. ALFA", seed=0)),
+        ("b.html", report_of("E.M. ALFA", seed=1)),
+        ("c.html", report_of("E.M. BETA", seed=2)),
+        ("d.html", b"<html><body>sem turmas</body></html>"),
+    ]
+    done = []
+    schools, errors = parse_reports(files, max_workers=2, progress=lambda n, total, name: done.append(name))
+
+    assert sorted(done) == ["a.html", "b.html", "c.html", "d.html"]
+    assert schools["E.M. ALFA"].classes == parse_report(files[0][1]).classes
+    assert schools["E.M. BETA"].classes == parse_report(files[2][1]).classes
+    assert list(errors) == ["b.html", "d.html"]
+    assert errors["d.html"] == "Nenhuma turma encontrada no arquivo."
+
+
+def test_school_name_falls_back_to_the_file_name():
+    assert school_name_for("relatorios/escola_x.html") == "escola_x"
+
+
+def test_class_origins_map_prefixed_keys_back_to_school_and_turma():
+    schools, _ = parse_reports(
+        [("a.html", report_of("E.M. ALFA")), ("b.html", report_of("E.M. BETA", seed=1))],
+        max_workers=1,
+    )
+    classes = flatten_schools(schools)
+    origins = class_origins(schools)
+    assert set(origins) == set(classes)
+    for key, (school, turma) in origins.items():
+        assert key == f"{school} - {turma}"
+        assert classes[key] == schools[school].classes[turma]
+
+
+def test_process_pool_does_not_fork_the_server(monkeypatch):
+    import batch_import
+
+    contexts = []
+    pool = batch_import.ProcessPoolExecutor
+
+    def recording_pool(*args, mp_context=None, **kwargs):
+        contexts.append(mp_context.get_start_method() if mp_context else "fork")
+        return pool(*args, mp_context=mp_context, **kwargs)
+
+    monkeypatch.setattr(batch_import, "ProcessPoolExecutor", recording_pool)
+    parse_reports([("a.html", report_of("E.M. ALFA")), ("b.html", report_of("E.M. BETA", seed=1))],
+                  max_workers=2)
+    assert contexts == ["forkserver"]
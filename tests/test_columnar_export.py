@@ -0,0 +1,123 @@
+import csv
+import io
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from attendance_model import AttendanceBook
+from attendance_store import AttendanceStore
+from columnar_export import COLUMNS, arrow_schema, write_attendance_columnar, write_store_columnar
+
+MARKS = [
+    # (escola, turma, data, [(aluno, situação, observação)])
+    ("E.M. ALFA", "1º ANO A", "2026-03-09", [("ANA", "P", ""), ("BIA", "F", "gripe")]),
+    ("E.M. ALFA", "1º ANO A", "2026-03-10", [("ANA", "FJ", "atestado"), ("BIA", None, "")]),
+    ("E.M. ALFA", "2º ANO B", "2026-03-10", [("CAIO", "P", "")]),
+    ("E.M. BETA", "3º ANO C", "2026-03-11", [("DANI", "F", "")]),
+    # Fora do filtro: outra escola e data fora do período
+    ("E.M. GAMA", "1º ANO A", "2026-03-10", [("EDU", "P", "")]),
+    ("E.M. ALFA", "1º ANO A", "2026-03-12", [("ANA", "P", "")]),
+]
+SCHOOLS = ("E.M. ALFA", "E.M. BETA")
+START, END = date(2026, 3, 9), date(2026, 3, 11)
+
+EXPECTED = [
+    ("E.M. ALFA", "1º ANO A", date(2026, 3, 9), "ANA", "P", None),
+    ("E.M. ALFA", "1º ANO A", date(2026, 3, 9), "BIA", "F", "gripe"),
+    ("E.M. ALFA", "1º ANO A", date(2026, 3, 10), "ANA", "FJ", "atestado"),
+    ("E.M. ALFA", "1º ANO A", date(2026, 3, 10), "BIA", None, None),
+    ("E.M. ALFA", "2º ANO B", date(2026, 3, 10), "CAIO", "P", None),
+    ("E.M. BETA", "3º ANO C", date(2026, 3, 11), "DANI", "F", None),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AttendanceStore(str(tmp_path / "paestro.db"))
+    for school, turma, day, rows in MARKS:
+        store.save_class(school, turma, day, rows)
+    return store
+
+
+def records(table):
+    columns = [table.column(name).to_pylist() for name in COLUMNS]
+    return list(zip(*columns))
+
+
+def assert_typed(schema):
+    assert schema == arrow_schema()
+    for name in ("escola", "turma", "presenca"):
+        assert pa.types.is_dictionary(schema.field(name).type)
+    assert schema.field("data").type == pa.date32()
+
+
+def test_store_parquet_has_every_saved_mark_of_the_period(store):
+    buffer = io.BytesIO()
+    rows = write_store_columnar(buffer, "parquet", store, SCHOOLS, START, END, chunk_rows=2)
+    buffer.seek(0)
+    parquet = pq.ParquetFile(buffer)
+    table = parquet.read()
+
+    assert rows == len(EXPECTED)
+    assert_typed(table.schema)
+    assert records(table) == EXPECTED
+    assert parquet.metadata.num_row_groups == 3
+    # Os dicionários são os mesmos em todos os lotes: escolas pedidas e turmas do período
+    turma = table.column("turma").chunk(0)
+    assert turma.dictionary.to_pylist() == ["1º ANO A", "2º ANO B", "3º ANO C"]
+
+
+def test_store_arrow_ipc_is_dictionary_encoded_in_batches(store):
+    buffer = io.BytesIO()
+    write_store_columnar(buffer, "arrow", store, SCHOOLS, START, END, chunk_rows=4)
+    reader = pa.ipc.open_file(pa.BufferReader(buffer.getvalue()))
+
+    assert reader.num_record_batches == 2
+    assert_typed(reader.schema)
+    table = reader.read_all()
+    assert records(table) == EXPECTED
+    batch = reader.get_batch(0)
+    assert batch.column(0).dictionary.to_pylist() == list(SCHOOLS)
+    assert batch.column(4).dictionary.to_pylist() == ["P", "F", "FJ"]
+
+
+def test_store_csv_and_empty_period(store):
+    buffer = io.BytesIO()
+    write_store_columnar(buffer, "csv", store, SCHOOLS, START, END)
+    lines = list(csv.reader(io.StringIO(buffer.getvalue().decode("utf-8"))))
+    assert tuple(lines[0]) == COLUMNS
+    assert lines[1:] == [
+        [school, turma, day.isoformat(), student, status or "", note or ""]
+        for school, turma, day, student, status, note in EXPECTED
+    ]
+
+    empty = io.BytesIO()
+    assert write_store_columnar(empty, "parquet", store, SCHOOLS, date(2026, 4, 1), date(2026, 4, 2)) == 0
+    empty.seek(0)
+    assert pq.read_table(empty).num_rows == 0
+
+
+def test_session_export_writes_unmarked_students_as_null():
+    classes = {"1º ANO A": ["ANA", "BIA"], "2º ANO B": ["CAIO"]}
+    book = AttendanceBook()
+    class_attendance = book.ensure_class("1º ANO A", classes["1º ANO A"])
+    class_attendance.set_status_at(1, "F")
+    class_attendance.set_observation_at(1, "gripe")
+
+    buffer = io.BytesIO()
+    write_attendance_columnar(buffer, "parquet", "E.M. ALFA", classes, book, day=date(2026, 3, 10))
+    buffer.seek(0)
+    table = pq.read_table(buffer)
+    assert_typed(table.schema)
+    assert records(table) == [
+        ("E.M. ALFA", "1º ANO A", date(2026, 3, 10), "ANA", None, None),
+        ("E.M. ALFA", "1º ANO A", date(2026, 3, 10), "BIA", "F", "gripe"),
+        ("E.M. ALFA", "2º ANO B", date(2026, 3, 10), "CAIO", None, None),
+    ]
+
+
+def test_unknown_format_is_rejected(store):
+    with pytest.raises(ValueError):
+        write_store_columnar(io.BytesIO(), "xls", store, SCHOOLS, START, END)
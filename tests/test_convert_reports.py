@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+
+from convert_reports import MANIFEST_NAME, main, output_names, run
+from synthetic_report import generate_report
+
+
+def write_reports(directory, count=2):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"relatorio_{i}.html"
+        path.write_text(generate_report(2, 5, seed=i), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def statuses(results):
+    return [result["status"] for result in results]
+
+
+def test_unchanged_reports_are_skipped(tmp_path):
+    paths = write_reports(tmp_path / "entrada")
+    out = str(tmp_path / "saida")
+
+    assert statuses(run(paths, out, "csv", workers=1)) == ["ok", "ok"]
+    assert statuses(run(paths, out, "csv", workers=1)) == ["skipped", "skipped"]
+
+    with open(paths[1], "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert statuses(run(paths, out, "csv", workers=1)) == ["skipped", "ok"]
+
+
+def test_missing_output_or_force_reconverts(tmp_path):
+    paths = write_reports(tmp_path / "entrada")
+    out = tmp_path / "saida"
+    run(paths, str(out), "csv", workers=1)
+
+    os.remove(out / "relatorio_0.csv")
+    assert statuses(run(paths, str(out), "csv", workers=1)) == ["ok", "skipped"]
+    assert (out / "relatorio_0.csv").exists()
+    assert statuses(run(paths, str(out), "csv", workers=1, force=True)) == ["ok", "ok"]
+
+
+def test_each_format_is_tracked_separately(tmp_path):
+    paths = write_reports(tmp_path / "entrada", 1)
+    out = str(tmp_path / "saida")
+
+    assert statuses(run(paths, out, "xlsx", workers=1)) == ["ok"]
+    assert statuses(run(paths, out, "jsonl", workers=1)) == ["ok"]
+    # A conversão para JSON Lines não apaga o registro da saída XLSX
+    assert statuses(run(paths, out, "xlsx", workers=1)) == ["skipped"]
+    assert statuses(run(paths, out, "jsonl", workers=1)) == ["skipped"]
+
+
+def test_manifest_of_a_previous_version_is_ignored(tmp_path):
+    paths = write_reports(tmp_path / "entrada", 1)
+    out = tmp_path / "saida"
+    run(paths, str(out), "csv", workers=1)
+    with open(out / MANIFEST_NAME, encoding="utf-8") as f:
+        (entry,) = json.load(f).values()
+    with open(out / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump({paths[0]: dict(entry["csv"], format="csv")}, f)
+
+    assert statuses(run(paths, str(out), "csv", workers=1)) == ["ok"]
+
+
+def test_duplicate_output_names_get_a_suffix(tmp_path):
+    (first,) = write_reports(tmp_path / "a", 1)
+    (second,) = write_reports(tmp_path / "b", 1)
+    upper = str(tmp_path / "b" / "RELATORIO_0.html")
+    os.rename(second, upper)
+
+    names = output_names([first, upper], "csv")
+    assert names == {first: "relatorio_0.csv", upper: "RELATORIO_0_2.csv"}
+
+    out = tmp_path / "saida"
+    assert statuses(run([first, upper], str(out), "csv", workers=2)) == ["ok", "ok"]
+    assert sorted(name for name in os.listdir(out) if name.endswith(".csv")) == [
+        "RELATORIO_0_2.csv", "relatorio_0.csv",
+    ]
+    assert statuses(run([first, upper], str(out), "csv", workers=1)) == ["skipped", "skipped"]
+
+
+def test_failed_report_sets_exit_status(tmp_path, capsys):
+    entrada = tmp_path / "entrada"
+    write_reports(entrada, 1)
+    (entrada / "vazio.html").write_text("<html><body><p>sem turmas</p></body></html>", encoding="utf-8")
+    out = tmp_path / "saida"
+
+    assert main([str(entrada), "-o", str(out), "-j", "1", "-q"]) == 1
+    assert "vazio.html: Nenhuma turma encontrada" in capsys.readouterr().err
+    with open(out / "relatorio_0.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:2] == ["escola", "turma"]
+    assert len(rows) == 1 + 2 * 5
+    assert not (out / "vazio.csv").exists()
+
+    assert main([str(tmp_path / "nada"), "-o", str(out)]) == 2
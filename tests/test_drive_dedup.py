@@ -0,0 +1,77 @@
+import time
+
+from attendance_model import AttendanceBook
+from columnar_export import iter_records, records_sha256
+from drive_queue import DONE, ExportQueue, export_key
+from gdrive_exporter import sync_export
+from xlsx_export import XLSX_MIME_TYPE, export_to_tempfile
+
+SCHOOL = "E.M. EXEMPLO"
+CLASSES = {"1º ANO A": ["ANA SOUZA", "BRUNO LIMA", "CARLA DIAS"]}
+
+
+def xlsx_export(attendance):
+    output, _ = export_to_tempfile(SCHOOL, CLASSES, attendance)
+    with output:
+        data = output.read()
+    return data, records_sha256(iter_records(SCHOOL, CLASSES, attendance), "xlsx", False, SCHOOL)
+
+
+def marked_book(status="P"):
+    book = AttendanceBook()
+    book.ensure_class("1º ANO A", CLASSES["1º ANO A"]).mark_all(status)
+    return book
+
+
+def test_same_bytes_are_not_uploaded_again(fake_drive):
+    key = export_key(SCHOOL, "2026-03-10", "Presenca.csv")
+    first = sync_export(b"a,b\n1,2\n", "Presenca.csv", "text/csv", "Paestro", key)
+    # Sem o registro local: o arquivo é encontrado no Drive pelas appProperties
+    second = sync_export(b"a,b\n1,2\n", "Presenca.csv", "text/csv", "Paestro", key)
+    third = sync_export(b"a,b\n1,3\n", "Presenca.csv", "text/csv", "Paestro", key, second)
+
+    assert [first["action"], second["action"], third["action"]] == ["created", "unchanged", "updated"]
+    assert first["id"] == second["id"] == third["id"]
+    summary = fake_drive.summary()
+    assert summary["uploads"] == 2
+    assert summary["permissions"] == 1
+
+
+def test_regenerated_xlsx_with_same_rows_is_unchanged(fake_drive):
+    key = export_key(SCHOOL, "2026-03-10", "Presenca.xlsx")
+    data, content_hash = xlsx_export(marked_book())
+    first = sync_export(data, "Presenca.xlsx", XLSX_MIME_TYPE, "Paestro", key, content_hash=content_hash)
+
+    time.sleep(2.1)  # Hora do documento e datas do zip mudam: os bytes não são estáveis
+    again, again_hash = xlsx_export(marked_book())
+    assert again != data
+    second = sync_export(again, "Presenca.xlsx", XLSX_MIME_TYPE, "Paestro", key, first,
+                         content_hash=again_hash)
+    assert second["action"] == "unchanged"
+
+    changed, changed_hash = xlsx_export(marked_book("F"))
+    third = sync_export(changed, "Presenca.xlsx", XLSX_MIME_TYPE, "Paestro", key, first,
+                        content_hash=changed_hash)
+    assert third["action"] == "updated"
+    assert fake_drive.summary()["uploads"] == 2
+
+
+def test_queue_completes_repeated_xlsx_without_uploading(fake_drive, tmp_path):
+    queue = ExportQueue(str(tmp_path / "queue.db"), base_delay=0.05).start()
+    try:
+        key = export_key(SCHOOL, "2026-03-10", "Presenca.xlsx")
+        data, content_hash = xlsx_export(marked_book())
+        first = queue.enqueue(data, "Presenca.xlsx", XLSX_MIME_TYPE, "Paestro", key, content_hash)
+        deadline = time.monotonic() + 30
+        while queue.get_job(first)["status"] != DONE:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        uploads = fake_drive.summary()["uploads"]
+        again, again_hash = xlsx_export(marked_book())
+        second = queue.enqueue(again, "Presenca.xlsx", XLSX_MIME_TYPE, "Paestro", key, again_hash)
+        job = queue.get_job(second)
+        assert (job["status"], job["action"]) == (DONE, "unchanged")
+        assert fake_drive.summary()["uploads"] == uploads
+    finally:
+        queue.stop()
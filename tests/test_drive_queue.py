@@ -0,0 +1,129 @@
+import random
+import threading
+import time
+
+from drive_queue import DONE, FAILED, RUNNING, ExportQueue, export_key
+
+SCHOOL = "E.M. EXEMPLO"
+
+
+def wait_for(queue, job_ids, timeout=60):
+    deadline = time.monotonic() + timeout
+    jobs = []
+    for job_id in job_ids:
+        while queue.get_job(job_id)["status"] not in (DONE, FAILED):
+            assert time.monotonic() < deadline, f"envio {job_id} não terminou"
+            time.sleep(0.01)
+        jobs.append(queue.get_job(job_id))
+    return jobs
+
+
+def test_server_errors_are_retried_until_done(fake_drive, tmp_path):
+    random.seed(3)
+    fake_drive.error_rate = 0.3
+    queue = ExportQueue(str(tmp_path / "queue.db"), base_delay=0.01, max_delay=0.05,
+                        max_attempts=50).start()
+    try:
+        jobs = wait_for(queue, [
+            queue.enqueue(f"turma,{i}\n".encode(), f"Presenca_{i}.csv", "text/csv", "Paestro",
+                          export_key(SCHOOL, "2026-03-10", f"Presenca_{i}.csv"))
+            for i in range(8)
+        ])
+    finally:
+        queue.stop()
+
+    assert [job["status"] for job in jobs] == [DONE] * 8
+    assert any(job["attempts"] > 1 for job in jobs)
+    summary = fake_drive.summary()
+    assert summary["errors_injected"] > 0
+    # Tentativas repetidas encontram o arquivo já criado em vez de criar outro
+    assert summary["files"] == 8 + 1  # mais a pasta
+
+
+def test_persistent_server_errors_fail_after_max_attempts(fake_drive, tmp_path):
+    fake_drive.error_rate = 1.0
+    queue = ExportQueue(str(tmp_path / "queue.db"), base_delay=0.01, max_attempts=3).start()
+    try:
+        (job,) = wait_for(queue, [queue.enqueue(b"a,b\n", "Presenca.csv", "text/csv", "Paestro",
+                                                export_key(SCHOOL, "2026-03-10", "Presenca.csv"))])
+    finally:
+        queue.stop()
+
+    assert (job["status"], job["attempts"]) == (FAILED, 3)
+    assert "503" in job["error"]
+    assert fake_drive.summary()["errors_injected"] == 3
+
+
+def test_running_jobs_are_reclaimed_only_after_their_lease(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    release = threading.Event()
+    started = threading.Event()
+
+    def stuck_uploader(data, *args):
+        started.set()
+        release.wait(30)
+        return {"id": None, "url": "https://stale", "sha256": None, "action": "created"}
+
+    stuck = ExportQueue(db_path, uploader=stuck_uploader, workers=1).start()
+    job_id = stuck.enqueue(b"a,b\n", "Presenca.csv")
+    assert started.wait(10)
+
+    # Outro processo abrindo o mesmo banco não toma um envio ainda em andamento
+    ExportQueue(db_path)
+    assert stuck.get_job(job_id)["status"] == RUNNING
+
+    uploaded = []
+    queue = ExportQueue(db_path, uploader=lambda data, *args: uploaded.append(data) or {
+        "id": None, "url": "https://retaken", "sha256": None, "action": "created"
+    }, lease_timeout=0.0).start()
+    try:
+        (job,) = wait_for(queue, [job_id])
+    finally:
+        queue.stop()
+        release.set()
+        stuck.stop()
+
+    assert uploaded == [b"a,b\n"]
+    # O resultado atrasado da reserva vencida não sobrescreve o da nova tentativa
+    job = queue.get_job(job_id)
+    assert (job["status"], job["url"], job["attempts"]) == (DONE, "https://retaken", 2)
+
+
+def test_failed_jobs_drop_their_payload(tmp_path):
+    def failing_uploader(data, *args):
+        raise ValueError("arquivo recusado")
+
+    queue = ExportQueue(str(tmp_path / "queue.db"), uploader=failing_uploader).start()
+    try:
+        (job,) = wait_for(queue, [queue.enqueue(b"a,b\n", "Presenca.csv")])
+    finally:
+        queue.stop()
+
+    assert (job["status"], job["error"]) == (FAILED, "arquivo recusado")
+    (payload,) = queue._connection().execute(
+        "SELECT payload FROM drive_jobs WHERE id = ?", (job["id"],)
+    ).fetchone()
+    assert payload is None
+
+
+def test_finished_jobs_are_purged_after_the_retention(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    queue = ExportQueue(db_path, uploader=lambda data, *args: {
+        "id": None, "url": "https://ok", "sha256": None, "action": "created"
+    }).start()
+    try:
+        old, recent = wait_for(queue, [queue.enqueue(b"a\n", "Antigo.csv"),
+                                       queue.enqueue(b"b\n", "Recente.csv")])
+    finally:
+        queue.stop()
+    pending = queue.enqueue(b"c\n", "Pendente.csv")
+    queue._connection().execute(
+        "UPDATE drive_jobs SET updated_at = ? WHERE id IN (?, ?)",
+        (time.time() - 8 * 24 * 3600, old["id"], pending),
+    )
+
+    ExportQueue(db_path)  # Ao abrir o banco, remove o que terminou há mais de 7 dias
+
+    assert queue.get_job(old["id"]) is None
+    assert queue.get_job(recent["id"])["status"] == DONE
+    assert queue.get_job(pending) is not None
@@ -0,0 +1,52 @@
+import threading
+
+import gdrive_exporter
+from gdrive_exporter import upload_bytes
+
+
+def test_client_is_built_once_per_process(fake_drive, monkeypatch):
+    builds = []
+    build_service = gdrive_exporter._build_service
+    monkeypatch.setattr(gdrive_exporter, "_build_service",
+                        lambda creds: builds.append(creds) or build_service(creds))
+
+    upload_bytes(b"a,b\n", "Presenca.csv", "text/csv", "Paestro")
+    # Outras threads (como as da fila de envios) usam o mesmo cliente
+    thread = threading.Thread(target=upload_bytes, args=(b"a,c\n", "Outra.csv"))
+    thread.start()
+    thread.join()
+    upload_bytes(b"a,d\n", "Mais.csv")
+
+    assert len(builds) == 1
+    assert fake_drive.summary()["uploads"] == 3
+
+
+def test_folder_is_looked_up_once_within_the_ttl(fake_drive, monkeypatch):
+    upload_bytes(b"a,b\n", "Presenca_1.csv", "text/csv", "Paestro")
+    upload_bytes(b"a,b\n", "Presenca_2.csv", "text/csv", "Paestro")
+    folder_lookups = [request for request in fake_drive.requests if request == ("GET", "/drive/v3/files")]
+    assert len(folder_lookups) == 1
+
+    # Vencido o prazo, a pasta é procurada de novo (e encontrada, sem ser recriada)
+    monkeypatch.setattr(gdrive_exporter, "FOLDER_CACHE_TTL", 0)
+    gdrive_exporter._folder_cache.clear()
+    upload_bytes(b"a,b\n", "Presenca_3.csv", "text/csv", "Paestro")
+    upload_bytes(b"a,b\n", "Presenca_4.csv", "text/csv", "Paestro")
+    folder_lookups = [request for request in fake_drive.requests if request == ("GET", "/drive/v3/files")]
+    assert len(folder_lookups) == 3
+    assert fake_drive.requests.count(("POST", "/drive/v3/files")) == 1
+
+
+def test_permission_is_sent_in_one_batch_request(fake_drive):
+    upload_bytes(b"a,b\n", "Presenca.csv")
+
+    ((method, path), (batch_method, batch_path), permission) = fake_drive.requests
+    assert (method, path) == ("POST", "/upload/drive/v3/files")
+    assert batch_method == "POST" and batch_path.startswith("/batch/")
+    (file_id,) = fake_drive.permissions
+    assert permission == ("POST", f"/drive/v3/files/{file_id}/permissions")
+
+    fake_drive.requests.clear()
+    gdrive_exporter.share_files(gdrive_exporter.get_drive_service(), [file_id, file_id])
+    assert [path for _, path in fake_drive.requests].count(batch_path) == 1
+    assert len(fake_drive.permissions[file_id]) == 3
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+import roster_cache
+from attendance_parser import ParsedReport
+from roster_cache import RosterCache
+
+
+def report_for(name):
+    return ParsedReport({f"TURMA {name}": [f"ALUNO {name}"]}, school_name="E.M. EXEMPLO")
+
+
+def test_memory_keeps_the_most_recently_used_entries():
+    cache = RosterCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, report_for(key))
+    assert cache.get("a") is None  # Removido ao entrar o terceiro
+
+    cache.get("b")  # "b" passa a ser o mais recente, e "c" o próximo a sair
+    cache.put("d", report_for("d"))
+    assert cache.get("c") is None
+    assert cache.get("b").classes == {"TURMA b": ["ALUNO b"]}
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_hits_and_misses_are_counted():
+    cache = RosterCache()
+    parsed = []
+
+    def parser(data):
+        parsed.append(data)
+        return report_for(data.decode())
+
+    first = cache.get_or_parse(b"a", parser)
+    second = cache.get_or_parse(b"a", parser)
+    cache.get_or_parse(b"b", parser)
+
+    assert parsed == [b"a", b"b"]
+    assert second.classes == first.classes and second.classes is not first.classes
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 2, "memory_entries": 2}
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "disk_hits": 0, "misses": 0, "memory_entries": 0}
+
+
+def test_entries_are_read_from_disk_by_a_new_instance(tmp_path):
+    RosterCache(str(tmp_path)).put("a", report_for("a"))
+
+    cache = RosterCache(str(tmp_path))
+    assert cache.get("a").classes == {"TURMA a": ["ALUNO a"]}
+    assert cache.get("a").school_name == "E.M. EXEMPLO"
+    assert cache.stats() == {"hits": 2, "disk_hits": 1, "misses": 0, "memory_entries": 1}
+
+
+def test_disk_keeps_the_most_recently_used_files_within_the_limit(tmp_path):
+    RosterCache(str(tmp_path)).put("a", report_for("a"))
+    size = os.path.getsize(tmp_path / "a.json")
+    cache = RosterCache(str(tmp_path), max_disk_bytes=2 * size)
+    cache.put("b", report_for("b"))
+    old = time.time() - 60
+    os.utime(tmp_path / "a.json", (old - 10, old - 10))
+    os.utime(tmp_path / "b.json", (old, old))
+
+    assert RosterCache(str(tmp_path)).get("a") is not None  # Lido do disco: "a" é o mais recente
+    cache.put("c", report_for("c"))
+
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+
+
+def test_files_of_another_format_version_are_ignored(tmp_path, monkeypatch):
+    RosterCache(str(tmp_path)).put("a", report_for("a"))
+    with open(tmp_path / "a.json", encoding="utf-8") as f:
+        assert json.load(f)["version"] == roster_cache._FORMAT_VERSION
+
+    monkeypatch.setattr(roster_cache, "_FORMAT_VERSION", roster_cache._FORMAT_VERSION + 1)
+    cache = RosterCache(str(tmp_path))
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+    cache.put("a", report_for("a"))  # Reprocessado, é regravado na versão atual
+    assert RosterCache(str(tmp_path)).get("a") is not None
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from attendance_parser import parse_report
+from student_index import StudentIndex, fold
+from synthetic_report import FIRST_NAMES, LAST_NAMES, SCHOOL_NAME, generate_report, make_classes
+
+CLASSES = make_classes(30, 35, seed=7)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return StudentIndex(
+        (turma, [name for _, name in students], [code for code, _ in students])
+        for turma, students in CLASSES
+    )
+
+
+def brute_force(query):
+    """Referência: cada palavra da busca é prefixo de alguma palavra do nome ou do código."""
+    words = fold(query).split()
+    return {
+        (turma, position)
+        for turma, students in CLASSES
+        for position, (code, name) in enumerate(students)
+        if all(any(token.startswith(word) for token in fold(f"{name} {code}").split()) for word in words)
+    }
+
+
+def queries():
+    rng = random.Random(11)
+    words = FIRST_NAMES + LAST_NAMES
+    # Uma palavra, prefixos curtos (trechos grandes), várias palavras raras e comuns
+    # (os dois caminhos da interseção) e palavras que não existem
+    yield from ["ana", "j", "sil", "da cruz", "zzz", "ana zzz"]
+    for _ in range(40):
+        picked = rng.sample(words, rng.randint(1, 3))
+        yield " ".join(word[:rng.randint(1, len(word))] for word in picked)
+
+
+@pytest.mark.parametrize("query", list(queries()))
+def test_search_matches_brute_force(index, query):
+    found = {(match.turma, match.position) for match in index.search(query, limit=10**6)}
+    assert found == brute_force(query)
+
+
+def test_search_ignores_accents_case_and_word_order(index):
+    turma, students = CLASSES[0]
+    code, name = students[3]
+    first, *rest = name.split()
+    query = f"  {' '.join(rest).lower()}   {first.title()} "
+    assert (turma, 3) in {(m.turma, m.position) for m in index.search(query, limit=10**6)}
+    assert index.search("JOAO", limit=10**6) == index.search("joão", limit=10**6)
+
+    (match,) = index.search(code)
+    assert match == (turma, 3, name, code)
+
+
+def test_search_limit_and_empty_queries(index):
+    assert len(index.search("a", limit=5)) == 5
+    assert len({(m.turma, m.position) for m in index.search("a", limit=50)}) == 50
+    assert index.search("", limit=5) == []
+    assert index.search("   ", limit=5) == []
+    assert index.search("ana", limit=0) == []
+    assert len(index) == 30 * 35
+
+
+def test_from_reports_uses_the_session_class_keys():
+    schools = {
+        SCHOOL_NAME: parse_report(generate_report(2, 3, seed=1)),
+        "E.M. BETA": parse_report(generate_report(1, 3, seed=2)),
+    }
+    index = StudentIndex.from_reports(schools)
+    report = schools["E.M. BETA"]
+    turma = next(iter(report.classes))
+    name, code = report.classes[turma][1], report.codes[turma][1]
+    assert StudentIndex.from_reports({"E.M. BETA": report}).search(code)[0].turma == turma
+    assert index.search(code)[0] == (f"E.M. BETA - {turma}", 1, name, code)
@@ -0,0 +1,136 @@
+import re
+import tempfile
+
+from batch_import import class_origins
+
+# O openpyxl é importado só ao gerar a primeira planilha (ver `write_attendance_xlsx`)
+
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_COLUMN_WIDTHS = {"A": 30, "B": 15, "C": 40}
+_HEADER = ("Aluno", "Presença", "Observação")
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def write_attendance_xlsx(target, school_name, classes, attendance=None, sheet_per_turma=False,
+                          schools=None):
+    """
+    Grava a lista de presença em XLSX no modo `write_only` do openpyxl.
+
+    As linhas são enviadas direto para o arquivo à medida que são geradas, sem manter a
+    planilha inteira em memória.
+
+    Parâmetros:
+      target: caminho ou objeto de arquivo binário de destino.
+      school_name: texto do cabeçalho de cada planilha.
+      classes: dict {turma: [alunos]}.
+      attendance: `AttendanceBook` com as marcações (turmas ausentes saem em branco).
+      sheet_per_turma: se True, cria uma planilha por turma; senão, todas em sequência
+                       na planilha "Lista de Presença".
+      schools: {escola: ParsedReport} de um lote; com mais de uma escola, cada planilha
+               por turma leva no cabeçalho a escola da turma, e não `school_name`.
+
+    Retorna:
+      int: quantidade de linhas de alunos gravadas.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb)
+
+    students_written = 0
+    if sheet_per_turma:
+        used_titles = set()
+        origins = class_origins(schools) if schools and len(schools) > 1 else {}
+        for turma, alunos in classes.items():
+            school = origins[turma][0] if turma in origins else school_name
+            ws = _new_sheet(wb, _sheet_title(turma, used_titles), school)
+            students_written += _write_turma(ws, 3, turma, alunos, attendance)
+    else:
+        ws = _new_sheet(wb, "Lista de Presença", school_name)
+        row = 3
+        for turma, alunos in classes.items():
+            written = _write_turma(ws, row, turma, alunos, attendance)
+            students_written += written
+            row += written + 3  # turma + cabeçalho + alunos + linha vazia entre turmas
+
+    wb.save(target)
+    return students_written
+
+
+def export_to_tempfile(school_name, classes, attendance=None, sheet_per_turma=False, schools=None):
+    """
+    Gera o XLSX em um arquivo temporário (em memória até 16 MB, depois em disco).
+
+    Retorna:
+      tuple: (arquivo posicionado no início, quantidade de linhas de alunos).
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    rows = write_attendance_xlsx(output, school_name, classes, attendance, sheet_per_turma, schools)
+    output.seek(0)
+    return output, rows
+
+
+def _add_named_styles(wb):
+    from openpyxl.styles import Alignment, Font, NamedStyle
+
+    # Criados uma única vez por arquivo; as células apenas referenciam o nome do estilo
+    wb.add_named_style(NamedStyle(
+        name="paestro_escola", font=Font(bold=True, size=14), alignment=Alignment(horizontal="center")))
+    wb.add_named_style(NamedStyle(
+        name="paestro_turma", font=Font(bold=True, size=12), alignment=Alignment(horizontal="left")))
+    wb.add_named_style(NamedStyle(
+        name="paestro_cabecalho", font=Font(bold=True), alignment=Alignment(horizontal="center")))
+
+
+def _new_sheet(wb, title, school_name):
+    ws = wb.create_sheet(title)
+    for column, width in _COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    # Cabeçalho com o nome da escola (mesclado em A1:C1), seguido de uma linha vazia
+    ws.merged_cells.add("A1:C1")
+    ws.append([_styled(ws, school_name, "paestro_escola")])
+    ws.append([])
+    return ws
+
+
+def _write_turma(ws, row, turma, alunos, attendance):
+    ws.merged_cells.add(f"A{row}:C{row}")
+    ws.append([_styled(ws, f"Turma: {turma}", "paestro_turma")])
+    ws.append([_styled(ws, title, "paestro_cabecalho") for title in _HEADER])
+
+    class_attendance = attendance.get(turma) if attendance is not None else None
+    if class_attendance is not None:
+        rows = class_attendance.rows()
+    else:
+        rows = ((student, "", "") for student in alunos)
+
+    written = 0
+    for student, presence, observation in rows:
+        ws.append((student, presence, observation))
+        written += 1
+
+    ws.append([])
+    return written
+
+
+def _styled(ws, value, style):
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _sheet_title(turma, used_titles):
+    # O Excel limita o nome a 31 caracteres, sem []:*?/\ e sem repetições
+    base = _INVALID_SHEET_CHARS.sub("-", turma).strip("'") or "Turma"
+    title = base[:31]
+    counter = 2
+    while title.lower() in used_titles:
+        suffix = f" ({counter})"
+        title = base[:31 - len(suffix)] + suffix
+        counter += 1
+    used_titles.add(title.lower())
+    return title